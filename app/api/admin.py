@@ -0,0 +1,42 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+
+from app.core import tracing
+from app.core.config import settings
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token")):
+    """Traces expose session ids and internals, so the routes do not exist until ADMIN_TOKEN is set."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(x_admin_token or "", settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/traces/slow", tags=["Admin"])
+async def list_slow_traces(
+    limit: int = Query(50, ge=1, le=1000),
+    min_duration_ms: Optional[float] = Query(None, ge=0, description="Only traces at least this slow"),
+):
+    """
+    Chat turns slower than SLOW_TURN_THRESHOLD_MS, newest first, as summaries.
+    Fetch one by `trace_id` (the X-Trace-Id response header) for its span tree.
+    """
+    traces = tracing.slow_traces()
+    if min_duration_ms is not None:
+        traces = [t for t in traces if t.duration_ms >= min_duration_ms]
+    return {"stats": tracing.tracing_stats(), "traces": [t.summary() for t in traces[:limit]]}
+
+
+@router.get("/traces/slow/{trace_id}", tags=["Admin"])
+async def get_slow_trace(trace_id: str):
+    """Full span tree of a captured slow turn: request, turn, DB calls, LLM call, escalation."""
+    trace = tracing.find_slow_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"Trace {trace_id} not captured (fast, expired from the buffer, or unknown).")
+    return trace.to_dict()
@@ -1,70 +1,339 @@
 
-from fastapi import APIRouter, HTTPException, Query
-from typing import List
-from app.models.schemas import SessionFullDetails, TicketSummary, UpdateTicketStatusRequest
-from app.services.db import (
+import asyncio
+import base64
+import hashlib
+from datetime import datetime, timedelta
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Union
+from app.core import codec
+from app.core.config import settings
+from app.core.sse import SSE_HEADERS, format_sse
+from app.models.schemas import SessionFullDetails, TicketChanges, TicketSummary, UpdateTicketStatusRequest
+from app.services.async_db import (
+    get_session_messages,
     get_session_transcript,
+    latest_ticket_update,
     list_open_tickets,
+    list_ticket_changes,
     mark_session_resolved,
     update_ticket_status,
 )
+from app.storage.base import OPEN_TICKET_STATUSES, TICKET_SORTS
+from app.services.events import CLOSED_STATUSES, RESYNC, ticket_events
+from app.services.prompts import load_prompt_version, prompt_marker
 
 router = APIRouter()
 
-@router.get("/escalations", response_model=List[TicketSummary], tags=["Agent Dashboard"])
-async def get_escalations():
-    """Returns a list of all open agent tickets (escalations/service)."""
+def _ticket_summary(t: dict, include_collected_data: bool = True) -> dict:
+    """Normalize a tickets row to what the dashboard expects."""
+    summary = {
+        "id": t["id"],
+        "session_id": t["session_id"],
+        "user_id": str(t["user_id"]),
+        "source": t.get("source") or "ESCALATION",
+        "reason": t.get("reason") or "STANDARD",
+        "priority": t.get("priority") or "normal",
+        "status": t.get("status") or "OPEN",
+        "customer_name": t.get("customer_name"),
+        "phone": t.get("phone"),
+        "vehicle_model": t.get("vehicle_model"),
+        "collected_data": t.get("collected_data") or {},
+        "created_at": t.get("created_at"),
+    }
+    if not include_collected_data:
+        del summary["collected_data"]
+    return summary
+
+
+def _parse_cursor(since: str) -> datetime:
+    try:
+        return datetime.fromisoformat(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid 'since' cursor")
+
+
+def _encode_page_cursor(sort: str, row: dict) -> str:
+    column, _ = TICKET_SORTS[sort]
+    raw = codec.dumpb([sort, row[column], row["id"]])
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_page_cursor(sort: str, after: str) -> tuple:
     try:
-        items = list_open_tickets()
-        # Normalize output to what the dashboard expects
-        normalized = []
-        for t in items:
-            normalized.append(
-                {
-                    "id": t["id"],
-                    "session_id": t["session_id"],
-                    "user_id": str(t["user_id"]),
-                    "source": t.get("source") or "ESCALATION",
-                    "reason": t.get("reason") or "STANDARD",
-                    "priority": t.get("priority") or "normal",
-                    "status": t.get("status") or "OPEN",
-                    "customer_name": t.get("customer_name"),
-                    "phone": t.get("phone"),
-                    "vehicle_model": t.get("vehicle_model"),
-                    "collected_data": t.get("collected_data") or {},
-                    "created_at": t.get("created_at"),
-                }
+        raw = base64.urlsafe_b64decode(after + "=" * (-len(after) % 4))
+        cursor_sort, value, ticket_id = codec.loads(raw)
+        key = (datetime.fromisoformat(value), int(ticket_id))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid 'after' cursor")
+    if cursor_sort != sort:
+        raise HTTPException(status_code=400, detail="'after' cursor belongs to a different sort")
+    return key
+
+
+def _check_choices(name: str, values: Optional[List[str]], allowed) -> Optional[List[str]]:
+    for value in values or []:
+        if value not in allowed:
+            raise HTTPException(status_code=400, detail=f"Invalid {name} '{value}'. Expected one of: {', '.join(allowed)}")
+    return values
+
+
+def _conditional_json(request: Request, content, headers: Optional[dict] = None) -> Response:
+    """
+    JSON response with a strong ETag over the body and headers; answers
+    `304 Not Modified` when the client's If-None-Match already has it.
+    """
+    headers = dict(headers or {})
+    body = codec.dumpb(content)
+    digest = hashlib.sha256(body)
+    for name in sorted(headers):
+        digest.update(f"\n{name}:{headers[name]}".encode("utf-8"))
+    etag = f'"{digest.hexdigest()[:32]}"'
+    headers.update({"ETag": etag, "Cache-Control": "no-cache"})
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get(
+    "/escalations",
+    response_model=Union[List[TicketSummary], TicketChanges],
+    tags=["Agent Dashboard"],
+)
+async def get_escalations(
+    request: Request,
+    since: Optional[str] = Query(None, description="Cursor from a previous response; returns only changes after it"),
+    status: Optional[List[str]] = Query(None, description="Only these open statuses (repeatable)"),
+    priority: Optional[List[str]] = Query(None, description="Only these priorities (repeatable)"),
+    source: Optional[str] = Query(None, description="ESCALATION or SERVICE"),
+    reason: Optional[str] = Query(None),
+    min_age_minutes: Optional[int] = Query(None, ge=0, description="Created at least this long ago"),
+    max_age_minutes: Optional[int] = Query(None, ge=0, description="Created at most this long ago"),
+    sort: str = Query("-updated_at", description="-updated_at, -created_at or created_at"),
+    after: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    limit: int = Query(settings.TICKETS_PAGE_DEFAULT_LIMIT, ge=1, le=settings.TICKETS_PAGE_MAX_LIMIT),
+    fields: str = Query("full", description="'summary' leaves out collected_data"),
+):
+    """
+    Returns a page of open agent tickets (escalations/service), filtered and
+    sorted server-side. `X-Next-Cursor` is set when there are more pages (pass
+    it as `after`), and `X-Cursor` carries the cursor for incremental polling.
+    With `since`, returns only what changed across all open tickets after that
+    cursor (`TicketChanges`); it can't be combined with filters or paging. Both
+    send an ETag; repeating a poll with If-None-Match gets `304 Not Modified`
+    until something changes.
+    """
+    _check_choices("status", status, OPEN_TICKET_STATUSES)
+    _check_choices("priority", priority, ("normal", "high", "emergency"))
+    _check_choices("source", [source] if source else None, ("ESCALATION", "SERVICE"))
+    _check_choices("sort", [sort], tuple(TICKET_SORTS))
+    _check_choices("fields", [fields], ("full", "summary"))
+    include_collected_data = fields == "full"
+
+    since_ts = _parse_cursor(since) if since else None
+    if since_ts is not None and (status or priority or source or reason or after
+                                 or min_age_minutes is not None or max_age_minutes is not None):
+        raise HTTPException(status_code=400, detail="'since' can't be combined with filters or 'after'")
+    page_after = _decode_page_cursor(sort, after) if after else None
+    try:
+        # Read the cursor before the rows: a write landing in between is then
+        # returned again next poll rather than skipped.
+        latest = await latest_ticket_update()
+        cursor = latest.isoformat() if latest else since
+
+        if since_ts is None:
+            items = await list_open_tickets(
+                statuses=status,
+                priorities=priority,
+                source=source,
+                reason=reason,
+                min_age_minutes=min_age_minutes,
+                max_age_minutes=max_age_minutes,
+                sort=sort,
+                after=page_after,
+                limit=limit + 1,
+                include_collected_data=include_collected_data,
+            )
+            headers = {"X-Cursor": cursor or ""}
+            if len(items) > limit:
+                items = items[:limit]
+                headers["X-Next-Cursor"] = _encode_page_cursor(sort, items[-1])
+            return _conditional_json(
+                request, [_ticket_summary(t, include_collected_data) for t in items], headers=headers
             )
-        return normalized
+
+        window_start = since_ts - timedelta(seconds=settings.TICKETS_CURSOR_OVERLAP_SECONDS)
+        changed, removed = [], []
+        for t in await list_ticket_changes(window_start):
+            if t.get("status") in CLOSED_STATUSES:
+                removed.append(t["id"])
+            else:
+                changed.append(_ticket_summary(t, include_collected_data))
+        return _conditional_json(request, {"cursor": cursor, "changed": changed, "removed": removed})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+# Comment frames keep idle connections alive through proxies.
+_STREAM_HEARTBEAT_SECONDS = 15
+
+
+@router.get("/escalations/stream", tags=["Agent Dashboard"])
+async def stream_escalations(request: Request):
+    """
+    Server-Sent Events feed of open tickets. Sends one `snapshot` event with every
+    open ticket, then only `ticket.created`, `ticket.updated` and `ticket.closed`
+    deltas as they happen (each `{"ticket": {...}}`). A fresh `snapshot` is sent if
+    the client falls too far behind. Deltas are published by this worker process
+    only, so the snapshot also carries a `cursor`: poll `/escalations?since=` with it
+    to pick up writes made by other workers.
+    """
+    # Subscribe before reading the snapshot so no change can fall in between.
+    queue = ticket_events.subscribe()
+
+    async def snapshot_event() -> str:
+        # Resume delivery before the query: a change racing it is then at worst sent
+        # twice (in the snapshot and as a delta), never dropped from both.
+        ticket_events.mark_resynced(queue)
+        # Cursor before the rows, as in get_escalations.
+        latest = await latest_ticket_update()
+        items = await list_open_tickets()
+        tickets = [TicketSummary(**_ticket_summary(t)).model_dump(mode="json") for t in items]
+        return format_sse("snapshot", {"tickets": tickets, "cursor": latest.isoformat() if latest else None})
+
+    async def events():
+        try:
+            yield await snapshot_event()
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is RESYNC:
+                    yield await snapshot_event()
+                    continue
+                ticket = TicketSummary(**_ticket_summary(event["ticket"])).model_dump(mode="json")
+                yield format_sse(event["type"], {"ticket": ticket})
+        finally:
+            ticket_events.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+def _display_message(m: dict) -> dict:
+    # System prompts are shown as a version marker, never as the full text.
+    return {**m, "content": prompt_marker(content=m["content"])} if m["role"] == "system" else m
+
+
+async def _prompt_marker_message(data: dict) -> Optional[dict]:
+    """Marker for the session's versioned system prompt, shown as its first message."""
+    if data.get('prompt_version_id') is None:
+        return None
+    await load_prompt_version(data['prompt_version_id'])
+    return {
+        "role": "system",
+        "content": prompt_marker(data['prompt_version_id']),
+        "created_at": data['created_at'],
+    }
+
+
 @router.get("/session/{session_id}", response_model=SessionFullDetails, tags=["Agent Dashboard"])
-async def get_session(session_id: str):
+async def get_session(
+    session_id: str,
+    limit: Optional[int] = Query(
+        None, ge=1, le=settings.TRANSCRIPT_PAGE_MAX_LIMIT,
+        description="Page size; newest messages first. Omit for the whole transcript in chronological order",
+    ),
+    before: Optional[int] = Query(None, description="next_cursor from the previous page, to load older messages"),
+):
     """Returns the full metadata and chat history for a specific session."""
+    if before is not None and limit is None:
+        raise HTTPException(status_code=400, detail="'before' requires 'limit'")
     try:
-        data = get_session_transcript(session_id)
+        data = await get_session_transcript(session_id, before=before, limit=limit + 1 if limit else None)
         if not data:
             raise HTTPException(status_code=404, detail=f"Session {session_id} not found.")
-        
+
+        messages = data['messages']
+        next_cursor = None
+        if limit and len(messages) > limit:
+            messages = messages[:limit]
+            next_cursor = messages[-1]['message_id']
+
+        transcript = [_display_message(m) for m in messages]
+        marker = await _prompt_marker_message(data)
+        if marker and next_cursor is None:
+            # Oldest end of the transcript: first when chronological, last when paging newest first.
+            if limit:
+                transcript.append(marker)
+            else:
+                transcript.insert(0, marker)
+
         # Transcript in SessionFullDetails expects 'transcript' field
         return SessionFullDetails(
             session_id=data['session_id'],
             customer_id=data['customer_id'],
             current_flow_step=data['current_flow_step'],
             extracted_data=data['extracted_data'],
-            transcript=data['messages']
+            transcript=transcript,
+            next_cursor=next_cursor,
         )
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+def _ndjson(record: dict) -> str:
+    return codec.dumps(record) + "\n"
+
+
+@router.get("/session/{session_id}/transcript.ndjson", tags=["Agent Dashboard"])
+async def stream_session_transcript(session_id: str):
+    """
+    Streams a session as NDJSON: one `{"type": "session", ...}` line with the
+    metadata, then one `{"type": "message", ...}` line per message, oldest
+    first. Messages are read in batches, so the transcript is never held in
+    memory as a whole.
+    """
+    data = await get_session_transcript(session_id, include_messages=False)
+    if not data:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found.")
+
+    async def lines():
+        yield _ndjson({
+            "type": "session",
+            "session_id": data['session_id'],
+            "customer_id": data['customer_id'],
+            "current_flow_step": data['current_flow_step'],
+            "extracted_data": data['extracted_data'],
+        })
+        marker = await _prompt_marker_message(data)
+        if marker:
+            yield _ndjson({"type": "message", "message_id": None, **marker})
+
+        batch_size = settings.TRANSCRIPT_STREAM_BATCH_SIZE
+        after = None
+        while True:
+            batch = await get_session_messages(session_id, after=after, limit=batch_size)
+            for m in batch:
+                yield _ndjson({"type": "message", **_display_message(m)})
+            if len(batch) < batch_size:
+                break
+            after = batch[-1]['message_id']
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.post("/session/{session_id}/resolve", tags=["Agent Dashboard"])
 async def resolve_session(session_id: str):
     """Marks a session as RESOLVED in the database."""
     try:
-        success = mark_session_resolved(session_id)
+        success = await mark_session_resolved(session_id)
         if not success:
             raise HTTPException(status_code=404, detail=f"Session {session_id} not found or already closed.")
         
@@ -85,7 +354,7 @@ async def patch_ticket_status(
     Update ticket lifecycle status. `source` is accepted for dashboard compatibility.
     """
     try:
-        ok = update_ticket_status(ticket_id, req.status)
+        ok = await update_ticket_status(ticket_id, req.status)
         if not ok:
             raise HTTPException(status_code=404, detail="Ticket not found")
         return {"message": "Ticket updated", "id": ticket_id, "source": source, "status": req.status}
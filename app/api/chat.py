@@ -1,14 +1,23 @@
 
 from __future__ import annotations
 
-import json
+import asyncio
 import uuid
-from typing import Optional, Tuple
+import logging
+from typing import Callable, Optional, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 
-from app.core.ai import SYSTEM_PROMPT, get_ai_response
+from app.core import codec, tracing
+from app.core.ai import get_ai_response
 from app.core.auth_context import UserContext, get_user_context
+from app.core.classifier import AGENT_REQUEST, EMERGENCY, GREETING, classify
+from app.core.config import settings
+from app.core.journey import ISSUE_OPTIONS, ROUTING_OPTIONS, SAFETY_OPTIONS, VEHICLE_OPTIONS
+from app.core.llm_scheduler import LANE_EMERGENCY, LANE_ESCALATED, LANE_NORMAL
+from app.core.metrics import chat_stage_seconds, chat_turns, escalations
+from app.core.sse import SSE_HEADERS, format_sse
 from app.models.schemas import (
     ChatRequest,
     ChatResponseModel,
@@ -18,31 +27,26 @@ from app.models.schemas import (
     EscalateRequest,
     EscalateResponse,
 )
-from app.services.db import (
-    create_session,
-    create_ticket,
+from app.services.async_db import (
+    commit_unit_of_work,
     get_active_session,
     get_chat_history,
     get_customer_profile,
     get_open_ticket_for_session,
-    get_session_by_id,
-    save_message,
-    update_session,
 )
+from app.services import llm_cache
+from app.services.fast_path import match_structured_input, record_turn, templated_reply
+from app.services.prompts import active_prompt_id, resolve_prompt
+from app.services.summary import earlier_user_messages
+from app.services.unit_of_work import TurnUnitOfWork
 
-router = APIRouter()
-
+logger = logging.getLogger(__name__)
 
-ISSUE_OPTIONS = [
-    "Engine not starting",
-    "Flat tyre",
-    "Battery issue",
-    "Overheating",
-    "Accident / collision",
-    "Other (describe)",
-]
+router = APIRouter()
 
-SAFETY_OPTIONS = ["Yes, I am safe", "No, I need help"]
+# Streaming turns run as tasks so a client disconnect does not abort the
+# turn half-way; keep strong references until they finish.
+_stream_tasks: set[asyncio.Task] = set()
 
 
 def _normalize_state(s: Optional[str]) -> str:
@@ -66,22 +70,6 @@ def _normalize_state(s: Optional[str]) -> str:
     return "IDENTITY"
 
 
-def _user_requested_agent(text: str) -> bool:
-    t = (text or "").lower()
-    return any(w in t for w in ["talk to agent", "agent", "human", "person", "someone", "call me", "real support", "escalate"])
-
-
-def _is_emergency_keyword(text: str) -> bool:
-    t = (text or "").lower()
-    # Broad detection for emergency/danger
-    emergency_words = [
-        "emergency", "accident", "collision", "crash", "hit", "danger", "unsafe", 
-        "fire", "ambulance", "police", "help", "save", "die", "dying", "hurt", 
-        "bleeding", "pain", "injured", "hospital", "stuck", "trapped", "danger", "threat"
-    ]
-    return any(w in t for w in emergency_words)
-
-
 def _determine_service(issue_category: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
     """Return (service_type, priority)."""
     if not issue_category:
@@ -134,14 +122,16 @@ def _enforce_progression(current_state: str, facts: dict) -> str:
     return "IDENTITY"
 
 
-def _options_for_state(state: str) -> Optional[list[str]]:
+def _options_for_state(state: str, facts: Optional[dict] = None) -> Optional[list[str]]:
     state = _normalize_state(state)
     if state == "SAFETY":
+        if _coerce_bool((facts or {}).get("is_safe")) is True:
+            return VEHICLE_OPTIONS
         return SAFETY_OPTIONS
     if state == "ISSUE":
         return ISSUE_OPTIONS
     if state == "ROUTING":
-        return ["On-Spot Repair", "Towing Assistance"]
+        return ROUTING_OPTIONS
     return None
 
 
@@ -213,8 +203,20 @@ def _build_agent_context(user: UserContext, session_id: str, facts: dict, reason
     }
 
 
+def _record_escalation(reason: str, priority: str):
+    escalations.inc(reason)
+    tracing.annotate(reason=reason, priority=priority)
+
+
+def _record_reply_path(path: str):
+    chat_turns.inc(path)
+    tracing.annotate(path=path)
+
+
+@tracing.traced("escalate")
 async def _escalate_session(
     *,
+    uow: TurnUnitOfWork,
     user: UserContext,
     session_id: str,
     facts: dict,
@@ -222,11 +224,14 @@ async def _escalate_session(
     priority: str,
     user_visible_message: str,
 ) -> ChatbotMessageResponse:
-    open_ticket = get_open_ticket_for_session(session_id)
+    _record_escalation(reason, priority)
+    open_ticket = await get_open_ticket_for_session(session_id)
     if open_ticket:
         ticket_id = open_ticket["id"]
     else:
-        ticket_id = create_ticket(
+        # Id is assigned when the turn's unit of work is committed.
+        ticket_id = None
+        uow.create_ticket(
             session_id=session_id,
             user_id=user.user_id,
             source="ESCALATION",
@@ -242,7 +247,7 @@ async def _escalate_session(
     facts["priority"] = priority
     facts["escalation_reason"] = reason
 
-    update_session(session_id, "ESCALATED", facts, status="ESCALATED")
+    uow.update_session(session_id, "ESCALATED", facts, status="ESCALATED")
     
     # Dynamic Escalation Greeting based on context
     issue = facts.get("issue_category")
@@ -261,7 +266,7 @@ async def _escalate_session(
     )
     
     bot_message = f"{user_visible_message}\n\n{escalation_greeting}\n\nReplies received will be soon."
-    save_message(session_id, "assistant", bot_message)
+    uow.save_message(session_id, "assistant", bot_message)
 
     return ChatbotMessageResponse(
         message=bot_message,
@@ -276,15 +281,49 @@ async def _escalate_session(
     )
 
 
-async def _handle_chatbot_message(req: ChatbotMessageRequest, user: UserContext) -> ChatbotMessageResponse:
+async def _handle_chatbot_message(
+    req: ChatbotMessageRequest,
+    user: UserContext,
+    on_reply_delta: Optional[Callable[[str], None]] = None,
+) -> ChatbotMessageResponse:
     """
     Shared handler for both:
     - Production endpoint (header-based user context)
     - Legacy demo endpoint (body-based user context)
+    - Streaming endpoint (`on_reply_delta` receives the LLM reply as it is generated)
+
+    All writes of the turn are staged on a TurnUnitOfWork and committed in a
+    single transaction once the response is decided.
     """
-    # 0) Enrich missing profile context from host app DB (optional)
-    if not user.name or not str(user.name).strip() or not user.phone or not user.vehicle_model:
-        prof = get_customer_profile(str(user.user_id))
+    with tracing.turn() as turn_span:
+        uow = TurnUnitOfWork()
+        res = await _run_chatbot_turn(req, user, uow, on_reply_delta)
+        with chat_stage_seconds.time("ticket_commit" if uow.ticket else "commit"):
+            ticket_id = await commit_unit_of_work(uow)
+        if res.should_escalate and res.ticket_id is None:
+            res.ticket_id = ticket_id
+        turn_span.set(state_after=res.state, escalated=res.should_escalate)
+        return res
+
+
+async def _run_chatbot_turn(
+    req: ChatbotMessageRequest,
+    user: UserContext,
+    uow: TurnUnitOfWork,
+    on_reply_delta: Optional[Callable[[str], None]] = None,
+) -> ChatbotMessageResponse:
+    # 0) Enrich missing profile context from host app DB (optional).
+    # The profile lookup and the session load are independent, so run them concurrently.
+    needs_profile = not user.name or not str(user.name).strip() or not user.phone or not user.vehicle_model
+    if needs_profile:
+        prof, session = await asyncio.gather(
+            chat_stage_seconds.timed(get_customer_profile(str(user.user_id)), "profile_lookup"),
+            chat_stage_seconds.timed(get_active_session(str(user.user_id)), "session_load"),
+        )
+    else:
+        session = await chat_stage_seconds.timed(get_active_session(str(user.user_id)), "session_load")
+
+    if needs_profile:
         if prof:
             user = UserContext(
                 user_id=str(user.user_id),
@@ -301,8 +340,6 @@ async def _handle_chatbot_message(req: ChatbotMessageRequest, user: UserContext)
             )
 
     # 1) Load or create session (one active session per user_id)
-    session = get_active_session(str(user.user_id))
-
     is_new_session = False
     if not session:
         is_new_session = True
@@ -313,10 +350,10 @@ async def _handle_chatbot_message(req: ChatbotMessageRequest, user: UserContext)
             "vehicle_model": user.vehicle_model,
             "unclear_count": 0,
         }
-        create_session(
+        uow.create_session(
             session_id=session_id,
             customer_id=str(user.user_id),
-            system_prompt=SYSTEM_PROMPT,
+            prompt_version_id=active_prompt_id(),
             initial_data=initial_data,
             initial_flow_step="IDENTITY",
         )
@@ -326,12 +363,15 @@ async def _handle_chatbot_message(req: ChatbotMessageRequest, user: UserContext)
             "extracted_data": initial_data,
             "current_flow_step": "IDENTITY",
             "status": "ACTIVE",
+            "prompt_version_id": active_prompt_id(),
         }
+    else:
+        uow.track_session(session)
 
     session_id = session["session_id"]
     facts = session.get("extracted_data") or {}
     if isinstance(facts, str):
-        facts = json.loads(facts)
+        facts = codec.loads(facts)
 
     # Clean obvious Swagger placeholders from stored facts
     if str(facts.get("address", "")).strip().lower() in ["string", "n/a", "na", "none"]:
@@ -352,6 +392,7 @@ async def _handle_chatbot_message(req: ChatbotMessageRequest, user: UserContext)
         facts["vehicle_model"] = user.vehicle_model
 
     # 2) Apply structured location from client (app/web)
+    has_request_location = False
     if req.location:
         lat = req.location.latitude
         lng = req.location.longitude
@@ -365,24 +406,35 @@ async def _handle_chatbot_message(req: ChatbotMessageRequest, user: UserContext)
                 facts["address"] = addr
             if (lat is not None) or (lng is not None) or (addr and addr.strip().lower() != "string"):
                 facts["location_confirmed"] = True
+                has_request_location = True
 
-    # 3) Persist user message
+    # 3) Persist user message and append it to the session's log of user messages
     user_message = req.message
-    save_message(session_id, "user", user_message)
+    current_state = _normalize_state(session.get("current_flow_step"))
+    tracing.annotate(session_id=session_id, state_before=current_state, new_session=is_new_session)
+    previous_summary = session.get("conversation_summary")
+    uow.save_message(session_id, "user", user_message)
+    uow.add_summary_turn(session_id, previous_summary, current_state, user_message)
+
+    # Emergency / agent-request / greeting keywords, matched once for the whole turn
+    keywords = classify(user_message)
+    emergency_keyword = EMERGENCY in keywords
+    user_requested_human = AGENT_REQUEST in keywords
 
     # If this session is already escalated, check if the user is trying to restart
     is_escalated = str(session.get("status", "")).upper() == "ESCALATED"
     if is_escalated:
-        greetings = ["hi", "hello", "start", "restart", "menu", "status"]
-        if any(g in user_message.lower() for g in greetings):
-             update_session(session_id, "RESOLVED", facts, status="RESOLVED")
-             return await _handle_chatbot_message(req, user)
+        if GREETING in keywords:
+             uow.update_session(session_id, "RESOLVED", facts, status="RESOLVED")
+             # Close the old session before the fresh turn looks up the active one.
+             await commit_unit_of_work(uow)
+             return await _handle_chatbot_message(req, user, on_reply_delta)
 
     # Swagger UI commonly sends placeholder "string" as message; do not escalate on that.
     if str(user_message).strip().lower() == "string":
         bot_message = f"Welcome! I'm here to help. Could you please confirm your registered mobile number?"
-        update_session(session_id, "IDENTITY", facts, status="ACTIVE")
-        save_message(session_id, "assistant", bot_message)
+        uow.update_session(session_id, "IDENTITY", facts, status="ACTIVE")
+        uow.save_message(session_id, "assistant", bot_message)
         return ChatbotMessageResponse(
             message=bot_message,
             state="IDENTITY",
@@ -395,24 +447,117 @@ async def _handle_chatbot_message(req: ChatbotMessageRequest, user: UserContext)
             extracted_data=facts,
         )
 
-    # 4) Build LLM history (system prompt stored in DB + current context injection)
-    history = get_chat_history(session_id, limit=12)
-    current_state = _normalize_state(session.get("current_flow_step"))
+    # Only stream the LLM reply when it can end up in front of the user: escalated
+    # sessions and messages that will trigger a keyword escalation get templated replies.
+    stream_reply = on_reply_delta
+    if is_escalated or user_requested_human or emergency_keyword:
+        stream_reply = None
+
+    # 4) Structured inputs (option buttons, GPS shares, bare phone numbers) need no LLM:
+    # take the facts directly and answer with the template for the resulting step.
+    fast = match_structured_input(current_state, user_message, req.message_type, has_request_location)
+    record_turn(fast[0] if fast else None)
+    if fast:
+        _record_reply_path("fast_path")
+        _, fast_facts = fast
+        fast_merged = _merge_facts(facts, fast_facts)
+        next_step = _enforce_progression(current_state, fast_merged)
+        ai_res = {
+            "intent": "SUPPORT",
+            "emergency_level": "LOW",
+            "confidence": 1.0,
+            "extracted_data": fast_facts,
+            "next_step": next_step,
+            "user_reply": templated_reply(next_step, fast_merged),
+        }
+        if stream_reply:
+            stream_reply(ai_res["user_reply"])
+    else:
+        # Repeated short answers at the same step reuse an earlier completion.
+        llm_key = None if is_escalated else llm_cache.cache_key(current_state, user_message, facts, session.get("prompt_version_id"))
+        ai_res = llm_cache.get(llm_key)
+        if ai_res is not None:
+            _record_reply_path("llm_cache")
+            if stream_reply and ai_res.get("user_reply"):
+                stream_reply(ai_res["user_reply"])
+
+    if ai_res is None:
+        # 5) Build LLM context: the session's system prompt version, current facts, the log of
+        # earlier user messages, and only the last few raw messages. Writes staged this turn
+        # (the user message) are not committed yet, so append them to what is already persisted.
+        recent_limit = settings.LLM_RECENT_MESSAGES
+        history_rows = await chat_stage_seconds.timed(
+            get_chat_history(session_id, limit=recent_limit, include_system=False), "history_load"
+        )
+        recent = history_rows + [
+            m for m in uow.pending_messages(session_id) if m["role"] != "system"
+        ]
+        recent = recent[-recent_limit:]
+        # The log's newest lines are user messages `recent` already carries. The current
+        # message is in `recent` but not in previous_summary, hence the -1.
+        earlier = earlier_user_messages(previous_summary, sum(1 for m in recent if m["role"] == "user") - 1)
+
+        context_msg = {
+            "role": "system",
+            "content": (
+                f"AUTH_CONTEXT: user_id={user.user_id}, name={user.name}, phone={user.phone}, vehicle_model={user.vehicle_model}. "
+                f"CURRENT_STATE: {current_state}. "
+                f"FACTS_JSON: {codec.dumps(facts)}. "
+                f"EARLIER_USER_MESSAGES (oldest first, before the messages below): {earlier or 'none'}. "
+                "INSTRUCTION: Follow the journey: Identity -> Location -> Safety -> Issue -> Routing. Ask one clear question for the current step. "
+                "Safety and proximity check must be confirmed before identifying the issue. "
+                "If user is in danger or distress, escalate immediately."
+            ),
+        }
+        system_prompt = await resolve_prompt(session.get("prompt_version_id"))
+        history = [{"role": "system", "content": system_prompt}, context_msg] + recent
+
+        # Emergencies and sessions already with an agent jump the LLM queue under load.
+        if emergency_keyword:
+            lane = LANE_EMERGENCY
+        elif is_escalated:
+            lane = LANE_ESCALATED
+        else:
+            lane = LANE_NORMAL
+        _record_reply_path("llm")
+        ai_res = await chat_stage_seconds.timed(
+            get_ai_response(history, on_reply_delta=stream_reply, lane=lane), "llm"
+        )
+        llm_cache.store(
+            llm_key,
+            ai_res,
+            volatile_values=[user.name, user.phone, (user.phone or "")[-4:], user.vehicle_model, facts.get("address")],
+        )
+    with chat_stage_seconds.time("state_machine"):
+        return await _decide_turn(
+            uow=uow,
+            user=user,
+            session=session,
+            facts=facts,
+            ai_res=ai_res,
+            current_state=current_state,
+            is_new_session=is_new_session,
+            is_escalated=is_escalated,
+            emergency_keyword=emergency_keyword,
+            user_requested_human=user_requested_human,
+        )
 
-    context_msg = {
-        "role": "system",
-        "content": (
-            f"AUTH_CONTEXT: user_id={user.user_id}, name={user.name}, phone={user.phone}, vehicle_model={user.vehicle_model}. "
-            f"CURRENT_STATE: {current_state}. "
-            f"FACTS_JSON: {json.dumps(facts)}. "
-            "INSTRUCTION: Follow the journey: Identity -> Location -> Safety -> Issue -> Routing. Ask one clear question for the current step. "
-            "Safety and proximity check must be confirmed before identifying the issue. "
-            "If user is in danger or distress, escalate immediately."
-        ),
-    }
-    history.insert(0, context_msg)
 
-    ai_res = await get_ai_response(history)
+async def _decide_turn(
+    *,
+    uow: TurnUnitOfWork,
+    user: UserContext,
+    session: dict,
+    facts: dict,
+    ai_res: dict,
+    current_state: str,
+    is_new_session: bool,
+    is_escalated: bool,
+    emergency_keyword: bool,
+    user_requested_human: bool,
+) -> ChatbotMessageResponse:
+    """Steps 6-9: merge the model's facts, apply the routing and escalation rules, stage the reply."""
+    session_id = session["session_id"]
     ai_confidence = float(ai_res.get("confidence", 1.0) or 0.0)
     ai_extracted = ai_res.get("extracted_data", {}) if isinstance(ai_res.get("extracted_data", {}), dict) else {}
     facts = _merge_facts(facts, ai_extracted)
@@ -426,7 +571,6 @@ async def _handle_chatbot_message(req: ChatbotMessageRequest, user: UserContext)
 
     # 7) Unclear response tracking + escalation triggers
     unclear_count = int(facts.get("unclear_count") or 0)
-    user_requested_human = _user_requested_agent(user_message)
 
     state_after = _enforce_progression(current_state, facts)
 
@@ -436,6 +580,7 @@ async def _handle_chatbot_message(req: ChatbotMessageRequest, user: UserContext)
     is_safe_val = _coerce_bool(facts.get("is_safe"))
     if is_safe_val is False:
         return await _escalate_session(
+            uow=uow,
             user=user,
             session_id=session_id,
             facts=facts,
@@ -476,7 +621,7 @@ async def _handle_chatbot_message(req: ChatbotMessageRequest, user: UserContext)
     if is_escalated:
         should_escalate = False
     else:
-        is_emergency = _is_emergency_keyword(user_message)
+        is_emergency = emergency_keyword
         should_escalate = (
             user_requested_human
             or is_emergency
@@ -507,6 +652,7 @@ async def _handle_chatbot_message(req: ChatbotMessageRequest, user: UserContext)
             esc_msg = f"I'm connecting you to an agent, but first, could you please provide your {' and '.join(needed)} so they can help you faster?"
 
         return await _escalate_session(
+            uow=uow,
             user=user,
             session_id=session_id,
             facts=facts,
@@ -517,7 +663,7 @@ async def _handle_chatbot_message(req: ChatbotMessageRequest, user: UserContext)
 
     # 8) Handle post-escalation responses (if already escalated)
     if is_escalated:
-        open_ticket = get_open_ticket_for_session(session_id)
+        open_ticket = await get_open_ticket_for_session(session_id)
         ticket_id = open_ticket["id"] if open_ticket else None
         
         # Check what we had BEFORE this message vs NOW
@@ -538,8 +684,8 @@ async def _handle_chatbot_message(req: ChatbotMessageRequest, user: UserContext)
         else:
             bot_message = "Agent Sarah is reviewing your case. Please stay safe; our team is arranging assistance now."
             
-        update_session(session_id, "ESCALATED", facts, status="ESCALATED")
-        save_message(session_id, "assistant", bot_message)
+        uow.update_session(session_id, "ESCALATED", facts, status="ESCALATED")
+        uow.save_message(session_id, "assistant", bot_message)
         return ChatbotMessageResponse(
             message=bot_message,
             state="ESCALATED",
@@ -563,10 +709,12 @@ async def _handle_chatbot_message(req: ChatbotMessageRequest, user: UserContext)
             bot_message = "Thank you for confirming your mobile number. Now, could you please provide your current location? You can share your GPS coordinates or a typed address."
 
     if state_after == "SAFETY" and (current_state == "LOCATION" or current_state == "SAFETY"):
-        if facts.get("is_safe") is None or facts.get("is_with_vehicle") is None:
+        if facts.get("is_safe") is None:
              bot_message = "I've recorded your location. To ensure we can help you properly: Are you safe and are you currently with the vehicle?"
         elif not facts.get("is_safe"):
              bot_message = "I'm concerned for your safety. Are you in a safe location away from traffic?"
+        elif facts.get("is_with_vehicle") is None:
+             bot_message = "I'm glad you are safe. Are you currently with the vehicle?"
         elif not facts.get("is_with_vehicle"):
              bot_message = "I'm glad you are safe. However, for us to assist you with the vehicle, we need to know if you are currently with it. Are you at the car's location?"
             
@@ -581,13 +729,13 @@ async def _handle_chatbot_message(req: ChatbotMessageRequest, user: UserContext)
     if state_after == "CONFIRMATION":
         bot_message = "Thank you! Your service has been booked. Our team will reach you soon."
         
-    update_session(session_id, state_after, facts, status="ACTIVE")
-    save_message(session_id, "assistant", bot_message)
+    uow.update_session(session_id, state_after, facts, status="ACTIVE")
+    uow.save_message(session_id, "assistant", bot_message)
 
     return ChatbotMessageResponse(
         message=bot_message,
         state=state_after,
-        options=_options_for_state(state_after),
+        options=_options_for_state(state_after, facts),
         should_escalate=False,
         ticket_id=None,
         escalation_reason=None,
@@ -608,39 +756,93 @@ async def chatbot_message(
     return await _handle_chatbot_message(req=req, user=user)
 
 
+@router.post("/chatbot/message/stream", tags=["Chatbot"])
+async def chatbot_message_stream(
+    req: ChatbotMessageRequest,
+    user: UserContext = Depends(get_user_context),
+):
+    """
+    Server-Sent Events variant of `/chatbot/message`.
+
+    Emits `token` events (`{"text": ...}`) with the reply as the model generates it,
+    then one `final` event carrying the full ChatbotMessageResponse. The deterministic
+    overrides and escalation checks still run, so the `final` message is authoritative
+    and may replace the streamed text. Failures end the stream with an `error` event.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run_turn():
+        try:
+            res = await _handle_chatbot_message(
+                req=req,
+                user=user,
+                on_reply_delta=lambda text: queue.put_nowait(("token", {"text": text})),
+            )
+            queue.put_nowait(("final", res.model_dump(mode="json")))
+        except Exception as e:
+            logger.exception("Streaming chat turn failed")
+            queue.put_nowait(("error", {"detail": str(e)}))
+
+    task = asyncio.create_task(run_turn())
+    _stream_tasks.add(task)
+    task.add_done_callback(_stream_tasks.discard)
+
+    async def events():
+        while True:
+            event, data = await queue.get()
+            yield format_sse(event, data)
+            if event in ("final", "error"):
+                break
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
 @router.post("/chatbot/escalate", response_model=EscalateResponse, tags=["Chatbot"])
 async def chatbot_escalate(
     req: EscalateRequest,
     user: UserContext = Depends(get_user_context),
 ):
-    session = get_active_session(str(user.user_id))
+    return await _escalate_on_request(req, user)
+
+
+@tracing.traced("escalate")
+async def _escalate_on_request(req: EscalateRequest, user: UserContext) -> EscalateResponse:
+    uow = TurnUnitOfWork()
+    session = await get_active_session(str(user.user_id))
     if not session:
         # Create session if it doesn't exist but user wants to escalate
         session_id = str(uuid.uuid4())
         initial_data = {"unclear_count": 0}
-        create_session(
+        uow.create_session(
             session_id=session_id,
             customer_id=str(user.user_id),
-            system_prompt=SYSTEM_PROMPT,
+            prompt_version_id=active_prompt_id(),
             initial_data=initial_data,
             initial_flow_step="ESCALATED",
         )
         session_id_val = session_id
         facts = initial_data
     else:
+        uow.track_session(session)
         session_id_val = session["session_id"]
         facts = session.get("extracted_data") or {}
         if isinstance(facts, str):
-            facts = json.loads(facts)
+            facts = codec.loads(facts)
 
     if req.collected_context:
         facts = _merge_facts(facts, req.collected_context)
 
-    open_ticket = get_open_ticket_for_session(session_id_val)
+    _record_escalation(req.reason, req.priority)
+    open_ticket = await get_open_ticket_for_session(session_id_val)
     if open_ticket:
         ticket_id = open_ticket["id"]
     else:
-        ticket_id = create_ticket(
+        ticket_id = None
+        uow.create_ticket(
             session_id=session_id_val,
             user_id=user.user_id,
             source="ESCALATION",
@@ -652,8 +854,11 @@ async def chatbot_escalate(
             vehicle_model=user.vehicle_model,
         )
 
-    update_session(session_id_val, "ESCALATED", facts, status="ESCALATED")
-    save_message(session_id_val, "assistant", "I’m connecting you to a human agent now.")
+    uow.update_session(session_id_val, "ESCALATED", facts, status="ESCALATED")
+    uow.save_message(session_id_val, "assistant", "I’m connecting you to a human agent now.")
+    created_ticket_id = await commit_unit_of_work(uow)
+    if ticket_id is None:
+        ticket_id = created_ticket_id
 
     return EscalateResponse(ticket_id=int(ticket_id), status="OPEN")
 
@@ -1,13 +1,28 @@
 
-from openai import AsyncOpenAI
-import json
+from openai import AsyncOpenAI, RateLimitError
 import logging
+import time
+from typing import AsyncIterator, Callable, Optional
+from app.core import cassette as cassettes
+from app.core import codec, tracing
 from app.core.config import settings
+from app.core.json_stream import JsonFieldStreamer
+from app.core.llm_scheduler import LANE_NORMAL, LLMScheduler
+from app.core.metrics import llm_calls, llm_tokens
 
 logger = logging.getLogger(__name__)
 
 # Initialize AsyncOpenAI without custom proxies
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
+
+# Set from LLM_CASSETTE_MODE; the replay benchmark swaps in its own.
+cassette: Optional[cassettes.Cassette] = cassettes.from_settings()
+
+scheduler = LLMScheduler(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    max_queue=settings.LLM_MAX_QUEUE,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+)
 
 SYSTEM_PROMPT = """You are the 1Charge AI Roadside Assistance Concierge.
 
@@ -56,24 +71,118 @@ You MUST respond ONLY in valid JSON.
   "user_reply": "string"
 }"""
 
-async def get_ai_response(messages: list):
+_FALLBACK_RESPONSE = {
+    "intent": "ERROR",
+    "emergency_level": "HIGH",
+    "confidence": 0.0,
+    "extracted_data": {},
+    "next_step": "ESCALATED",
+    "user_reply": "I am experiencing a technical issue but I'm here to ensure your safety. Please stay away from traffic and wait while I connect you to a human agent."
+}
+
+# Returned when the turn was not admitted by the scheduler or OpenAI rate-limited
+# us. Unlike the ERROR fallback it does not escalate: the turn keeps its state and
+# the flow re-asks the current step (keyword/safety escalations still apply).
+_BUSY_RESPONSE = {
+    "intent": "BUSY",
+    "emergency_level": "LOW",
+    "confidence": 1.0,
+    "extracted_data": {},
+    "next_step": None,
+    "user_reply": "We're handling a lot of requests right now. Please bear with me for a moment and send that again."
+}
+
+
+def _completion_params(messages: list) -> dict:
+    return dict(
+        model="gpt-4o-mini",
+        messages=messages,
+        response_format={ "type": "json_object" },
+        max_tokens=500,
+        temperature=0.7
+    )
+
+
+async def get_ai_response(
+    messages: list,
+    on_reply_delta: Optional[Callable[[str], None]] = None,
+    lane: str = LANE_NORMAL,
+):
+    """
+    Run one completion and return the parsed JSON object.
+
+    With `on_reply_delta`, the completion is streamed and the `user_reply`
+    field is decoded incrementally, calling `on_reply_delta(text)` with each
+    new piece as it arrives. The return value is the same either way.
+
+    The call waits for a slot in the scheduler's `lane` first; if it is not
+    admitted in time the busy fallback is returned without calling OpenAI.
+    """
+    with tracing.span("llm", lane=lane) as span:
+        queued = time.perf_counter()
+        async with scheduler.slot(lane) as admitted:
+            span.set(admitted=admitted, queue_ms=round((time.perf_counter() - queued) * 1000, 3))
+            if not admitted:
+                logger.warning(f"LLM busy: {lane} turn not admitted")
+                _outcome("not_admitted")
+                return dict(_BUSY_RESPONSE)
+            return await _complete(messages, on_reply_delta)
+
+
+def _outcome(outcome: str):
+    llm_calls.inc(outcome)
+    tracing.annotate(outcome=outcome)
+
+
+def _count_tokens(usage):
+    if usage is not None:
+        llm_tokens.inc("prompt", amount=usage.prompt_tokens or 0)
+        llm_tokens.inc("completion", amount=usage.completion_tokens or 0)
+
+
+async def _fetch(params: dict) -> str:
+    response = await client.chat.completions.create(**params)
+    _count_tokens(response.usage)
+    return response.choices[0].message.content
+
+
+async def _fetch_stream(params: dict) -> AsyncIterator[str]:
+    # The usage totals arrive in a final chunk with no choices.
+    stream = await client.chat.completions.create(**params, stream=True, stream_options={"include_usage": True})
+    async for chunk in stream:
+        if not chunk.choices:
+            _count_tokens(chunk.usage)
+            continue
+        piece = chunk.choices[0].delta.content
+        if piece:
+            yield piece
+
+
+async def _complete(messages: list, on_reply_delta: Optional[Callable[[str], None]]):
+    params = _completion_params(messages)
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            response_format={ "type": "json_object" },
-            max_tokens=500,
-            temperature=0.7
-        )
-        content = response.choices[0].message.content
-        return json.loads(content)
+        if on_reply_delta is None:
+            content = await (cassette.complete(params, _fetch) if cassette else _fetch(params))
+            result = codec.loads(content)
+            _outcome("ok")
+            return result
+
+        pieces = cassette.stream(params, _fetch_stream) if cassette else _fetch_stream(params)
+        reply = JsonFieldStreamer("user_reply")
+        parts = []
+        async for piece in pieces:
+            parts.append(piece)
+            text = reply.feed(piece)
+            if text:
+                on_reply_delta(text)
+        result = codec.loads("".join(parts))
+        _outcome("ok")
+        return result
+    except RateLimitError as e:
+        logger.warning(f"AI rate limited: {e}")
+        _outcome("rate_limited")
+        return dict(_BUSY_RESPONSE)
     except Exception as e:
         logger.error(f"AI Error: {e}")
-        return {
-            "intent": "ERROR",
-            "emergency_level": "HIGH",
-            "confidence": 0.0,
-            "extracted_data": {},
-            "next_step": "ESCALATED",
-            "user_reply": "I am experiencing a technical issue but I'm here to ensure your safety. Please stay away from traffic and wait while I connect you to a human agent."
-        }
+        _outcome("error")
+        return dict(_FALLBACK_RESPONSE)
@@ -0,0 +1,189 @@
+"""
+Record/replay cassettes for OpenAI chat completions.
+
+In record mode every completion `get_ai_response` makes is appended to a
+JSONL cassette: the request, the raw model output and its timing (for
+streamed calls, every chunk with its offset). In replay mode the same
+requests are answered from the cassette without calling OpenAI, returning
+the recorded text byte-for-byte, either with the recorded latency or
+with none, so a conversation runs through the handlers the same way every
+time.
+
+A replayed request is matched on the full request first, with the per-run
+ids in the system messages (user and session ids, UUIDs) replaced by
+placeholders so a replay under fresh ids still matches exactly. If nothing
+matches, it falls back to the conversation alone (model plus the non-system
+messages), so a recording survives changes to the system prompt or the
+per-turn context line. Requests recorded more than once are served in
+recorded order. A request with no recording raises CassetteMiss.
+
+    LLM_CASSETTE_MODE=record LLM_CASSETTE_PATH=run.jsonl python main.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from app.core import codec
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+RECORD = "record"
+REPLAY = "replay"
+
+LATENCY_ORIGINAL = "original"
+LATENCY_ZERO = "zero"
+
+
+class CassetteMiss(LookupError):
+    """Replay mode got a request that was never recorded."""
+
+
+def _hash(obj) -> str:
+    return hashlib.sha256(codec.dumpb(obj)).hexdigest()
+
+
+_PER_RUN_IDS = (
+    (re.compile(r"\b(user_id|session_id)=[^,\s]+"), r"\1=*"),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.I), "<uuid>"),
+)
+
+
+def _without_run_ids(message: dict) -> dict:
+    content = message.get("content")
+    if message.get("role") != "system" or not isinstance(content, str):
+        return message
+    for pattern, placeholder in _PER_RUN_IDS:
+        content = pattern.sub(placeholder, content)
+    return {**message, "content": content}
+
+
+def request_key(params: dict) -> str:
+    normalized = {k: v for k, v in sorted(params.items()) if k != "stream"}
+    if "messages" in normalized:
+        normalized["messages"] = [_without_run_ids(m) for m in normalized["messages"] or []]
+    return _hash(normalized)
+
+
+def conversation_key(params: dict) -> str:
+    turns = [(m.get("role"), m.get("content")) for m in params.get("messages") or [] if m.get("role") != "system"]
+    return _hash({"model": params.get("model"), "turns": turns})
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str, latency: str = LATENCY_ORIGINAL):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"cassette mode must be {RECORD!r} or {REPLAY!r}, not {mode!r}")
+        if latency not in (LATENCY_ORIGINAL, LATENCY_ZERO):
+            raise ValueError(f"cassette latency must be {LATENCY_ORIGINAL!r} or {LATENCY_ZERO!r}, not {latency!r}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._by_key: dict[str, list[dict]] = defaultdict(list)
+        self._by_conversation: dict[str, list[dict]] = defaultdict(list)
+        self._served: dict[tuple[str, str], int] = defaultdict(int)
+        self.stats = {"recorded": 0, "exact_hits": 0, "conversation_hits": 0, "misses": 0}
+        if mode == REPLAY:
+            self._load()
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = codec.loads(line)
+                self._by_key[entry["key"]].append(entry)
+                self._by_conversation[entry["conversation_key"]].append(entry)
+        logger.info(f"Replaying LLM cassette {self.path} ({sum(len(v) for v in self._by_key.values())} completions)")
+
+    def _append(self, entry: dict):
+        with self._lock:
+            with open(self.path, "ab") as f:
+                f.write(codec.dumpb(entry) + b"\n")
+            self.stats["recorded"] += 1
+
+    def _entry(self, params: dict) -> dict:
+        for kind, index, key in (
+            ("exact_hits", self._by_key, request_key(params)),
+            ("conversation_hits", self._by_conversation, conversation_key(params)),
+        ):
+            entries = index.get(key)
+            if entries:
+                with self._lock:
+                    n = self._served[(kind, key)]
+                    self._served[(kind, key)] = n + 1
+                    self.stats[kind] += 1
+                return entries[n % len(entries)]
+        with self._lock:
+            self.stats["misses"] += 1
+        raise CassetteMiss(f"no recorded completion for request {request_key(params)[:12]}")
+
+    def _record_entry(self, params: dict, stream: bool, content: str, latency: float, chunks=None) -> dict:
+        entry = {
+            "key": request_key(params),
+            "conversation_key": conversation_key(params),
+            "model": params.get("model"),
+            "stream": stream,
+            "messages": params.get("messages"),
+            "content": content,
+            "latency": round(latency, 6),
+        }
+        if chunks is not None:
+            entry["chunks"] = chunks
+        return entry
+
+    async def _sleep_until(self, started: float, offset: float):
+        if self.latency == LATENCY_ORIGINAL:
+            delay = offset - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def complete(self, params: dict, fetch: Callable[[dict], Awaitable[str]]) -> str:
+        """Model output for a plain completion; `fetch` calls the real API."""
+        if self.mode == REPLAY:
+            entry = self._entry(params)
+            await self._sleep_until(time.perf_counter(), entry["latency"])
+            return entry["content"]
+
+        started = time.perf_counter()
+        content = await fetch(params)
+        self._append(self._record_entry(params, False, content, time.perf_counter() - started))
+        return content
+
+    async def stream(self, params: dict, fetch: Callable[[dict], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Content pieces of a streamed completion; `fetch` streams from the real API."""
+        if self.mode == REPLAY:
+            entry = self._entry(params)
+            started = time.perf_counter()
+            # Completions recorded without streaming come back as one piece.
+            for offset, piece in entry.get("chunks") or [[entry["latency"], entry["content"]]]:
+                await self._sleep_until(started, offset)
+                yield piece
+            return
+
+        started = time.perf_counter()
+        chunks = []
+        async for piece in fetch(params):
+            chunks.append([round(time.perf_counter() - started, 6), piece])
+            yield piece
+        content = "".join(piece for _, piece in chunks)
+        self._append(self._record_entry(params, True, content, time.perf_counter() - started, chunks))
+
+
+def from_settings() -> Optional[Cassette]:
+    mode = (settings.LLM_CASSETTE_MODE or "").strip().lower()
+    if not mode:
+        return None
+    if mode == REPLAY and not os.path.exists(settings.LLM_CASSETTE_PATH):
+        raise FileNotFoundError(f"LLM cassette {settings.LLM_CASSETTE_PATH} not found")
+    return Cassette(settings.LLM_CASSETTE_PATH, mode, settings.LLM_CASSETTE_LATENCY)
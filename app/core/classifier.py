@@ -0,0 +1,158 @@
+"""
+Keyword classifier for chat messages.
+
+Every lexicon (emergency words, agent requests, restart greetings, safety
+answers) is compiled into one regular expression, so a message is lower-cased
+and scanned once and comes back with the set of lexicons it hit. Terms only
+match as whole words: "hit" does not fire on "white", "pain" not on "spain",
+"die" not on "diesel". Python's `\\b` treats Indic vowel signs and viramas as
+word breaks ("आग", fire, would match inside "आगे", ahead), so the boundary
+here also counts the Indic script blocks as word characters.
+
+A term ending in "*" is a stem and matches any word it starts: "crash*"
+covers "crashed" and "crashing", "injur*" covers "injury" and "injuries".
+Short words that would over-match as stems ("hit", "die", "pain") list their
+inflections instead.
+
+Longer terms win where terms overlap, so "not safe" is one UNSAFE hit and
+does not also count as SAFE.
+
+The lexicons can be replaced or extended with a JSON file named by
+KEYWORD_LEXICONS_FILE: `{"emergency": ["..."], "my_lexicon": ["..."]}`.
+Each lexicon in the file replaces the built-in one of the same name.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from typing import Iterable, Mapping, Optional
+
+from app.core import codec
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+EMERGENCY = "emergency"
+AGENT_REQUEST = "agent_request"
+GREETING = "greeting"
+SAFE = "safe"
+UNSAFE = "unsafe"
+
+DEFAULT_LEXICONS: dict[str, tuple[str, ...]] = {
+    EMERGENCY: (
+        "emergenc*", "accident*", "collision*", "collided", "crash*", "hit", "hits", "danger*", "unsafe",
+        "fire", "fires", "fired", "ambulance*", "police*", "help", "save", "die", "dying",
+        "hurt*", "bleed*", "bled", "pain", "painful", "injur*", "hospital*", "stuck", "trapped",
+        "threat*",
+        # Hindi / Hinglish
+        "दुर्घटना", "एक्सीडेंट", "टक्कर", "आग", "खून", "चोट", "दर्द", "खतरा", "मदद", "बचाओ", "एम्बुलेंस", "पुलिस",
+        "durghatna", "takkar", "khoon", "chot", "dard", "khatra", "madad", "bachao",
+        # Kannada
+        "ಅಪಘಾತ", "ಬೆಂಕಿ", "ಸಹಾಯ", "ರಕ್ತ", "ಅಪಾಯ",
+        # Tamil
+        "விபத்து", "தீ", "உதவி", "ரத்தம்", "ஆபத்து",
+        # Telugu
+        "ప్రమాదం", "మంట", "సహాయం", "రక్తం",
+    ),
+    AGENT_REQUEST: (
+        "talk to agent", "agent*", "human", "humans", "person", "someone", "call me", "real support", "escalate",
+        "customer care",
+        "एजेंट", "इंसान", "कॉल करो", "insaan", "call karo", "baat karni hai",
+        "ಏಜೆಂಟ್", "ஏஜென்ட்", "ఏజెంట్",
+    ),
+    # Messages that restart an escalated session.
+    GREETING: (
+        "hi", "hello", "start", "restart", "menu", "status",
+        "namaste", "नमस्ते", "ನಮಸ್ಕಾರ", "வணக்கம்", "నమస్కారం",
+    ),
+    SAFE: (
+        "yes", "safe", "ok", "okay", "fine", "yeah", "with the vehicle",
+        "haan", "han", "theek hai", "हाँ", "हां", "ठीक है", "सुरक्षित",
+        "ಹೌದು", "ஆம்", "అవును",
+    ),
+    UNSAFE: (
+        "no", "unsafe", "not safe", "help", "danger", "not ok", "not okay", "not fine",
+        "nahi", "nahin", "नहीं", "असुरक्षित", "खतरा", "मदद",
+        "ಇಲ್ಲ", "இல்லை", "లేదు",
+    ),
+}
+
+# Characters that continue a word: \w plus the Indic blocks (Devanagari .. Sinhala),
+# whose combining vowel signs and viramas are not \w, and ZWNJ / ZWJ.
+_WORD_CHARS = r"\w\u0900-\u0DFF\u200c\u200d"
+
+
+def _term_pattern(term: str) -> str:
+    if term.endswith("*"):
+        return _term_pattern(term[:-1]) + f"[{_WORD_CHARS}]*"
+    return r"\s+".join(re.escape(part) for part in term.split())
+
+
+def _normalize_term(term: str) -> str:
+    return " ".join(term.lower().split())
+
+
+class KeywordClassifier:
+    def __init__(self, lexicons: Mapping[str, Iterable[str]]):
+        self.lexicons = {name: tuple(terms) for name, terms in lexicons.items()}
+        labels_by_term: dict[str, set[str]] = {}
+        for name, terms in self.lexicons.items():
+            for term in terms:
+                term = _normalize_term(term)
+                if term:
+                    labels_by_term.setdefault(term, set()).add(name)
+        self._labels = {term: frozenset(names) for term, names in labels_by_term.items()}
+        self._stems = sorted(
+            ((term[:-1], term) for term in self._labels if term.endswith("*") and len(term) > 1),
+            key=lambda stem: len(stem[0]), reverse=True,
+        )
+        # Longest first so the alternation prefers "not safe" over "not" / "safe".
+        alternation = "|".join(_term_pattern(t) for t in sorted(self._labels, key=len, reverse=True))
+        self._pattern = re.compile(rf"(?<![{_WORD_CHARS}])(?:{alternation})(?![{_WORD_CHARS}])") if alternation else None
+
+    def matches(self, text: Optional[str]) -> list[tuple[str, frozenset]]:
+        """Every (term, lexicons) hit in `text`, in order."""
+        if not text or self._pattern is None:
+            return []
+        return [self._lookup(_normalize_term(m.group())) for m in self._pattern.finditer(text.lower())]
+
+    def _lookup(self, word: str) -> tuple[str, frozenset]:
+        # An exact term and the stems that also cover it ("help" and "help*") may
+        # sit in different lexicons; the regex reports the word once, so merge them.
+        term, labels = (word, self._labels[word]) if word in self._labels else (None, frozenset())
+        for stem, stem_term in self._stems:
+            if word.startswith(stem):
+                term = term or stem_term
+                labels |= self._labels[stem_term]
+        return term, labels
+
+    def classify(self, text: Optional[str]) -> frozenset:
+        """Names of the lexicons `text` hits."""
+        labels: set[str] = set()
+        for _, names in self.matches(text):
+            labels |= names
+        return frozenset(labels)
+
+
+def load_lexicons(path: Optional[str] = None) -> dict[str, tuple[str, ...]]:
+    """Built-in lexicons, with the ones in the JSON file at `path` replacing them."""
+    lexicons = dict(DEFAULT_LEXICONS)
+    if not path:
+        return lexicons
+    try:
+        with open(path, "rb") as f:
+            custom = codec.loads(f.read())
+        for name, terms in custom.items():
+            lexicons[name] = tuple(str(t) for t in terms)
+        logger.info(f"Loaded keyword lexicons from {path}: {sorted(custom)}")
+    except (OSError, ValueError, AttributeError, TypeError) as e:
+        logger.error(f"Could not load keyword lexicons from {path}, using built-in ones: {e}")
+    return lexicons
+
+
+classifier = KeywordClassifier(load_lexicons(settings.KEYWORD_LEXICONS_FILE))
+
+
+def classify(text: Optional[str]) -> frozenset:
+    return classifier.classify(text)
@@ -0,0 +1,71 @@
+"""
+JSON codec used for persistence (JSON columns), LLM context and API responses.
+
+Uses orjson when it is installed and falls back to the stdlib `json` module
+otherwise. Both backends produce compact UTF-8 output and encode datetimes
+as ISO 8601, so stored data and responses look the same whichever one is
+active. Types neither backend knows raise TypeError instead of being stored
+as their repr.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+# JSONDecodeError is a ValueError under both backends.
+JSONDecodeError = orjson.JSONDecodeError if orjson is not None else json.JSONDecodeError
+
+
+def _default(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, UUID):
+        # orjson encodes these natively; the same output from the stdlib fallback.
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumpb(obj) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS).decode("utf-8")
+
+    loads = orjson.loads
+
+else:
+
+    def dumps(obj) -> str:
+        return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False)
+
+    def dumpb(obj) -> bytes:
+        return dumps(obj).encode("utf-8")
+
+    def loads(data):
+        return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: renders with the active codec backend."""
+
+    def render(self, content) -> bytes:
+        return dumpb(content)
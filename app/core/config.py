@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import Field, AliasChoices
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -17,8 +19,89 @@ class Settings(BaseSettings):
     DB_NAME: str = Field(default="breakdown_db", validation_alias=AliasChoices("MYSQLDATABASE", "MYSQL_DATABASE", "DB_NAME", "DATABASE_NAME"))
     DB_PORT: int = Field(default=3306, validation_alias=AliasChoices("MYSQLPORT", "DB_PORT", "DATABASE_PORT"))
 
+    # Storage backend for sessions, messages, tickets and prompts (app/storage):
+    # "mysql", "sqlite" (embedded file at SQLITE_PATH, WAL mode) or "memory" (per process, not persisted)
+    STORAGE_BACKEND: str = "mysql"
+    SQLITE_PATH: str = "onecharge.db"
+
+    # Connection pool (shared by app/services/db.py and TicketService)
+    DB_POOL_SIZE: int = 10  # hard upper bound on open connections per worker
+    DB_POOL_PREWARM: int = 2  # connections opened at startup
+    DB_POOL_TIMEOUT_SECONDS: float = 5.0  # max wait for a free connection before giving up
+    DB_POOL_PING_AFTER_SECONDS: float = 30.0  # validate idle connections older than this on checkout (0 = always)
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # replace connections older than this
+
+    # In-process session cache (per worker; keep TTL short with several workers)
+    SESSION_CACHE_SIZE: int = 10000
+    SESSION_CACHE_TTL_SECONDS: float = 120.0
+    # Commit retries when another worker updated the same chat session first
+    SESSION_CAS_MAX_RETRIES: int = 3
+
+    # Host-app customer profile cache (negative lookups are cached for a shorter time)
+    PROFILE_CACHE_SIZE: int = 10000
+    PROFILE_CACHE_TTL_SECONDS: float = 600.0
+    PROFILE_NEGATIVE_TTL_SECONDS: float = 120.0
+
+    # LLM response cache (keyed on flow state + normalized message + relevant facts)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_SIZE: int = 5000
+    LLM_CACHE_TTL_SECONDS: float = 900.0
+    LLM_CACHE_MAX_MESSAGE_CHARS: int = 120
+
+    # LLM context: a log of earlier user messages + only the most recent raw messages
+    LLM_RECENT_MESSAGES: int = 4
+    SUMMARY_MAX_ENTRIES: int = 12
+    SUMMARY_ENTRY_CHARS: int = 120
+
+    # Incremental escalations polling: re-read this many seconds before the client's
+    # cursor so tickets written by transactions still committing aren't skipped
+    TICKETS_CURSOR_OVERLAP_SECONDS: int = 2
+
+    # Agent ticket list pagination
+    TICKETS_PAGE_DEFAULT_LIMIT: int = 100
+    TICKETS_PAGE_MAX_LIMIT: int = 500
+
+    # Agent session transcripts: max page size, and batch size when streamed as NDJSON
+    TRANSCRIPT_PAGE_MAX_LIMIT: int = 500
+    TRANSCRIPT_STREAM_BATCH_SIZE: int = 200
+
+    # Cold transcript archival: messages of sessions RESOLVED for longer than the
+    # retention move to compressed messages_archive rows
+    ARCHIVE_ENABLED: bool = True
+    ARCHIVE_RETENTION_DAYS: int = 30
+    ARCHIVE_INTERVAL_SECONDS: float = 3600.0
+    ARCHIVE_BATCH_SESSIONS: int = 200
+    # Decompressed archives kept briefly while a transcript is streamed from them
+    ARCHIVE_READ_CACHE_SIZE: int = 32
+
+    # LLM admission control (per worker): concurrent completions, turns allowed to wait
+    # for a slot, and how long a turn waits before getting the busy reply instead
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_MAX_QUEUE: int = 200
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 8.0
+
+    # Keyword lexicons (emergency, agent request, greeting, safety answers): optional
+    # JSON file whose lexicons replace the built-in ones of the same name
+    KEYWORD_LEXICONS_FILE: Optional[str] = None
+
+    # Request tracing (per worker): requests that run a chat turn and take longer than
+    # the threshold keep their span tree in a ring buffer served by /api/admin/traces/slow
+    TRACING_ENABLED: bool = True
+    SLOW_TURN_THRESHOLD_MS: float = 3000.0
+    SLOW_TURN_BUFFER_SIZE: int = 100
+    TRACE_MAX_SPANS: int = 500  # per request; spans past this are counted, not kept
+    # Required as X-Admin-Token on /api/admin routes; unset, those routes answer 404
+    ADMIN_TOKEN: Optional[str] = None
+
     # OpenAI
     OPENAI_API_KEY: str = Field(default="", alias="OPENAI_API_KEY", validation_alias="OPENAI_API_KEY")
+    # Alternative API endpoint, e.g. the load-test stand-in (benchmarks/mock_openai.py)
+    OPENAI_BASE_URL: Optional[str] = None
+    # Record completions to / replay them from a JSONL cassette ("record" | "replay");
+    # replays sleep the recorded latency ("original") or not at all ("zero")
+    LLM_CASSETTE_MODE: Optional[str] = None
+    LLM_CASSETTE_PATH: str = "llm_cassette.jsonl"
+    LLM_CASSETTE_LATENCY: str = "original"
 
     model_config = SettingsConfigDict(
         env_file=".env", 
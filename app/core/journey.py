@@ -0,0 +1,17 @@
+"""Button options offered at each step of the roadside-assistance journey."""
+
+ISSUE_OPTIONS = [
+    "Engine not starting",
+    "Flat tyre",
+    "Battery issue",
+    "Overheating",
+    "Accident / collision",
+    "Other (describe)",
+]
+
+SAFETY_OPTIONS = ["Yes, I am safe", "No, I need help"]
+
+# Asked on its own once the user has said they are safe.
+VEHICLE_OPTIONS = ["Yes, I am with the vehicle", "No, I am away from it"]
+
+ROUTING_OPTIONS = ["On-Spot Repair", "Towing Assistance"]
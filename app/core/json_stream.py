@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from typing import Optional
+
+_SIMPLE_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class JsonFieldStreamer:
+    """
+    Incrementally extracts one top-level string field from a JSON object that
+    arrives in arbitrary chunks (e.g. streamed LLM tokens).
+
+    `feed(chunk)` returns the newly decoded characters of the field's value,
+    so callers can forward text as soon as it is generated instead of waiting
+    for the closing brace. Escapes (including \\uXXXX surrogate pairs) split
+    across chunks are buffered until complete. Only the first occurrence of
+    the field at the top level is streamed; everything else is only tracked
+    far enough to know where strings, keys and nesting begin and end.
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        self._stack: list[str] = []
+        self._expect_key = False
+        self._pending_key: Optional[str] = None
+        self._in_string = False
+        self._is_key = False
+        self._capturing = False
+        self._escape: Optional[str] = None
+        self._high_surrogate: Optional[int] = None
+        self._key_buf: list[str] = []
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        out: list[str] = []
+        for ch in chunk:
+            if self._in_string:
+                self._feed_string_char(ch, out)
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._is_key = bool(self._stack) and self._stack[-1] == "{" and self._expect_key
+                self._capturing = (
+                    not self.done
+                    and not self._is_key
+                    and len(self._stack) == 1
+                    and self._pending_key == self.field
+                )
+                self._key_buf = []
+            elif ch in "{[":
+                self._stack.append(ch)
+                self._expect_key = ch == "{"
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                self._expect_key = False
+            elif ch == ",":
+                self._expect_key = bool(self._stack) and self._stack[-1] == "{"
+                self._pending_key = None
+            elif ch == ":":
+                self._expect_key = False
+        return "".join(out)
+
+    def _feed_string_char(self, ch: str, out: list[str]):
+        if self._escape is not None:
+            self._escape += ch
+            decoded = self._decode_escape()
+            if decoded is not None:
+                self._escape = None
+                self._emit(decoded, out)
+            return
+        if ch == "\\":
+            self._escape = ""
+        elif ch == '"':
+            self._close_string(out)
+        else:
+            self._emit(ch, out)
+
+    def _decode_escape(self) -> Optional[str]:
+        esc = self._escape
+        if esc[0] != "u":
+            return _SIMPLE_ESCAPES.get(esc[0], esc[0])
+        if len(esc) < 5:
+            return None
+        try:
+            code = int(esc[1:5], 16)
+        except ValueError:
+            return ""
+        if 0xD800 <= code <= 0xDBFF:
+            self._high_surrogate = code
+            return ""
+        if 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+            hi, self._high_surrogate = self._high_surrogate, None
+            return chr(0x10000 + ((hi - 0xD800) << 10) + (code - 0xDC00))
+        return chr(code)
+
+    def _emit(self, text: str, out: list[str]):
+        if not text:
+            return
+        if self._high_surrogate is not None:
+            # Unpaired high surrogate: drop it rather than emit invalid text.
+            self._high_surrogate = None
+        if self._capturing:
+            out.append(text)
+        elif self._is_key:
+            self._key_buf.append(text)
+
+    def _close_string(self, out: list[str]):
+        self._in_string = False
+        if self._is_key:
+            self._pending_key = "".join(self._key_buf)
+        elif self._capturing:
+            self._capturing = False
+            self.done = True
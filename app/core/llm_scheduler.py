@@ -0,0 +1,142 @@
+"""
+Admission control for LLM calls.
+
+Every completion goes through one scheduler per worker: at most
+LLM_MAX_CONCURRENCY calls run at once, and turns waiting for a slot are
+served by lane (emergency first, then already escalated sessions, then
+everything else) and FIFO within a lane. A turn that cannot get a slot
+within LLM_QUEUE_TIMEOUT_SECONDS, or that finds LLM_MAX_QUEUE turns of
+its own or a higher lane already waiting, is not admitted and
+`get_ai_response` answers with the non-escalating busy fallback instead.
+Emergency turns are never turned away for queue depth, only for waiting
+too long.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+LANE_EMERGENCY = "emergency"
+LANE_ESCALATED = "escalated"
+LANE_NORMAL = "normal"
+
+LANES = (LANE_EMERGENCY, LANE_ESCALATED, LANE_NORMAL)
+_RANK = {lane: rank for rank, lane in enumerate(LANES)}
+
+
+class _LaneStats:
+    __slots__ = ("queued", "admitted", "timed_out", "rejected", "wait_seconds_sum", "wait_seconds_max")
+
+    def __init__(self):
+        self.queued = 0
+        self.admitted = 0
+        self.timed_out = 0
+        self.rejected = 0
+        self.wait_seconds_sum = 0.0
+        self.wait_seconds_max = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "timed_out": self.timed_out,
+            "rejected": self.rejected,
+            "wait_seconds_sum": round(self.wait_seconds_sum, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            "wait_seconds_avg": round(self.wait_seconds_sum / self.admitted, 6) if self.admitted else 0.0,
+        }
+
+
+class LLMScheduler:
+    """
+    Priority semaphore. Only used from the event loop, so no locking: a
+    released slot is handed straight to the best waiter, which keeps later
+    arrivals from jumping the queue.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._lanes = {lane: _LaneStats() for lane in LANES}
+
+    async def acquire(self, lane: str = LANE_NORMAL, timeout: Optional[float] = None) -> bool:
+        """Wait for a slot. Returns False if the turn was not admitted."""
+        stats = self._lanes[lane]
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            stats.admitted += 1
+            return True
+
+        # Only turns that would be served first count against the depth limit,
+        # so a backlog of normal turns does not turn away escalated ones.
+        # Emergency turns are never turned away for queue depth.
+        rank = _RANK[lane]
+        if lane != LANE_EMERGENCY and sum(1 for r, _, _ in self._waiters if r <= rank) >= self.max_queue:
+            stats.rejected += 1
+            return False
+
+        fut = asyncio.get_running_loop().create_future()
+        entry = (rank, next(self._seq), fut)
+        heapq.heappush(self._waiters, entry)
+        stats.queued += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(fut, self.queue_timeout if timeout is None else timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if fut.done() and not fut.cancelled():
+                # The slot was handed over just as we gave up: pass it on.
+                self.release()
+            elif entry in self._waiters:
+                # release() may already have popped and skipped it.
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            stats.timed_out += 1
+            return False
+        finally:
+            stats.queued -= 1
+
+        waited = time.perf_counter() - started
+        stats.admitted += 1
+        stats.wait_seconds_sum += waited
+        stats.wait_seconds_max = max(stats.wait_seconds_max, waited)
+        return True
+
+    def release(self):
+        while self._waiters:
+            # in_flight stays the same: the slot moves to the best waiter.
+            _, _, fut = heapq.heappop(self._waiters)
+            if fut.done():
+                # Cancelled or timed out, but its task has not run its cleanup yet.
+                continue
+            fut.set_result(True)
+            return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, lane: str = LANE_NORMAL):
+        """`async with scheduler.slot(lane) as admitted:` - release is automatic."""
+        admitted = await self.acquire(lane)
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "lanes": {lane: s.as_dict() for lane, s in self._lanes.items()},
+        }
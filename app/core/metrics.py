@@ -0,0 +1,231 @@
+"""
+Prometheus metrics in the text exposition format (served at /metrics).
+
+Counters and histograms are plain in-process objects: recording is a dict
+lookup, a bisect over the bucket bounds and a few additions under a per-metric
+lock, so they stay on in production. The existing `stats()` dicts (LLM
+scheduler, caches, session CAS, storage, ...) are exported as gauges at
+scrape time through `register_stats()` instead of being counted twice.
+
+Every process keeps its own numbers; with several workers, scrape each one
+(or aggregate in Prometheus).
+"""
+
+from __future__ import annotations
+
+import bisect
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Optional
+
+PREFIX = "onecharge_"
+
+# Seconds. Fine at the low end for in-memory/SQLite DB calls, up to LLM timeouts at the top.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NAME_UNSAFE_RE = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: Optional[tuple] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        key = tuple(str(v) for v in labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: tuple = DEFAULT_BUCKETS):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        key = tuple(str(v) for v in labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    async def timed(self, awaitable, *labels):
+        """Await `awaitable`, observing how long it took."""
+        with self.time(*labels):
+            return await awaitable
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+        self._stats: list[tuple[str, Callable[[], dict]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_stats(self, name: str, stats: Callable[[], dict]):
+        """Export the numeric leaves of `stats()` as gauges named `<name>_<key path>` on every scrape."""
+        self._stats.append((name, stats))
+
+    def _render_stats(self) -> list[str]:
+        lines = []
+        for name, stats in self._stats:
+            try:
+                values = stats()
+            except Exception as e:
+                lines.append(f"# {name} stats unavailable: {_escape(e)}")
+                continue
+            for key, value in _flatten(values, name):
+                metric = PREFIX + _NAME_UNSAFE_RE.sub("_", key)
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {_format_value(value)}")
+        return lines
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        lines += self._render_stats()
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(values: dict, prefix: str):
+    for key, value in values.items():
+        path = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, path)
+        elif isinstance(value, bool):
+            yield path, int(value)
+        elif isinstance(value, (int, float)):
+            yield path, value
+
+
+registry = Registry()
+
+http_request_seconds = registry.histogram(
+    "http_request_seconds", "Time to the start of the response, by route.", ("method", "route")
+)
+http_requests = registry.counter("http_requests_total", "HTTP responses by route and status.", ("method", "route", "status"))
+
+chat_stage_seconds = registry.histogram(
+    "chat_stage_seconds",
+    "Time a chat turn spends in each stage (profile_lookup, session_load, history_load, llm, "
+    "state_machine, commit, ticket_commit).",
+    ("stage",),
+)
+chat_turns = registry.counter(
+    "chat_turns_total", "Chat turns by how the reply was produced (fast_path, llm_cache, llm).", ("path",)
+)
+escalations = registry.counter("escalations_total", "Sessions escalated to an agent, by reason.", ("reason",))
+
+db_operation_seconds = registry.histogram("db_operation_seconds", "Storage calls made by the API, by operation.", ("operation",))
+db_errors = registry.counter("db_errors_total", "Storage calls that raised, by operation.", ("operation",))
+
+llm_calls = registry.counter(
+    "llm_calls_total", "LLM calls by outcome (ok, error, rate_limited, not_admitted).", ("outcome",)
+)
+llm_tokens = registry.counter("llm_tokens_total", "OpenAI tokens used, by type (prompt, completion).", ("type",))
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by its route template (not the raw path)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        started = False
+
+        def record(status: int):
+            route_path = getattr(scope.get("route"), "path", "unmatched")
+            http_request_seconds.observe(time.perf_counter() - start, scope["method"], route_path)
+            http_requests.inc(scope["method"], route_path, status)
+
+        async def send_wrapper(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if not started:
+                record(500)
+            raise
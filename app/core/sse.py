@@ -0,0 +1,9 @@
+from app.core import codec
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Encode one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {codec.dumps(data)}\n\n"
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
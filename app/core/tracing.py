@@ -0,0 +1,249 @@
+"""
+Lightweight request tracing with slow-turn capture.
+
+`TracingMiddleware` opens a root span per HTTP request and puts it in a
+contextvar, so nested spans need no plumbing: `span()` attaches to whatever
+span is current in the task, and tasks created during the request (asyncio
+copies the context) attach to the same tree. Instrumented:
+
+    http          the request (route, status)
+    chat.turn     one chatbot turn (session, state before/after, reply path)
+    db.<op>       every storage call made through async_db
+    llm           get_ai_response (lane, admission, queue wait, outcome)
+    escalate      handing a session to an agent
+
+When a request that ran a chat turn takes longer than SLOW_TURN_THRESHOLD_MS,
+its whole span tree is kept in a ring buffer of the last SLOW_TURN_BUFFER_SIZE
+such traces, served by /api/admin/traces/slow. Everything else is dropped
+when the request ends. Outside a traced request `span()` is a no-op.
+
+Every response carries its `X-Trace-Id`, so a complaint about a slow reply
+can be matched to the captured trace.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+from app.core.config import settings
+
+TRACE_HEADER = "X-Trace-Id"
+
+
+class Span:
+    __slots__ = ("name", "trace", "attrs", "children", "start", "end", "error")
+
+    def __init__(self, name: str, trace: "Trace", attrs: dict):
+        self.name = name
+        self.trace = trace
+        self.attrs = attrs
+        self.children: list[Span] = []
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    @property
+    def duration_ms(self) -> float:
+        return round(((self.end or time.perf_counter()) - self.start) * 1000, 3)
+
+    def to_dict(self, origin: float) -> dict:
+        out = {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": self.duration_ms,
+        }
+        if self.attrs:
+            out["attrs"] = dict(self.attrs)
+        if self.error:
+            out["error"] = self.error
+        if self.children:
+            out["children"] = [c.to_dict(origin) for c in list(self.children)]
+        return out
+
+
+class _NoopSpan:
+    """Stands in for a span when nothing is being traced."""
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Trace:
+    __slots__ = ("trace_id", "started_at", "root", "span_count", "dropped_spans", "has_turn")
+
+    def __init__(self, name: str, attrs: dict):
+        self.trace_id = os.urandom(8).hex()
+        self.started_at = datetime.now()
+        self.span_count = 1
+        self.dropped_spans = 0
+        self.has_turn = False
+        self.root = Span(name, self, attrs)
+
+    @property
+    def duration_ms(self) -> float:
+        return self.root.duration_ms
+
+    def summary(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": self.span_count,
+            **self.root.attrs,
+        }
+
+    def to_dict(self) -> dict:
+        return {**self.summary(), "dropped_spans": self.dropped_spans, "root": self.root.to_dict(self.root.start)}
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+_lock = threading.Lock()
+_slow: deque = deque(maxlen=max(1, settings.SLOW_TURN_BUFFER_SIZE))
+_stats = {"traces": 0, "turns": 0, "slow_captured": 0}
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a block as a child of the current span. Yields the span (or a no-op outside a trace)."""
+    parent = _current.get()
+    if parent is None:
+        yield _NOOP
+        return
+    trace = parent.trace
+    if trace.span_count >= settings.TRACE_MAX_SPANS:
+        trace.dropped_spans += 1
+        yield _NOOP
+        return
+    child = Span(name, trace, attrs)
+    trace.span_count += 1
+    parent.children.append(child)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        child.end = time.perf_counter()
+        _current.reset(token)
+
+
+def traced(name: str):
+    """Decorator: run an async function inside `span(name)`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def turn(**attrs):
+    """Span for one chat turn; marks its request as eligible for slow-turn capture."""
+    parent = _current.get()
+    if parent is not None:
+        parent.trace.has_turn = True
+    with span("chat.turn", **attrs) as s:
+        yield s
+
+
+def annotate(**attrs):
+    """Add attributes to the current span, if any."""
+    current = _current.get()
+    if current is not None:
+        current.set(**attrs)
+
+
+@contextmanager
+def start_trace(name: str, **attrs):
+    trace = Trace(name, attrs)
+    token = _current.set(trace.root)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        trace.root.end = time.perf_counter()
+        _current.reset(token)
+        _finish(trace)
+
+
+def _finish(trace: Trace):
+    with _lock:
+        _stats["traces"] += 1
+        if not trace.has_turn:
+            return
+        _stats["turns"] += 1
+        if trace.duration_ms >= settings.SLOW_TURN_THRESHOLD_MS:
+            _slow.append(trace)
+            _stats["slow_captured"] += 1
+
+
+def slow_traces() -> list[Trace]:
+    """Captured slow turns, newest first."""
+    with _lock:
+        return list(reversed(_slow))
+
+
+def find_slow_trace(trace_id: str) -> Optional[Trace]:
+    with _lock:
+        return next((t for t in _slow if t.trace_id == trace_id), None)
+
+
+def tracing_stats() -> dict:
+    with _lock:
+        return {
+            "enabled": settings.TRACING_ENABLED,
+            "slow_threshold_ms": settings.SLOW_TURN_THRESHOLD_MS,
+            "buffered": len(_slow),
+            **_stats,
+        }
+
+
+class TracingMiddleware:
+    """ASGI middleware: one trace per HTTP request, with its id in the X-Trace-Id response header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.TRACING_ENABLED:
+            return await self.app(scope, receive, send)
+
+        with start_trace("http", method=scope["method"], path=scope["path"]) as trace:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    trace.root.set(status=message["status"])
+                    message["headers"] = list(message.get("headers") or []) + [
+                        (TRACE_HEADER.lower().encode("latin-1"), trace.trace_id.encode("latin-1"))
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    trace.root.set(route=route.path)
@@ -1,20 +1,269 @@
-
 import mysql.connector
 from app.core.config import settings
+from collections import deque
+from typing import Optional
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+
+class PoolExhaustedError(Exception):
+    """Raised when no pooled connection became free within the checkout timeout."""
+
+
+class PooledConnection:
+    """
+    Proxy handed out by the pool. Behaves like the underlying mysql.connector
+    connection, except that close() returns it to the pool instead of
+    tearing down the TCP session, so existing `conn.close()` call sites keep working.
+    """
+
+    def __init__(self, pool: "ConnectionPool", raw, created_at: float):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        self._pool._release(self._raw, self._created_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Bounded, health-checked pool of MySQL connections.
+
+    - At most `size` connections are open at any time; callers wait up to
+      `timeout` seconds for one to be returned before PoolExhaustedError.
+    - Idle connections unused for `ping_after` seconds are pinged on checkout
+      and replaced if the server dropped them; connections older than
+      `recycle` seconds are replaced outright.
+    - Returned connections are rolled back so no transaction (or stale
+      REPEATABLE READ snapshot) leaks into the next checkout.
+    """
+
+    def __init__(self, size: int, timeout: float, ping_after: float, recycle: int, connect=None):
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.recycle = recycle
+        self._connect = connect or _connect_mysql
+        self._idle = deque()  # (raw, created_at, last_used)
+        self._cond = threading.Condition()
+        self._open = 0
+        self._waiting = 0
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+    # --- checkout / return ---
+
+    def acquire(self) -> PooledConnection:
+        deadline = time.monotonic() + self.timeout
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    raw, created_at, last_used = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    raw = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolExhaustedError(
+                        f"No database connection free after {self.timeout}s (pool size {self.size})"
+                    )
+                waited = True
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            self._stats["checkouts"] += 1
+            if waited:
+                wait = time.monotonic() - started
+                self._stats["waits"] += 1
+                self._stats["wait_seconds_total"] += wait
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait)
+
+        # Network I/O happens outside the lock.
+        try:
+            if raw is not None:
+                raw, created_at = self._validate(raw, created_at, last_used)
+            if raw is None:
+                raw, created_at = self._new_connection()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, raw, created_at)
+
+    def _release(self, raw, created_at: float):
+        healthy = True
+        try:
+            if getattr(raw, "unread_result", False):
+                raw.consume_results()
+            if raw.in_transaction:
+                raw.rollback()
+        except Exception:
+            healthy = False
+
+        with self._cond:
+            if healthy:
+                self._idle.append((raw, created_at, time.monotonic()))
+            else:
+                self._open -= 1
+                self._stats["discarded"] += 1
+            self._cond.notify()
+        if not healthy:
+            _safe_close(raw)
+
+    def _validate(self, raw, created_at: float, last_used: float):
+        """Return (raw, created_at) if the connection is usable, else (None, 0) after discarding it."""
+        now = time.monotonic()
+        stale = self.recycle and (now - created_at) > self.recycle
+        if not stale and (now - last_used) < self.ping_after:
+            return raw, created_at
+        if not stale:
+            try:
+                raw.ping(reconnect=False)
+                return raw, created_at
+            except Exception as e:
+                logger.warning(f"Discarding dead pooled connection: {e}")
+        with self._cond:
+            self._stats["discarded"] += 1
+        _safe_close(raw)
+        return None, 0.0
+
+    def _new_connection(self):
+        raw = self._connect()
+        with self._cond:
+            self._stats["created"] += 1
+        return raw, time.monotonic()
+
+    # --- lifecycle ---
+
+    def prewarm(self, count: int) -> int:
+        """Open up to `count` connections ahead of traffic. Returns how many were opened."""
+        opened = []
+        try:
+            for _ in range(min(count, self.size)):
+                opened.append(self.acquire())
+        except Exception as e:
+            logger.error(f"Connection pool pre-warm stopped early: {e}")
+        for conn in opened:
+            conn.close()
+        return len(opened)
+
+    def close_all(self):
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+        for raw, _, _ in idle:
+            _safe_close(raw)
+
+    def stats(self) -> dict:
+        with self._cond:
+            in_use = self._open - len(self._idle)
+            waits = self._stats["waits"]
+            return {
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": in_use,
+                "waiting": self._waiting,
+                "saturation": round(in_use / self.size, 3),
+                "checkouts": self._stats["checkouts"],
+                "waits": waits,
+                "timeouts": self._stats["timeouts"],
+                "created": self._stats["created"],
+                "discarded": self._stats["discarded"],
+                "avg_wait_ms": round(1000 * self._stats["wait_seconds_total"] / waits, 2) if waits else 0.0,
+                "max_wait_ms": round(1000 * self._stats["wait_seconds_max"], 2),
+            }
+
+
+def _connect_mysql():
+    return mysql.connector.connect(
+        host=settings.DB_HOST,
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        database=settings.DB_NAME,
+        port=settings.DB_PORT
+    )
+
+
+def _safe_close(raw):
+    try:
+        raw.close()
+    except Exception:
+        pass
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    size=settings.DB_POOL_SIZE,
+                    timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+                    ping_after=settings.DB_POOL_PING_AFTER_SECONDS,
+                    recycle=settings.DB_POOL_RECYCLE_SECONDS,
+                )
+    return _pool
+
+
+def init_pool():
+    """Create the shared pool and pre-warm it (called once at app startup)."""
+    pool = get_pool()
+    opened = pool.prewarm(settings.DB_POOL_PREWARM)
+    logger.info(f"Database pool ready: {opened} pre-warmed / {pool.size} max connections.")
+    return pool
+
+
+def close_pool():
+    if _pool is not None:
+        _pool.close_all()
+
+
+def pool_stats() -> dict:
+    return get_pool().stats()
+
+
 def get_db_connection():
     try:
-        conn = mysql.connector.connect(
-            host=settings.DB_HOST,
-            user=settings.DB_USER,
-            password=settings.DB_PASSWORD,
-            database=settings.DB_NAME,
-            port=settings.DB_PORT
-        )
-        return conn
-    except mysql.connector.Error as err:
+        return get_pool().acquire()
+    except (mysql.connector.Error, PoolExhaustedError) as err:
         logger.error(f"Database connection error: {err}")
         return None
@@ -0,0 +1,383 @@
+"""
+Versioned schema migrations for the runtime tables.
+
+Every migration is recorded in `schema_migrations` once applied, and every
+step is also idempotent on its own (tables use IF NOT EXISTS, columns and
+indexes are checked in information_schema first). MySQL commits each DDL
+statement implicitly, so a migration interrupted half-way is simply re-run
+from the top on the next start. Databases created by the old `setup_db()`
+are brought up to date the same way.
+
+Migrations that add indexes for hot queries list those queries in
+`checks`; `check()` runs EXPLAIN on each and reports whether MySQL picks
+the intended index.
+
+    python -m app.db.migrations            # apply pending migrations, then run the checks
+    python -m app.db.migrations --status   # list applied / pending migrations
+    python -m app.db.migrations --check    # only run the EXPLAIN checks
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+from typing import Callable, NamedTuple
+
+from app.db.connection import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Serializes migrations when several workers start at once.
+_LOCK_NAME = "onecharge_schema_migrations"
+_LOCK_TIMEOUT_SECONDS = 60
+
+
+class HotQuery(NamedTuple):
+    name: str
+    sql: str
+    params: tuple
+    index: str  # index EXPLAIN is expected to report in `key`
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable
+    checks: tuple = ()
+
+
+# --- Idempotent DDL helpers ---
+
+def _column_exists(cursor, table: str, column: str) -> bool:
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.columns WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+        (table, column),
+    )
+    return bool(cursor.fetchone()[0])
+
+
+def _index_exists(cursor, table: str, index: str) -> bool:
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.statistics WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+        (table, index),
+    )
+    return bool(cursor.fetchone()[0])
+
+
+def _add_column(cursor, table: str, column: str, definition: str):
+    if not _column_exists(cursor, table, column):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _add_index(cursor, table: str, index: str, columns: str):
+    if not _index_exists(cursor, table, index):
+        cursor.execute(f"ALTER TABLE {table} ADD INDEX {index} ({columns})")
+
+
+def _drop_index(cursor, table: str, index: str):
+    if _index_exists(cursor, table, index):
+        cursor.execute(f"ALTER TABLE {table} DROP INDEX {index}")
+
+
+# --- Migrations ---
+
+def _m001_initial_tables(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS chat_sessions (
+        session_id VARCHAR(255) PRIMARY KEY,
+        customer_id VARCHAR(255),
+        status ENUM('ACTIVE', 'ESCALATED', 'RESOLVED') DEFAULT 'ACTIVE',
+        current_flow_step VARCHAR(255),
+        extracted_data JSON,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        INDEX idx_customer (customer_id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS messages (
+        message_id INT AUTO_INCREMENT PRIMARY KEY,
+        session_id VARCHAR(255),
+        role ENUM('user', 'assistant', 'system'),
+        content TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS tickets (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        session_id VARCHAR(255) NOT NULL,
+        user_id VARCHAR(255) NOT NULL,
+        source ENUM('ESCALATION', 'SERVICE') DEFAULT 'ESCALATION',
+        reason VARCHAR(100) NOT NULL,
+        priority ENUM('normal', 'high', 'emergency') DEFAULT 'normal',
+        status ENUM('OPEN', 'IN_PROGRESS', 'DISPATCHED', 'ON_SITE', 'RESOLVED', 'CLOSED') DEFAULT 'OPEN',
+        customer_name VARCHAR(255) NULL,
+        phone VARCHAR(50) NULL,
+        vehicle_model VARCHAR(255) NULL,
+        collected_data JSON,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        INDEX idx_ticket_session (session_id),
+        INDEX idx_ticket_status (status),
+        INDEX idx_ticket_user (user_id),
+        FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """)
+
+
+def _m002_conversation_summary(cursor):
+    _add_column(cursor, "chat_sessions", "conversation_summary", "TEXT NULL AFTER extracted_data")
+
+
+def _m003_prompt_versions(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS prompt_versions (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        version INT NOT NULL,
+        content_sha256 CHAR(64) NOT NULL,
+        content MEDIUMTEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE KEY uq_prompt_name_version (name, version),
+        UNIQUE KEY uq_prompt_name_sha (name, content_sha256)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """)
+    _add_column(cursor, "chat_sessions", "prompt_version_id", "INT NULL AFTER conversation_summary")
+
+
+def _m004_ticket_list_indexes(cursor):
+    _add_index(cursor, "tickets", "idx_ticket_updated", "updated_at, id")
+    _add_index(cursor, "tickets", "idx_ticket_status_updated", "status, updated_at, id")
+    _add_index(cursor, "tickets", "idx_ticket_status_created", "status, created_at, id")
+    _add_index(cursor, "tickets", "idx_ticket_priority_status", "priority, status, updated_at, id")
+    _add_index(cursor, "tickets", "idx_ticket_source_status", "source, status, updated_at, id")
+
+
+def _m005_hot_path_indexes(cursor):
+    _add_index(cursor, "messages", "idx_messages_session_created", "session_id, created_at, message_id")
+    # Transcript paging is keyed on message_id; don't rely on the implicit FK
+    # index, which MySQL may drop now that another index covers session_id.
+    _add_index(cursor, "messages", "idx_messages_session_message", "session_id, message_id")
+    _add_index(cursor, "chat_sessions", "idx_sessions_customer_status_updated", "customer_id, status, updated_at")
+    _add_index(cursor, "chat_sessions", "idx_sessions_status_updated", "status, updated_at")
+    _add_index(cursor, "tickets", "idx_ticket_session_status_updated", "session_id, status, updated_at")
+    # Now leftmost prefixes of the indexes above; the new ticket index also
+    # backs the session_id foreign key, so the old one can go.
+    _drop_index(cursor, "chat_sessions", "idx_customer")
+    _drop_index(cursor, "tickets", "idx_ticket_session")
+    _drop_index(cursor, "tickets", "idx_ticket_status")
+
+
+def _m006_messages_archive(cursor):
+    # Cold tier: one zlib-compressed JSON array of messages per archived session.
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS messages_archive (
+        session_id VARCHAR(255) PRIMARY KEY,
+        message_count INT NOT NULL,
+        first_message_id INT NOT NULL,
+        last_message_id INT NOT NULL,
+        payload MEDIUMBLOB NOT NULL,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """)
+    _add_column(cursor, "chat_sessions", "transcript_archived_at", "TIMESTAMP NULL AFTER prompt_version_id")
+    _add_index(cursor, "chat_sessions", "idx_sessions_archive", "status, transcript_archived_at, updated_at")
+
+
+def _m007_session_version(cursor):
+    # Optimistic concurrency: every chat_sessions write bumps it, turn commits compare-and-swap on it.
+    _add_column(cursor, "chat_sessions", "version", "INT NOT NULL DEFAULT 0 AFTER status")
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(1, "initial_tables", _m001_initial_tables),
+    Migration(2, "conversation_summary", _m002_conversation_summary),
+    Migration(3, "prompt_versions", _m003_prompt_versions),
+    Migration(4, "ticket_list_indexes", _m004_ticket_list_indexes, checks=(
+        HotQuery(
+            "open tickets, newest update first",
+            "SELECT * FROM tickets WHERE status IN ('OPEN','IN_PROGRESS','DISPATCHED','ON_SITE') "
+            "ORDER BY updated_at DESC, id DESC LIMIT 101",
+            (),
+            "idx_ticket_status_updated",
+        ),
+        HotQuery(
+            "ticket changes since cursor",
+            "SELECT * FROM tickets WHERE updated_at >= %s ORDER BY updated_at, id",
+            ("2099-01-01 00:00:00",),
+            "idx_ticket_updated",
+        ),
+    )),
+    Migration(5, "hot_path_indexes", _m005_hot_path_indexes, checks=(
+        HotQuery(
+            "recent chat history",
+            "SELECT * FROM messages WHERE session_id = %s ORDER BY created_at DESC, message_id DESC LIMIT 10",
+            ("explain-check",),
+            "idx_messages_session_created",
+        ),
+        HotQuery(
+            "transcript page",
+            "SELECT message_id, role, content, created_at FROM messages WHERE session_id = %s AND message_id < %s "
+            "ORDER BY message_id DESC LIMIT 51",
+            ("explain-check", 1000000),
+            "idx_messages_session_message",
+        ),
+        HotQuery(
+            "active session for customer",
+            "SELECT * FROM chat_sessions WHERE customer_id = %s AND status IN ('ACTIVE','ESCALATED') "
+            "ORDER BY updated_at DESC LIMIT 1",
+            ("explain-check",),
+            "idx_sessions_customer_status_updated",
+        ),
+        HotQuery(
+            "escalated sessions",
+            "SELECT session_id FROM chat_sessions WHERE status = 'ESCALATED' ORDER BY updated_at DESC",
+            (),
+            "idx_sessions_status_updated",
+        ),
+        HotQuery(
+            "open ticket for session",
+            "SELECT * FROM tickets WHERE session_id = %s AND status NOT IN ('RESOLVED','CLOSED') "
+            "ORDER BY updated_at DESC LIMIT 1",
+            ("explain-check",),
+            "idx_ticket_session_status_updated",
+        ),
+    )),
+    Migration(6, "messages_archive", _m006_messages_archive, checks=(
+        HotQuery(
+            "archivable sessions",
+            "SELECT session_id FROM chat_sessions WHERE status = 'RESOLVED' AND transcript_archived_at IS NULL "
+            "AND updated_at < %s ORDER BY updated_at LIMIT 200",
+            ("2000-01-01 00:00:00",),
+            "idx_sessions_archive",
+        ),
+    )),
+    Migration(7, "session_version", _m007_session_version),
+)
+
+
+# --- Runner ---
+
+def _ensure_migrations_table(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """)
+
+
+def _applied_versions(cursor) -> set[int]:
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def migrate() -> list[int]:
+    """Apply every pending migration in order. Returns the versions applied."""
+    conn = get_db_connection()
+    if not conn:
+        return []
+    applied_now = []
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (_LOCK_NAME, _LOCK_TIMEOUT_SECONDS))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError("Timed out waiting for the schema migration lock")
+        try:
+            _ensure_migrations_table(cursor)
+            done = _applied_versions(cursor)
+            for migration in MIGRATIONS:
+                if migration.version in done:
+                    continue
+                logger.info(f"Applying migration {migration.version:03d}_{migration.name}")
+                migration.apply(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                    (migration.version, migration.name),
+                )
+                conn.commit()
+                applied_now.append(migration.version)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (_LOCK_NAME,))
+            cursor.fetchone()
+        logger.info(
+            f"Schema up to date (version {MIGRATIONS[-1].version}); applied {len(applied_now)} migration(s)."
+        )
+        return applied_now
+    finally:
+        conn.close()
+
+
+def status() -> list[dict]:
+    """Every known migration with whether it has been applied."""
+    conn = get_db_connection()
+    if not conn:
+        return []
+    try:
+        cursor = conn.cursor()
+        _ensure_migrations_table(cursor)
+        done = _applied_versions(cursor)
+        return [{"version": m.version, "name": m.name, "applied": m.version in done} for m in MIGRATIONS]
+    finally:
+        conn.close()
+
+
+def check() -> list[dict]:
+    """
+    EXPLAIN every hot query and report the index MySQL chose. On nearly empty
+    tables the optimizer may prefer a full scan, so run this against a
+    database with realistic data before trusting a failure.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return []
+    results = []
+    try:
+        cursor = conn.cursor(dictionary=True)
+        for migration in MIGRATIONS:
+            for query in migration.checks:
+                cursor.execute("EXPLAIN " + query.sql, query.params)
+                plan = cursor.fetchall()
+                chosen = plan[0].get("key") if plan else None
+                results.append({
+                    "migration": migration.version,
+                    "query": query.name,
+                    "expected_index": query.index,
+                    "chosen_index": chosen,
+                    "ok": chosen == query.index,
+                })
+        return results
+    finally:
+        conn.close()
+
+
+def _print_checks(results: list[dict]) -> bool:
+    for r in results:
+        mark = "ok  " if r["ok"] else "MISS"
+        print(f"[{mark}] {r['query']}: expected {r['expected_index']}, EXPLAIN chose {r['chosen_index']}")
+    return all(r["ok"] for r in results)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Apply and verify 1Charge schema migrations.")
+    parser.add_argument("--status", action="store_true", help="list applied and pending migrations")
+    parser.add_argument("--check", action="store_true", help="only run the EXPLAIN index checks")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.status:
+        for m in status():
+            print(f"{m['version']:03d}_{m['name']}: {'applied' if m['applied'] else 'pending'}")
+        return 0
+    if not args.check:
+        applied = migrate()
+        print(f"Applied {len(applied)} migration(s).")
+    return 0 if _print_checks(check()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
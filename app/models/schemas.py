@@ -55,6 +55,7 @@ class EscalatedSession(BaseModel):
     updated_at: datetime
 
 class SessionMessage(BaseModel):
+    message_id: Optional[int] = None  # None for the system prompt marker
     role: str
     content: str
     created_at: datetime
@@ -65,6 +66,7 @@ class SessionFullDetails(BaseModel):
     current_flow_step: str
     extracted_data: Dict
     transcript: List[SessionMessage]
+    next_cursor: Optional[int] = None  # pass as `before` to load older messages
 
 
 class TicketSummary(BaseModel):
@@ -78,10 +80,16 @@ class TicketSummary(BaseModel):
     customer_name: Optional[str] = None
     phone: Optional[str] = None
     vehicle_model: Optional[str] = None
-    collected_data: Dict
+    collected_data: Optional[Dict] = None  # left out with `fields=summary`
     created_at: datetime
 
 
+class TicketChanges(BaseModel):
+    cursor: Optional[str] = None  # pass back as `since` on the next poll
+    changed: List[TicketSummary]  # open tickets created or updated since the cursor
+    removed: List[int]  # ids of tickets that left the open set (resolved/closed)
+
+
 class UpdateTicketStatusRequest(BaseModel):
     status: str
 
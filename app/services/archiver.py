@@ -0,0 +1,80 @@
+"""
+Background archiver for cold transcripts.
+
+Every ARCHIVE_INTERVAL_SECONDS it moves the messages of sessions that have
+been RESOLVED for longer than ARCHIVE_RETENTION_DAYS out of the hot
+`messages` table into compressed `messages_archive` rows (see
+`db.archive_session_messages`). That keeps `messages`, which every chat turn
+reads, limited to recent conversations. Agent transcript reads merge both
+tiers, so nothing else has to know about it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from app.core.config import settings
+from app.services import async_db
+
+logger = logging.getLogger(__name__)
+
+_task: Optional[asyncio.Task] = None
+_stats = {"runs": 0, "sessions_archived": 0, "messages_archived": 0, "errors": 0, "last_run_at": None}
+
+
+async def run_once() -> int:
+    """Archive one batch of eligible sessions. Returns the number of messages moved."""
+    retention = settings.ARCHIVE_RETENTION_DAYS
+    moved_total = 0
+    for session_id in await async_db.find_archivable_sessions(retention, settings.ARCHIVE_BATCH_SESSIONS):
+        try:
+            moved = await async_db.archive_session_messages(session_id, retention)
+        except Exception as e:
+            _stats["errors"] += 1
+            logger.error(f"Archiving session {session_id} failed: {e}")
+            continue
+        _stats["sessions_archived"] += 1
+        _stats["messages_archived"] += moved
+        moved_total += moved
+    _stats["runs"] += 1
+    _stats["last_run_at"] = time.time()
+    return moved_total
+
+
+async def _loop():
+    while True:
+        try:
+            moved = await run_once()
+            if moved:
+                logger.info(f"Archived {moved} messages of resolved sessions.")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _stats["errors"] += 1
+            logger.error(f"Transcript archiver run failed: {e}")
+        await asyncio.sleep(settings.ARCHIVE_INTERVAL_SECONDS)
+
+
+def start_archiver():
+    global _task
+    if settings.ARCHIVE_ENABLED and _task is None:
+        _task = asyncio.create_task(_loop())
+
+
+async def stop_archiver():
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = None
+
+
+def archiver_stats() -> dict:
+    return {"enabled": settings.ARCHIVE_ENABLED, "running": _task is not None, **_stats}
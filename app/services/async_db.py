@@ -0,0 +1,90 @@
+"""
+Awaitable mirror of the storage backend (app/storage) for the async route
+handlers.
+
+mysql.connector and sqlite3 are blocking, so for those backends every call
+is shipped to a dedicated thread pool sized to the connection pool: a slow
+query parks one worker thread instead of the event loop, and DB latency
+overlaps with other requests and pending OpenAI awaits. The in-memory
+backend never waits on I/O and is called on the event loop directly.
+Function names and signatures match db.py one-to-one. Every call is timed
+into the `db_operation_seconds` histogram and traced as a `db.<name>` span,
+executor queueing included.
+"""
+
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from app.core.config import settings
+from app.core import tracing
+from app.core.metrics import db_errors, db_operation_seconds
+from app.storage import get_storage
+
+storage = get_storage()
+
+# One thread per pooled connection: more threads would only queue on the pool.
+_executor = ThreadPoolExecutor(max_workers=max(1, settings.DB_POOL_SIZE), thread_name_prefix="db")
+
+
+@contextmanager
+def _observed(operation: str):
+    start = time.perf_counter()
+    try:
+        with tracing.span(f"db.{operation}"):
+            yield
+    except Exception:
+        db_errors.inc(operation)
+        raise
+    finally:
+        db_operation_seconds.observe(time.perf_counter() - start, operation)
+
+
+def _offload(fn):
+    operation = fn.__name__
+    if not storage.blocking:
+        @functools.wraps(fn)
+        async def direct(*args, **kwargs):
+            with _observed(operation):
+                return fn(*args, **kwargs)
+
+        return direct
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        with _observed(operation):
+            return await loop.run_in_executor(_executor, functools.partial(ctx.run, fn, *args, **kwargs))
+
+    return wrapper
+
+
+def shutdown_executor():
+    _executor.shutdown(wait=False, cancel_futures=True)
+
+
+get_customer_profile = _offload(storage.get_customer_profile)
+get_active_session = _offload(storage.get_active_session)
+get_session_by_id = _offload(storage.get_session_by_id)
+create_session = _offload(storage.create_session)
+save_message = _offload(storage.save_message)
+get_chat_history = _offload(storage.get_chat_history)
+update_session = _offload(storage.update_session)
+get_escalated_sessions = _offload(storage.get_escalated_sessions)
+get_open_ticket_for_session = _offload(storage.get_open_ticket_for_session)
+create_ticket = _offload(storage.create_ticket)
+list_open_tickets = _offload(storage.list_open_tickets)
+latest_ticket_update = _offload(storage.latest_ticket_update)
+list_ticket_changes = _offload(storage.list_ticket_changes)
+update_ticket_status = _offload(storage.update_ticket_status)
+get_session_transcript = _offload(storage.get_session_transcript)
+get_session_messages = _offload(storage.get_session_messages)
+find_archivable_sessions = _offload(storage.find_archivable_sessions)
+archive_session_messages = _offload(storage.archive_session_messages)
+mark_session_resolved = _offload(storage.mark_session_resolved)
+commit_unit_of_work = _offload(storage.commit_unit_of_work)
+get_prompt_version = _offload(storage.get_prompt_version)
@@ -0,0 +1,150 @@
+"""
+Small in-process caches used in front of the database.
+
+Entries live in one worker's memory only; TTLs bound how long another worker's
+writes can go unnoticed, so keep them short when running several workers.
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache with a per-entry time-to-live and hit/miss counters."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Like get(), but without touching LRU order or hit/miss counters."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+        if entry is _MISSING or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class SessionCache:
+    """
+    Write-through cache of `chat_sessions` rows, addressable by session_id and
+    by customer_id (for the customer's current ACTIVE/ESCALATED session).
+
+    Rows are deep-copied on the way in and out because handlers mutate
+    `extracted_data` in place.
+    """
+
+    OPEN_STATUSES = ("ACTIVE", "ESCALATED")
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._rows = TTLCache(maxsize, ttl)
+        self._active_by_customer = TTLCache(maxsize, ttl)
+
+    def get(self, session_id: str) -> Optional[dict]:
+        row = self._rows.get(session_id)
+        return copy.deepcopy(row) if row is not None else None
+
+    def get_active(self, customer_id: str) -> Optional[dict]:
+        session_id = self._active_by_customer.get(customer_id)
+        if session_id is None:
+            return None
+        row = self._rows.peek(session_id)
+        if row is None or row.get("status") not in self.OPEN_STATUSES:
+            self._active_by_customer.pop(customer_id)
+            return None
+        return copy.deepcopy(row)
+
+    def put(self, row: dict):
+        row = copy.deepcopy(row)
+        self._rows.set(row["session_id"], row)
+        if row.get("status") in self.OPEN_STATUSES and row.get("customer_id") is not None:
+            self._active_by_customer.set(str(row["customer_id"]), row["session_id"])
+
+    def apply_update(self, session_id: str, **fields):
+        """Mirror a committed UPDATE onto the cached row (no-op if the row is not cached)."""
+        row = self._rows.peek(session_id)
+        if row is None:
+            return
+        row = copy.deepcopy(row)
+        row.update(copy.deepcopy(fields))
+        row["updated_at"] = datetime.now()
+        self.put(row)
+        if row.get("status") not in self.OPEN_STATUSES and row.get("customer_id") is not None:
+            customer_id = str(row["customer_id"])
+            if self._active_by_customer.peek(customer_id) == session_id:
+                self._active_by_customer.pop(customer_id)
+
+    def invalidate(self, session_id: str):
+        row = self._rows.pop(session_id)
+        if row is not None and row.get("customer_id") is not None:
+            customer_id = str(row["customer_id"])
+            if self._active_by_customer.peek(customer_id) == session_id:
+                self._active_by_customer.pop(customer_id)
+
+    def clear(self):
+        self._rows.clear()
+        self._active_by_customer.clear()
+
+    def stats(self) -> dict:
+        return {"rows": self._rows.stats(), "active_by_customer": self._active_by_customer.stats()}
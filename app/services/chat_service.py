@@ -3,6 +3,7 @@ from typing import Dict
 from datetime import datetime
 from app.db.connection import get_db_connection
 from app.core.ai import generate_ai_response
+from app.core.classifier import SAFE, UNSAFE, classify
 import json
 
 class ChatbotSession:
@@ -142,9 +143,9 @@ def handle_location_collection(session: ChatbotSession, user_input: str, msg_typ
 
 
 def handle_safety_assessment(session: ChatbotSession, user_input: str):
-    user_input_lower = user_input.lower()
+    keywords = classify(user_input)
     
-    if any(word in user_input_lower for word in ["yes", "safe", "ok", "fine", "yeah", "with the vehicle"]):
+    if SAFE in keywords:
         session.collected_data['safe_status'] = "SAFE"
         session.update_state("AWAITING_ISSUE_TYPE")
         return {
@@ -154,7 +155,7 @@ def handle_safety_assessment(session: ChatbotSession, user_input: str):
         }
     
     # Check for "no" or "unsafe" specifically in this state
-    if any(word in user_input_lower for word in ["no", "unsafe", "not safe", "help"]):
+    if UNSAFE in keywords:
         return handle_escalation(session, "UNSAFE_LOCATION")
 
     # If ambiguous, ask again
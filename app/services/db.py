@@ -1,18 +1,76 @@
 
 import mysql.connector
-import json
+from app.core import codec
 from app.core.config import settings
+from app.db.connection import PoolExhaustedError, get_pool
+from app.services.cache import SessionCache, TTLCache
+from app.storage.base import (
+    OPEN_TICKET_STATUSES,
+    TICKET_SORTS,
+    TICKET_SUMMARY_FIELDS,
+    SessionConflictError,
+    archived_batch,
+    commit_with_retries,
+    merge_archived_page,
+    pack_messages,
+    parse_json_column,
+    publish_ticket,
+    record_cas_conflict,
+    unpack_messages,
+)
 import logging
 from datetime import datetime
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+# Write-through cache in front of chat_sessions reads; every session write below
+# updates or invalidates it after commit.
+session_cache = SessionCache(maxsize=settings.SESSION_CACHE_SIZE, ttl=settings.SESSION_CACHE_TTL_SECONDS)
+
+_MISSING = object()
+
+# Profiles change rarely; cache hits and misses alike so a missing profile does
+# not cost a query on every turn.
+profile_cache = TTLCache(maxsize=settings.PROFILE_CACHE_SIZE, ttl=settings.PROFILE_CACHE_TTL_SECONDS)
+_NO_PROFILE = object()
+
+# None until detect_customers_table() has run; False disables the lookup entirely.
+_customers_table_available: Optional[bool] = None
+
+def detect_customers_table() -> Optional[bool]:
+    """
+    One-time startup probe for the host app's optional `customers` table.
+    When it is absent, get_customer_profile() short-circuits without a query.
+    """
+    global _customers_table_available
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = 'customers'"
+        )
+        _customers_table_available = bool(cursor.fetchone()[0])
+        if not _customers_table_available:
+            logger.info("No `customers` table found; profile lookups disabled.")
+        return _customers_table_available
+    finally:
+        conn.close()
+
 def get_customer_profile(customer_id: str):
     """
     Optional integration with the host app database.
     If a `customers` table exists, fetch name/phone/vehicle_model for context.
     Returns None if not available.
     """
+    if _customers_table_available is False:
+        return None
+    cached = profile_cache.get(customer_id, _MISSING)
+    if cached is not _MISSING:
+        return None if cached is _NO_PROFILE else dict(cached)
+
     conn = get_db_connection()
     if not conn:
         return None
@@ -23,9 +81,9 @@ def get_customer_profile(customer_id: str):
             (customer_id,),
         )
         row = cursor.fetchone()
-        return row
     except Exception:
-        # Table may not exist in some environments; treat as optional.
+        # Table may not exist in some environments; treat as optional. Not cached:
+        # a transient error must not hide the profile for the negative TTL.
         return None
     finally:
         try:
@@ -33,15 +91,19 @@ def get_customer_profile(customer_id: str):
         except Exception:
             pass
 
+    if row:
+        profile_cache.set(customer_id, dict(row))
+    else:
+        profile_cache.set(customer_id, _NO_PROFILE, ttl=settings.PROFILE_NEGATIVE_TTL_SECONDS)
+    return row
+
 def get_db_connection():
+    """Check out a connection from the shared pool; `conn.close()` hands it back."""
     try:
-        return mysql.connector.connect(
-            host=settings.DB_HOST,
-            user=settings.DB_USER,
-            password=settings.DB_PASSWORD,
-            database=settings.DB_NAME,
-            port=settings.DB_PORT
-        )
+        return get_pool().acquire()
+    except PoolExhaustedError as err:
+        logger.error(f"Database pool exhausted: {err}")
+        return None
     except mysql.connector.Error as err:
         from dotenv import load_dotenv
         import os
@@ -62,162 +124,212 @@ def get_db_connection():
         logger.error(f"Database connection error: {err}")
         return None
 
-def _parse_json_column(data):
-    if isinstance(data, (bytes, bytearray)):
-        data = data.decode('utf-8')
-    if isinstance(data, str):
-        try:
-            return json.loads(data)
-        except:
-            return {}
-    return data if isinstance(data, dict) else {}
+# --- Shared write statements (single-call functions and commit_unit_of_work) ---
 
-def setup_db():
-    conn = get_db_connection()
-    if not conn: return
-    cursor = conn.cursor()
-    
-    # Create chat_sessions table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS chat_sessions (
-        session_id VARCHAR(255) PRIMARY KEY,
-        customer_id VARCHAR(255),
-        status ENUM('ACTIVE', 'ESCALATED', 'RESOLVED') DEFAULT 'ACTIVE',
-        current_flow_step VARCHAR(255),
-        extracted_data JSON,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-        INDEX idx_customer (customer_id)
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-    """)
-    
-    # Create messages table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS messages (
-        message_id INT AUTO_INCREMENT PRIMARY KEY,
-        session_id VARCHAR(255),
-        role ENUM('user', 'assistant', 'system'),
-        content TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id)
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-    """)
-
-    # Create tickets table (agent handoff + lifecycle)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS tickets (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        session_id VARCHAR(255) NOT NULL,
-        user_id VARCHAR(255) NOT NULL,
-        source ENUM('ESCALATION', 'SERVICE') DEFAULT 'ESCALATION',
-        reason VARCHAR(100) NOT NULL,
-        priority ENUM('normal', 'high', 'emergency') DEFAULT 'normal',
-        status ENUM('OPEN', 'IN_PROGRESS', 'DISPATCHED', 'ON_SITE', 'RESOLVED', 'CLOSED') DEFAULT 'OPEN',
-        customer_name VARCHAR(255) NULL,
-        phone VARCHAR(50) NULL,
-        vehicle_model VARCHAR(255) NULL,
-        collected_data JSON,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-        INDEX idx_ticket_session (session_id),
-        INDEX idx_ticket_status (status),
-        INDEX idx_ticket_user (user_id),
-        FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id)
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-    """)
-    
-    conn.commit()
-    cursor.close()
-    conn.close()
-    logger.info("Database setup complete.")
+_INSERT_SESSION_SQL = (
+    "INSERT INTO chat_sessions (session_id, customer_id, extracted_data, current_flow_step, prompt_version_id) "
+    "VALUES (%s, %s, %s, %s, %s)"
+)
+
+def _update_session_sql(with_state: bool = True, with_summary: bool = False, check_version: bool = False) -> str:
+    """
+    UPDATE for one chat_sessions row. Every write bumps `version`; with
+    `check_version` it only applies if the row is still at the version the
+    caller read (params end with session_id, then the expected version).
+    """
+    assignments = []
+    if with_state:
+        assignments += ["current_flow_step = %s", "extracted_data = %s", "status = %s"]
+    if with_summary:
+        assignments.append("conversation_summary = %s")
+    assignments.append("version = version + 1")
+    sql = f"UPDATE chat_sessions SET {', '.join(assignments)} WHERE session_id = %s"
+    if check_version:
+        sql += " AND version = %s"
+    return sql
+
+
+_INSERT_TICKET_SQL = """
+    INSERT INTO tickets
+        (session_id, user_id, source, reason, priority, status, customer_name, phone, vehicle_model, collected_data)
+    VALUES
+        (%s, %s, %s, %s, %s, 'OPEN', %s, %s, %s, %s)
+"""
+
+
+def _insert_messages_sql(rows: int) -> str:
+    return "INSERT INTO messages (session_id, role, content) VALUES " + ", ".join(["(%s, %s, %s)"] * rows)
+
+
+def _ticket_params(
+    session_id: str,
+    user_id: str,
+    reason: str,
+    priority: str,
+    source: str,
+    collected_data: dict | None,
+    customer_name: str | None,
+    phone: str | None,
+    vehicle_model: str | None,
+) -> tuple:
+    return (
+        session_id,
+        str(user_id),
+        source,
+        reason,
+        priority,
+        customer_name,
+        phone,
+        vehicle_model,
+        codec.dumps(collected_data or {}),
+    )
+
+
+def _cache_new_session(
+    session_id: str,
+    customer_id: str,
+    initial_data: dict,
+    flow_step: str,
+    prompt_version_id: Optional[int] = None,
+):
+    now = datetime.now()
+    session_cache.put({
+        "session_id": session_id,
+        "customer_id": customer_id,
+        "status": "ACTIVE",
+        "current_flow_step": flow_step,
+        "extracted_data": dict(initial_data or {}),
+        "conversation_summary": None,
+        "prompt_version_id": prompt_version_id,
+        "version": 0,
+        "created_at": now,
+        "updated_at": now,
+    })
 
 def get_active_session(customer_id: str):
+    cached = session_cache.get_active(str(customer_id))
+    if cached is not None:
+        return cached
     conn = get_db_connection()
     if not conn: return None
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute(
-        "SELECT * FROM chat_sessions WHERE customer_id = %s AND status IN ('ACTIVE','ESCALATED') ORDER BY updated_at DESC LIMIT 1",
-        (customer_id,)
-    )
-    session = cursor.fetchone()
-    if session:
-        session['extracted_data'] = _parse_json_column(session.get('extracted_data'))
-    cursor.close()
-    conn.close()
-    return session
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            "SELECT * FROM chat_sessions WHERE customer_id = %s AND status IN ('ACTIVE','ESCALATED') ORDER BY updated_at DESC LIMIT 1",
+            (customer_id,)
+        )
+        session = cursor.fetchone()
+        if session:
+            session['extracted_data'] = parse_json_column(session.get('extracted_data'))
+            session_cache.put(session)
+        cursor.close()
+        return session
+    finally:
+        conn.close()
 
 
 def get_session_by_id(session_id: str):
+    cached = session_cache.get(session_id)
+    if cached is not None:
+        return cached
     conn = get_db_connection()
     if not conn:
         return None
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM chat_sessions WHERE session_id = %s LIMIT 1", (session_id,))
-    session = cursor.fetchone()
-    if session:
-        session["extracted_data"] = _parse_json_column(session.get("extracted_data"))
-    cursor.close()
-    conn.close()
-    return session
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT * FROM chat_sessions WHERE session_id = %s LIMIT 1", (session_id,))
+        session = cursor.fetchone()
+        if session:
+            session["extracted_data"] = parse_json_column(session.get("extracted_data"))
+            session_cache.put(session)
+        cursor.close()
+        return session
+    finally:
+        conn.close()
 
 def create_session(
     session_id: str,
     customer_id: str,
-    system_prompt: str,
+    prompt_version_id: Optional[int] = None,
     initial_data: dict = None,
     initial_flow_step: str = "SAFETY",
 ):
+    """Insert a session. The system prompt is referenced by version id, not copied into `messages`."""
     conn = get_db_connection()
     if not conn: return
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO chat_sessions (session_id, customer_id, extracted_data, current_flow_step) VALUES (%s, %s, %s, %s)",
-        (session_id, customer_id, json.dumps(initial_data or {}), initial_flow_step)
-    )
-    cursor.execute(
-        "INSERT INTO messages (session_id, role, content) VALUES (%s, %s, %s)",
-        (session_id, 'system', system_prompt)
-    )
-    conn.commit()
-    cursor.close()
-    conn.close()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            _INSERT_SESSION_SQL,
+            (session_id, customer_id, codec.dumps(initial_data or {}), initial_flow_step, prompt_version_id),
+        )
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+    _cache_new_session(session_id, customer_id, initial_data, initial_flow_step, prompt_version_id)
 
 def save_message(session_id: str, role: str, content: str):
     conn = get_db_connection()
     if not conn: return
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO messages (session_id, role, content) VALUES (%s, %s, %s)",
-        (session_id, role, content)
-    )
-    conn.commit()
-    cursor.close()
-    conn.close()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(_insert_messages_sql(1), (session_id, role, content))
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
 
-def get_chat_history(session_id: str, limit: int = 10):
+def get_chat_history(session_id: str, limit: int = 10, include_system: bool = True):
     conn = get_db_connection()
     if not conn: return []
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute(
-        "SELECT role, content FROM (SELECT * FROM messages WHERE session_id = %s ORDER BY created_at DESC LIMIT %s) sub ORDER BY created_at ASC",
-        (session_id, limit)
-    )
-    history = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return history
+    try:
+        cursor = conn.cursor(dictionary=True)
+        role_filter = "" if include_system else " AND role <> 'system'"
+        cursor.execute(
+            "SELECT role, content FROM (SELECT * FROM messages WHERE session_id = %s" + role_filter
+            + " ORDER BY created_at DESC, message_id DESC LIMIT %s) sub ORDER BY created_at ASC, message_id ASC",
+            (session_id, limit)
+        )
+        history = cursor.fetchall()
+        cursor.close()
+        return history
+    finally:
+        conn.close()
 
-def update_session(session_id: str, flow_step: str, extracted_data: dict, status: str = 'ACTIVE'):
+def update_session(session_id: str, flow_step: str, extracted_data: dict, status: str = 'ACTIVE',
+                   expected_version: Optional[int] = None):
+    """
+    With `expected_version`, only update if the row is still at that version;
+    raises SessionConflictError otherwise.
+    """
     conn = get_db_connection()
     if not conn: return
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE chat_sessions SET current_flow_step = %s, extracted_data = %s, status = %s WHERE session_id = %s",
-        (flow_step, json.dumps(extracted_data), status, session_id)
-    )
-    conn.commit()
-    cursor.close()
-    conn.close()
+    try:
+        cursor = conn.cursor()
+        params = [flow_step, codec.dumps(extracted_data), status, session_id]
+        if expected_version is not None:
+            params.append(expected_version)
+        cursor.execute(_update_session_sql(check_version=expected_version is not None), tuple(params))
+        conflict = expected_version is not None and cursor.rowcount == 0
+        if conflict:
+            conn.rollback()
+        else:
+            conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+    if conflict:
+        record_cas_conflict()
+        session_cache.invalidate(session_id)
+        raise SessionConflictError(session_id)
+    if expected_version is None:
+        session_cache.invalidate(session_id)
+    else:
+        session_cache.apply_update(
+            session_id, current_flow_step=flow_step, extracted_data=extracted_data, status=status,
+            version=expected_version + 1,
+        )
 
 # --- Agent Dashboard Functions ---
 
@@ -232,7 +344,7 @@ def get_escalated_sessions():
         )
         sessions_data = cursor.fetchall()
         for s in sessions_data:
-            s['extracted_data'] = _parse_json_column(s.get('extracted_data'))
+            s['extracted_data'] = parse_json_column(s.get('extracted_data'))
         return sessions_data
     finally:
         if conn: conn.close()
@@ -259,7 +371,7 @@ def get_open_ticket_for_session(session_id: str):
         )
         row = cursor.fetchone()
         if row:
-            row["collected_data"] = _parse_json_column(row.get("collected_data"))
+            row["collected_data"] = parse_json_column(row.get("collected_data"))
         return row
     finally:
         if conn:
@@ -283,32 +395,135 @@ def create_ticket(
     try:
         cursor = conn.cursor()
         cursor.execute(
-            """
-            INSERT INTO tickets
-                (session_id, user_id, source, reason, priority, status, customer_name, phone, vehicle_model, collected_data)
-            VALUES
-                (%s, %s, %s, %s, %s, 'OPEN', %s, %s, %s, %s)
-            """,
-            (
-                session_id,
-                str(user_id),
-                source,
-                reason,
-                priority,
-                customer_name,
-                phone,
-                vehicle_model,
-                json.dumps(collected_data or {}),
+            _INSERT_TICKET_SQL,
+            _ticket_params(
+                session_id=session_id,
+                user_id=user_id,
+                reason=reason,
+                priority=priority,
+                source=source,
+                collected_data=collected_data,
+                customer_name=customer_name,
+                phone=phone,
+                vehicle_model=vehicle_model,
             ),
         )
         conn.commit()
-        return cursor.lastrowid
+        ticket_id = cursor.lastrowid
+        _publish_ticket(conn, ticket_id, created=True)
+        return ticket_id
+    finally:
+        if conn:
+            conn.close()
+
+
+def _publish_ticket(conn, ticket_id: int, created: bool = False):
+    """Re-read a just-committed ticket and publish it to live dashboard subscribers."""
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT * FROM tickets WHERE id = %s", (ticket_id,))
+        row = cursor.fetchone()
+        if row:
+            row["collected_data"] = parse_json_column(row.get("collected_data"))
+        publish_ticket(row, created=created)
+    except Exception as e:
+        # The write already committed; a missed live update only delays the dashboard.
+        logger.error(f"Ticket event publish failed for #{ticket_id}: {e}")
+
+
+_TICKET_SUMMARY_COLUMNS = ", ".join(TICKET_SUMMARY_FIELDS)
+
+
+def list_open_tickets(
+    statuses: list[str] | None = None,
+    priorities: list[str] | None = None,
+    source: str | None = None,
+    reason: str | None = None,
+    min_age_minutes: int | None = None,
+    max_age_minutes: int | None = None,
+    sort: str = "-updated_at",
+    after: tuple | None = None,
+    limit: int | None = None,
+    include_collected_data: bool = True,
+):
+    """
+    Open tickets matching the filters, in `sort` order. Pagination is keyset:
+    `after` is the (sort column value, id) of the last row of the previous page.
+    With no arguments this is every open ticket, newest update first.
+    """
+    column, direction = TICKET_SORTS[sort]
+    statuses = [st for st in (statuses or OPEN_TICKET_STATUSES) if st in OPEN_TICKET_STATUSES]
+    if not statuses:
+        return []
+
+    where = [f"status IN ({', '.join(['%s'] * len(statuses))})"]
+    params: list = list(statuses)
+    if priorities:
+        where.append(f"priority IN ({', '.join(['%s'] * len(priorities))})")
+        params.extend(priorities)
+    if source:
+        where.append("source = %s")
+        params.append(source)
+    if reason:
+        where.append("reason = %s")
+        params.append(reason)
+    if min_age_minutes is not None:
+        where.append("created_at <= NOW() - INTERVAL %s MINUTE")
+        params.append(int(min_age_minutes))
+    if max_age_minutes is not None:
+        where.append("created_at >= NOW() - INTERVAL %s MINUTE")
+        params.append(int(max_age_minutes))
+    if after is not None:
+        op = "<" if direction == "DESC" else ">"
+        where.append(f"({column} {op} %s OR ({column} = %s AND id {op} %s))")
+        params.extend([after[0], after[0], after[1]])
+
+    sql = f"""
+        SELECT {'*' if include_collected_data else _TICKET_SUMMARY_COLUMNS}
+        FROM tickets
+        WHERE {' AND '.join(where)}
+        ORDER BY {column} {direction}, id {direction}
+    """
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(int(limit))
+
+    conn = get_db_connection()
+    if not conn:
+        return []
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(sql, tuple(params))
+        rows = cursor.fetchall()
+        if include_collected_data:
+            for r in rows:
+                r["collected_data"] = parse_json_column(r.get("collected_data"))
+        return rows
     finally:
         if conn:
             conn.close()
 
 
-def list_open_tickets():
+def latest_ticket_update():
+    """Newest tickets.updated_at across all tickets (the escalations cursor), or None."""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(updated_at) FROM tickets")
+        row = cursor.fetchone()
+        return row[0] if row else None
+    finally:
+        if conn:
+            conn.close()
+
+
+def list_ticket_changes(since):
+    """
+    Tickets (open or not) updated at or after `since`, oldest first. Callers tell
+    open tickets from ones that left the open set by `status`.
+    """
     conn = get_db_connection()
     if not conn:
         return []
@@ -318,13 +533,14 @@ def list_open_tickets():
             """
             SELECT *
             FROM tickets
-            WHERE status IN ('OPEN','IN_PROGRESS','DISPATCHED','ON_SITE')
-            ORDER BY updated_at DESC
-            """
+            WHERE updated_at >= %s
+            ORDER BY updated_at, id
+            """,
+            (since,),
         )
         rows = cursor.fetchall()
         for r in rows:
-            r["collected_data"] = _parse_json_column(r.get("collected_data"))
+            r["collected_data"] = parse_json_column(r.get("collected_data"))
         return rows
     finally:
         if conn:
@@ -348,42 +564,180 @@ def update_ticket_status(ticket_id: int, status: str):
         # a new conversation can start cleanly without exposing session_id to clients.
         if status in ("RESOLVED", "CLOSED"):
             cursor.execute(
-                "UPDATE chat_sessions SET status = 'RESOLVED' WHERE session_id = %s",
+                "UPDATE chat_sessions SET status = 'RESOLVED', version = version + 1 WHERE session_id = %s",
                 (row["session_id"],),
             )
         conn.commit()
+        if status in ("RESOLVED", "CLOSED"):
+            session_cache.invalidate(row["session_id"])
+        _publish_ticket(conn, ticket_id)
         return True
     finally:
         if conn:
             conn.close()
 
-def get_session_transcript(session_id: str):
-    """Fetches extracted_data and chronological chat history for a session."""
+def _session_messages(cursor, session_id: str, before: int | None = None, after: int | None = None,
+                      limit: int | None = None, newest_first: bool = False):
+    # Keyset on message_id over idx_messages_session_message, so each page is a short range scan.
+    where, params = ["session_id = %s"], [session_id]
+    if before is not None:
+        where.append("message_id < %s")
+        params.append(before)
+    if after is not None:
+        where.append("message_id > %s")
+        params.append(after)
+    sql = (
+        f"SELECT message_id, role, content, created_at FROM messages WHERE {' AND '.join(where)} "
+        f"ORDER BY message_id {'DESC' if newest_first else 'ASC'}"
+    )
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(int(limit))
+    cursor.execute(sql, tuple(params))
+    return cursor.fetchall()
+
+
+def _archived_messages(cursor, session_id: str) -> list[dict]:
+    """A session's archived messages (oldest first), or [] if it has none."""
+    cursor.execute("SELECT payload FROM messages_archive WHERE session_id = %s", (session_id,))
+    row = cursor.fetchone()
+    return unpack_messages(row["payload"]) if row else []
+
+
+def get_session_transcript(session_id: str, before: int | None = None, limit: int | None = None,
+                           include_messages: bool = True):
+    """
+    Fetches extracted_data and chat history for a session. Without `limit` the
+    whole history comes back in chronological order; with it, one page of up
+    to `limit` messages older than message `before`, newest first. Archived
+    messages are merged in transparently. `include_messages=False` reads only
+    the session row (no `messages` key).
+    """
     conn = get_db_connection()
     if not conn: return None
     try:
         cursor = conn.cursor(dictionary=True)
         # 1. Fetch extracted data and flow metadata
         cursor.execute(
-            "SELECT session_id, customer_id, current_flow_step, extracted_data FROM chat_sessions WHERE session_id = %s",
+            "SELECT session_id, customer_id, current_flow_step, extracted_data, prompt_version_id, "
+            "transcript_archived_at, created_at FROM chat_sessions WHERE session_id = %s",
             (session_id,)
         )
         metadata = cursor.fetchone()
         if not metadata:
             return None
         
-        metadata['extracted_data'] = _parse_json_column(metadata.get('extracted_data'))
-            
-        # 2. Fetch full chronological message history
-        cursor.execute(
-            "SELECT role, content, created_at FROM messages WHERE session_id = %s ORDER BY created_at ASC",
-            (session_id,)
+        metadata['extracted_data'] = parse_json_column(metadata.get('extracted_data'))
+        if not include_messages:
+            return metadata
+
+        # 2. Fetch the message history (or one page of it). Archived messages
+        #    all predate the live ones, so they only fill in at the old end.
+        messages = _session_messages(
+            cursor, session_id, before=before, limit=limit, newest_first=limit is not None
         )
-        metadata['messages'] = cursor.fetchall()
+        if metadata.get('transcript_archived_at') and (limit is None or len(messages) < limit):
+            messages = merge_archived_page(messages, _archived_messages(cursor, session_id), before, limit)
+        metadata['messages'] = messages
         return metadata
     finally:
         if conn: conn.close()
 
+def get_session_messages(session_id: str, after: int | None = None, limit: int = 200):
+    """
+    Up to `limit` messages after message `after`, oldest first (for streaming
+    a transcript in batches), archived messages included.
+    """
+    conn = get_db_connection()
+    if not conn: return []
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT last_message_id FROM messages_archive WHERE session_id = %s", (session_id,))
+        row = cursor.fetchone()
+
+        def load_payload():
+            cursor.execute("SELECT payload FROM messages_archive WHERE session_id = %s", (session_id,))
+            payload_row = cursor.fetchone()
+            return payload_row["payload"] if payload_row else None
+
+        batch = archived_batch(session_id, row["last_message_id"] if row else None, load_payload, after, limit)
+        if len(batch) < limit:
+            live_after = batch[-1]['message_id'] if batch else after
+            batch += _session_messages(cursor, session_id, after=live_after, limit=limit - len(batch))
+        return batch
+    finally:
+        if conn: conn.close()
+
+def find_archivable_sessions(retention_days: int, limit: int) -> list[str]:
+    """RESOLVED sessions untouched for `retention_days` whose transcript hasn't been archived yet."""
+    conn = get_db_connection()
+    if not conn: return []
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT session_id FROM chat_sessions WHERE status = 'RESOLVED' AND transcript_archived_at IS NULL "
+            "AND updated_at < NOW() - INTERVAL %s DAY ORDER BY updated_at LIMIT %s",
+            (retention_days, limit),
+        )
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        if conn: conn.close()
+
+def archive_session_messages(session_id: str, retention_days: int) -> int:
+    """
+    Move a resolved session's messages into its compressed messages_archive
+    row (merging with any earlier archive) in one transaction. Returns the
+    number of messages moved; 0 if the session no longer qualifies.
+    """
+    conn = get_db_connection()
+    if not conn: return 0
+    try:
+        cursor = conn.cursor(dictionary=True)
+        # Row lock keeps concurrent archivers (other workers) off the same session.
+        cursor.execute(
+            "SELECT session_id FROM chat_sessions WHERE session_id = %s AND status = 'RESOLVED' "
+            "AND updated_at < NOW() - INTERVAL %s DAY FOR UPDATE",
+            (session_id, retention_days),
+        )
+        if not cursor.fetchone():
+            conn.rollback()
+            return 0
+
+        live = _session_messages(cursor, session_id)
+        if live:
+            cursor.execute("SELECT payload FROM messages_archive WHERE session_id = %s FOR UPDATE", (session_id,))
+            row = cursor.fetchone()
+            archived = unpack_messages(row["payload"]) if row else []
+            merged = archived + live
+            cursor.execute(
+                """
+                INSERT INTO messages_archive (session_id, message_count, first_message_id, last_message_id, payload)
+                VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    message_count = VALUES(message_count),
+                    last_message_id = VALUES(last_message_id),
+                    payload = VALUES(payload)
+                """,
+                (session_id, len(merged), merged[0]["message_id"], merged[-1]["message_id"], pack_messages(merged)),
+            )
+            cursor.execute(
+                "DELETE FROM messages WHERE session_id = %s AND message_id <= %s",
+                (session_id, live[-1]["message_id"]),
+            )
+        # updated_at = updated_at: archiving must not count as session activity.
+        cursor.execute(
+            "UPDATE chat_sessions SET transcript_archived_at = CURRENT_TIMESTAMP, updated_at = updated_at "
+            "WHERE session_id = %s",
+            (session_id,),
+        )
+        conn.commit()
+        return len(live)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if conn: conn.close()
+
 def mark_session_resolved(session_id: str):
     """Update status to 'RESOLVED' for the given session ID."""
     conn = get_db_connection()
@@ -391,11 +745,188 @@ def mark_session_resolved(session_id: str):
     try:
         cursor = conn.cursor()
         cursor.execute(
-            "UPDATE chat_sessions SET status = 'RESOLVED' WHERE session_id = %s",
+            "UPDATE chat_sessions SET status = 'RESOLVED', version = version + 1 WHERE session_id = %s",
             (session_id,)
         )
         conn.commit()
         success = cursor.rowcount > 0
+        session_cache.invalidate(session_id)
         return success
     finally:
         if conn: conn.close()
+
+
+def _load_sessions_for_rebase(session_ids) -> dict:
+    conn = get_db_connection()
+    if not conn:
+        return {}
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            f"SELECT * FROM chat_sessions WHERE session_id IN ({', '.join(['%s'] * len(session_ids))})",
+            tuple(session_ids),
+        )
+        rows = cursor.fetchall()
+        for r in rows:
+            r['extracted_data'] = parse_json_column(r.get('extracted_data'))
+        return {r["session_id"]: r for r in rows}
+    finally:
+        conn.close()
+
+
+def commit_unit_of_work(uow):
+    """
+    Flush every write staged on a TurnUnitOfWork in one transaction:
+    session insert, one multi-row message insert, session updates, ticket.
+    Returns the id of the ticket created by this unit of work (or, if a
+    concurrent request escalated the session first, of the ticket it raised).
+
+    Tracked sessions are updated with a compare-and-swap on `version`. On a
+    conflict the transaction is rolled back, the turn is rebased on the
+    current rows and retried, up to SESSION_CAS_MAX_RETRIES times.
+    """
+    return commit_with_retries(_commit_unit_of_work_once, _load_sessions_for_rebase, uow)
+
+
+def _commit_unit_of_work_once(uow):
+    if uow.is_empty():
+        return uow.ticket_id
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor()
+        if uow.session_insert:
+            ins = uow.session_insert
+            cursor.execute(
+                _INSERT_SESSION_SQL,
+                (
+                    ins["session_id"],
+                    ins["customer_id"],
+                    codec.dumps(ins["initial_data"]),
+                    ins["initial_flow_step"],
+                    ins["prompt_version_id"],
+                ),
+            )
+        if uow.messages:
+            params = [v for row in uow.messages for v in row]
+            cursor.execute(_insert_messages_sql(len(uow.messages)), params)
+        for session_id in list(uow.session_updates) + [sid for sid in uow.summaries if sid not in uow.session_updates]:
+            upd = uow.session_updates.get(session_id)
+            summary = uow.summaries.get(session_id)
+            expected = uow.session_versions.get(session_id)
+            params = []
+            if upd:
+                params += [upd["flow_step"], codec.dumps(upd["extracted_data"]), upd["status"]]
+            if summary is not None:
+                params.append(summary)
+            params.append(session_id)
+            if expected is not None:
+                params.append(expected)
+            cursor.execute(
+                _update_session_sql(
+                    with_state=upd is not None, with_summary=summary is not None, check_version=expected is not None
+                ),
+                tuple(params),
+            )
+            if expected is not None and cursor.rowcount == 0:
+                raise SessionConflictError(session_id)
+        created_ticket = bool(uow.ticket)
+        if uow.ticket:
+            cursor.execute(_INSERT_TICKET_SQL, _ticket_params(**uow.ticket))
+            uow.ticket_id = cursor.lastrowid
+        elif uow.superseded_ticket_session and uow.ticket_id is None:
+            cursor.execute(
+                "SELECT id FROM tickets WHERE session_id = %s AND status NOT IN ('RESOLVED','CLOSED') "
+                "ORDER BY updated_at DESC LIMIT 1",
+                (uow.superseded_ticket_session,),
+            )
+            row = cursor.fetchone()
+            uow.ticket_id = row[0] if row else None
+        conn.commit()
+        if created_ticket:
+            _publish_ticket(conn, uow.ticket_id, created=True)
+    except Exception:
+        conn.rollback()
+        for session_id in set(uow.session_updates) | set(uow.summaries):
+            session_cache.invalidate(session_id)
+        raise
+    finally:
+        conn.close()
+
+    if uow.session_insert:
+        ins = uow.session_insert
+        _cache_new_session(
+            ins["session_id"], ins["customer_id"], ins["initial_data"], ins["initial_flow_step"], ins["prompt_version_id"]
+        )
+    for session_id in set(uow.session_updates) | set(uow.summaries):
+        expected = uow.session_versions.get(session_id)
+        if expected is None:
+            session_cache.invalidate(session_id)
+            continue
+        fields = {"version": expected + 1}
+        upd = uow.session_updates.get(session_id)
+        if upd:
+            fields.update(current_flow_step=upd["flow_step"], extracted_data=upd["extracted_data"], status=upd["status"])
+        if session_id in uow.summaries:
+            fields["conversation_summary"] = uow.summaries[session_id]
+        session_cache.apply_update(session_id, **fields)
+    uow.clear()
+    return uow.ticket_id
+
+
+# --- Prompt registry ---
+
+def ensure_prompt_version(name: str, content: str, content_sha256: str):
+    """Return the prompt_versions row for this text, inserting it as the next version if new."""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        select = "SELECT id, name, version, content_sha256, content FROM prompt_versions WHERE name = %s AND content_sha256 = %s"
+        cursor.execute(select, (name, content_sha256))
+        row = cursor.fetchone()
+        if row:
+            return row
+        cursor.execute("SELECT COALESCE(MAX(version), 0) + 1 AS next_version FROM prompt_versions WHERE name = %s", (name,))
+        version = int(cursor.fetchone()["next_version"])
+        try:
+            cursor.execute(
+                "INSERT INTO prompt_versions (name, version, content_sha256, content) VALUES (%s, %s, %s, %s)",
+                (name, version, content_sha256, content),
+            )
+            conn.commit()
+        except mysql.connector.IntegrityError:
+            # Another worker registered it first.
+            conn.rollback()
+        cursor.execute(select, (name, content_sha256))
+        return cursor.fetchone()
+    finally:
+        conn.close()
+
+
+def list_prompt_versions():
+    conn = get_db_connection()
+    if not conn:
+        return []
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT id, name, version, content_sha256, content FROM prompt_versions ORDER BY id")
+        return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def get_prompt_version(prompt_version_id: int):
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            "SELECT id, name, version, content_sha256, content FROM prompt_versions WHERE id = %s", (prompt_version_id,)
+        )
+        return cursor.fetchone()
+    finally:
+        conn.close()
@@ -0,0 +1,96 @@
+"""
+In-process pub/sub for ticket lifecycle events.
+
+db.py publishes after a ticket write commits; the agent dashboard stream
+(`GET /api/agent/escalations/stream`) subscribes and forwards each event as
+a delta instead of re-reading every open ticket. Publishing is thread-safe
+because db.py runs on the async_db executor threads. Events only reach
+subscribers of the same worker process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Optional
+
+TICKET_CREATED = "ticket.created"
+TICKET_UPDATED = "ticket.updated"
+TICKET_CLOSED = "ticket.closed"
+
+CLOSED_STATUSES = ("RESOLVED", "CLOSED")
+
+# Delivered instead of an event when a subscriber fell too far behind; it
+# should drop its state and start again from a fresh snapshot.
+RESYNC = {"type": "resync"}
+
+
+class _Subscriber:
+    __slots__ = ("queue", "loop", "lagging")
+
+    def __init__(self, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop):
+        self.queue = queue
+        self.loop = loop
+        self.lagging = False
+
+
+class TicketEventBus:
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._subscribers: dict[int, _Subscriber] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a subscriber on the running event loop and return its queue."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers[id(queue)] = _Subscriber(queue, asyncio.get_running_loop())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers.pop(id(queue), None)
+
+    def publish(self, event_type: str, ticket: dict):
+        event = {"type": event_type, "ticket": ticket}
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+            self.published += 1
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(self._deliver, sub, event)
+            except RuntimeError:
+                # Loop already closed; the subscriber is gone.
+                self.unsubscribe(sub.queue)
+
+    @staticmethod
+    def _deliver(sub: _Subscriber, event: dict):
+        if sub.lagging:
+            return
+        try:
+            sub.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            sub.lagging = True
+            while not sub.queue.empty():
+                sub.queue.get_nowait()
+            sub.queue.put_nowait(RESYNC)
+
+    def mark_resynced(self, queue: asyncio.Queue):
+        with self._lock:
+            sub = self._subscribers.get(id(queue))
+        if sub:
+            sub.lagging = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"subscribers": len(self._subscribers), "published": self.published}
+
+
+ticket_events = TicketEventBus()
+
+
+def ticket_event_type(status: Optional[str], created: bool = False) -> str:
+    if created:
+        return TICKET_CREATED
+    return TICKET_CLOSED if status in CLOSED_STATUSES else TICKET_UPDATED
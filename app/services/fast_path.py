@@ -0,0 +1,117 @@
+"""
+Deterministic fast path for structured chat turns.
+
+Option-button replies, GPS shares and bare phone numbers carry no free text
+the LLM needs to interpret. For those turns the handler takes the facts from
+`match_structured_input()` and a templated reply instead of calling OpenAI;
+everything downstream (fact merging, progression, escalation) is unchanged.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from collections import Counter
+from typing import Optional
+
+from app.core.journey import ISSUE_OPTIONS, ROUTING_OPTIONS, SAFETY_OPTIONS, VEHICLE_OPTIONS
+
+_PHONE_RE = re.compile(r"^\+?\d{10,13}$")
+_PHONE_SEPARATORS_RE = re.compile(r"[\s\-().]")
+
+_SAFETY_ANSWERS = {
+    SAFETY_OPTIONS[0].lower(): {"is_safe": True},
+    SAFETY_OPTIONS[1].lower(): {"is_safe": False},
+    VEHICLE_OPTIONS[0].lower(): {"is_with_vehicle": True},
+    VEHICLE_OPTIONS[1].lower(): {"is_with_vehicle": False},
+}
+
+# "Other (describe)" needs the user's description, so it still goes to the LLM.
+_ISSUE_ANSWERS = {o.lower(): o for o in ISSUE_OPTIONS if not o.lower().startswith("other")}
+
+_ROUTING_ANSWERS = {
+    ROUTING_OPTIONS[0].lower(): "on_spot",
+    ROUTING_OPTIONS[1].lower(): "towing",
+}
+
+TEMPLATED_REPLIES = {
+    "IDENTITY": "Could you please confirm your registered mobile number?",
+    "LOCATION": "Thank you for confirming your mobile number. Now, could you please provide your current location? You can share your GPS coordinates or a typed address.",
+    "SAFETY": "I've recorded your location. To ensure we can help you properly: Are you safe and are you currently with the vehicle?",
+    # SAFETY again after "Yes, I am safe": only the vehicle question is left.
+    "SAFETY_VEHICLE": "I'm glad you are safe. Are you currently with the vehicle?",
+    "ISSUE": "I'm glad to hear you're safe. What issue are you experiencing with your car?",
+    "ROUTING": "Thanks for letting us know. Would you prefer On-Spot Repair or Towing Assistance?",
+    "CONFIRMATION": "Thank you! Your service has been booked. Our team will reach you soon.",
+    "ESCALATED": "Agent Sarah is reviewing your case. Please stay safe; our team is arranging assistance now.",
+}
+
+_lock = threading.Lock()
+_stats = {"turns": 0, "short_circuited": 0}
+_by_rule: Counter = Counter()
+
+
+def _normalize(text: str) -> str:
+    return " ".join((text or "").strip().lower().split())
+
+
+def match_structured_input(
+    state: str,
+    message: str,
+    message_type: Optional[str] = "text",
+    has_location: bool = False,
+) -> Optional[tuple[str, dict]]:
+    """
+    Return `(rule_name, extracted_data)` when the turn can be answered without
+    the LLM, else None. `state` is the normalized CURRENT_STATE and
+    `has_location` tells whether this request carried a usable LocationPayload.
+    """
+    text = _normalize(message)
+
+    if (message_type or "text").lower() in ("gps", "location") and has_location:
+        if state in ("LOCATION", "ESCALATED"):
+            return "gps_location", {"location_confirmed": True}
+
+    if state == "IDENTITY":
+        digits = _PHONE_SEPARATORS_RE.sub("", text)
+        if _PHONE_RE.match(digits):
+            return "phone_number", {"phone_verified": True}
+
+    if state == "SAFETY" and text in _SAFETY_ANSWERS:
+        return "safety_option", dict(_SAFETY_ANSWERS[text])
+
+    if state == "ISSUE" and text in _ISSUE_ANSWERS:
+        return "issue_option", {"issue_category": _ISSUE_ANSWERS[text]}
+
+    if state == "ROUTING" and text in _ROUTING_ANSWERS:
+        return "routing_option", {"service_type": _ROUTING_ANSWERS[text]}
+
+    return None
+
+
+def templated_reply(state: str, facts: Optional[dict] = None) -> str:
+    if state == "SAFETY" and (facts or {}).get("is_safe") is True:
+        state = "SAFETY_VEHICLE"
+    return TEMPLATED_REPLIES.get(state, TEMPLATED_REPLIES["IDENTITY"])
+
+
+def record_turn(rule: Optional[str]):
+    """Count a turn that reached the LLM decision point, and whether a rule short-circuited it."""
+    with _lock:
+        _stats["turns"] += 1
+        if rule:
+            _stats["short_circuited"] += 1
+            _by_rule[rule] += 1
+
+
+def fast_path_stats() -> dict:
+    with _lock:
+        turns = _stats["turns"]
+        short = _stats["short_circuited"]
+        return {
+            "turns": turns,
+            "short_circuited": short,
+            "llm_turns": turns - short,
+            "short_circuit_ratio": round(short / turns, 3) if turns else 0.0,
+            "by_rule": dict(_by_rule),
+        }
@@ -0,0 +1,113 @@
+"""
+Response cache in front of `get_ai_response`.
+
+Traffic repeats the same short answers at the same step ("flat tyre" in
+ISSUE, "yes i'm safe" in SAFETY), so completions are cached on
+(system prompt version, CURRENT_STATE, normalized user message,
+progression-relevant facts).
+Per-user values (name, phone, coordinates, address text) are deliberately
+left out of the key, replies that mention them are never stored, and only
+the progression facts of `extracted_data` are kept (the model echoes
+FACTS_JSON back, including the customer's coordinates and address), so a
+cached reply is safe to hand to a different user.
+"""
+
+from __future__ import annotations
+
+import copy
+import re
+from typing import Iterable, Optional
+
+from app.core.config import settings
+from app.services.cache import TTLCache
+
+# Facts that change what the model should ask next. Everything else in
+# FACTS_JSON is per-user detail that must not fragment (or leak through) the cache.
+_KEY_FACTS = ("phone_verified", "location_confirmed", "is_safe", "is_with_vehicle", "issue_category", "service_type")
+
+# Location facts: echoed from FACTS_JSON or read from this user's message, never replayed.
+_LOCATION_FACTS = ("latitude", "longitude", "address")
+
+_TRAILING_PUNCTUATION_RE = re.compile(r"[\s.!?,;:]+$")
+
+_cache = TTLCache(maxsize=settings.LLM_CACHE_SIZE, ttl=settings.LLM_CACHE_TTL_SECONDS)
+
+
+def normalize_message(message: str) -> str:
+    text = " ".join((message or "").lower().split())
+    return _TRAILING_PUNCTUATION_RE.sub("", text)
+
+
+def cache_key(state: str, message: str, facts: dict, prompt_version_id: Optional[int]) -> Optional[tuple]:
+    """Key for this turn, or None when the turn should not use the cache."""
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    text = normalize_message(message)
+    if not text or len(text) > settings.LLM_CACHE_MAX_MESSAGE_CHARS:
+        return None
+    facts = facts or {}
+    has_location = bool(
+        facts.get("location_confirmed")
+        or facts.get("latitude") is not None
+        or facts.get("longitude") is not None
+        or facts.get("address")
+    )
+    relevant = tuple((k, _stable(facts.get(k))) for k in _KEY_FACTS)
+    return (prompt_version_id, state, text, relevant, has_location)
+
+
+def get(key: Optional[tuple]) -> Optional[dict]:
+    if key is None:
+        return None
+    hit = _cache.get(key)
+    return copy.deepcopy(hit) if hit is not None else None
+
+
+def store(key: Optional[tuple], response: dict, volatile_values: Iterable[Optional[str]] = ()) -> bool:
+    """
+    Cache a completion unless it is an error/busy/escalation result, its text
+    mentions one of this user's volatile values, or it read a location out of
+    the message. Returns whether it was stored.
+    """
+    if key is None or not isinstance(response, dict):
+        return False
+    if response.get("intent") in ("ERROR", "BUSY"):
+        return False
+    if response.get("next_step") == "ESCALATED" or response.get("emergency_level") == "HIGH":
+        return False
+    reply = str(response.get("user_reply") or response.get("message") or "").lower()
+    for value in volatile_values:
+        value = str(value or "").strip().lower()
+        if len(value) >= 3 and value in reply:
+            return False
+    extracted = response.get("extracted_data")
+    extracted = extracted if isinstance(extracted, dict) else {}
+    has_location = key[-1]
+    if not has_location and any(extracted.get(k) not in (None, "") for k in _LOCATION_FACTS):
+        # The location came from this message; a replay without it would lose it.
+        return False
+    _cache.set(key, {
+        "intent": response.get("intent"),
+        "emergency_level": response.get("emergency_level"),
+        "confidence": response.get("confidence"),
+        "extracted_data": {k: copy.deepcopy(extracted[k]) for k in _KEY_FACTS if k in extracted},
+        "next_step": response.get("next_step"),
+        "user_reply": response.get("user_reply"),
+    })
+    return True
+
+
+def clear():
+    _cache.clear()
+
+
+def llm_cache_stats() -> dict:
+    return _cache.stats()
+
+
+def _stable(value):
+    if isinstance(value, str):
+        return value.strip().lower()
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    return str(value)
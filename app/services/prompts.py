@@ -0,0 +1,98 @@
+"""
+Versioned system prompts.
+
+Each distinct prompt text is stored once in `prompt_versions`; sessions keep
+only the `prompt_version_id` they started with. LLM message assembly resolves
+the text from this in-memory registry, and transcripts show a short marker
+instead of repeating ~3 KB of prompt per session. A version this worker has
+not seen (registered by a newer deploy after it started) is fetched by id
+once and kept.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+from typing import Optional
+
+from app.core.ai import SYSTEM_PROMPT
+from app.services import async_db
+from app.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+CONCIERGE_PROMPT_NAME = "roadside_concierge"
+
+_lock = threading.Lock()
+_by_id: dict[int, dict] = {}
+_by_sha: dict[str, dict] = {}
+_active_id: Optional[int] = None
+
+
+def content_sha256(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _remember(row: dict):
+    with _lock:
+        _by_id[int(row["id"])] = row
+        _by_sha[row["content_sha256"]] = row
+
+
+def register_active_prompt() -> Optional[int]:
+    """
+    Load every stored prompt version into memory, make sure the in-code
+    SYSTEM_PROMPT is one of them and use it for new sessions (called at
+    startup). Returns its id, or None if the DB is down.
+    """
+    global _active_id
+    storage = get_storage()
+    for stored in storage.list_prompt_versions():
+        _remember(stored)
+    row = storage.ensure_prompt_version(CONCIERGE_PROMPT_NAME, SYSTEM_PROMPT, content_sha256(SYSTEM_PROMPT))
+    if not row:
+        return None
+    _remember(row)
+    _active_id = int(row["id"])
+    logger.info(f"Active system prompt: {row['name']} v{row['version']} (id={_active_id}).")
+    return _active_id
+
+
+def active_prompt_id() -> Optional[int]:
+    return _active_id
+
+
+def _lookup(prompt_version_id: Optional[int]) -> Optional[dict]:
+    if prompt_version_id is None:
+        return None
+    return _by_id.get(int(prompt_version_id))
+
+
+async def load_prompt_version(prompt_version_id: Optional[int]) -> Optional[dict]:
+    """The version's row, fetched from storage and cached if it is not in the registry yet."""
+    row = _lookup(prompt_version_id)
+    if row is None and prompt_version_id is not None:
+        row = await async_db.get_prompt_version(int(prompt_version_id))
+        if row:
+            _remember(row)
+    return row
+
+
+async def resolve_prompt(prompt_version_id: Optional[int]) -> str:
+    """Prompt text for a session; sessions without a (known) version use the current prompt."""
+    row = await load_prompt_version(prompt_version_id)
+    return row["content"] if row else SYSTEM_PROMPT
+
+
+def prompt_marker(prompt_version_id: Optional[int] = None, content: Optional[str] = None) -> str:
+    """
+    Short transcript stand-in for a system prompt, given either the session's
+    version id or (for sessions created before versioning) the stored text.
+    """
+    row = _lookup(prompt_version_id)
+    if row is None and content is not None:
+        row = _by_sha.get(content_sha256(content))
+    if row is None:
+        return "[system prompt: unversioned]"
+    return f"[system prompt: {row['name']} v{row['version']}]"
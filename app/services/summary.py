@@ -0,0 +1,58 @@
+"""
+Rolling log of each session's earlier user messages.
+
+This is a bounded log, not a summarizer. Each turn appends one compact
+line ("[STATE] user: ...") to `chat_sessions.conversation_summary`. The log
+keeps the newest SUMMARY_MAX_ENTRIES lines plus a count of the older turns
+it dropped, whose content is gone. Assistant replies are not logged.
+
+The LLM gets this log together with FACTS_JSON and the last few raw
+messages, so prompt size stays flat as a conversation grows. FACTS_JSON
+holds everything the journey needs. `earlier_user_messages()` leaves out
+the lines for turns the raw messages already carry.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Optional
+
+from app.core.config import settings
+
+_OMITTED_RE = re.compile(r"^\((\d+) earlier turns omitted\)$")
+
+
+def append_turn(summary: Optional[str], state: str, user_message: str) -> str:
+    """Return the log `summary` with this turn's user message appended."""
+    lines = [l for l in (summary or "").splitlines() if l.strip()]
+    omitted = 0
+    if lines:
+        m = _OMITTED_RE.match(lines[0])
+        if m:
+            omitted = int(m.group(1))
+            lines = lines[1:]
+
+    text = " ".join((user_message or "").split())
+    limit = settings.SUMMARY_ENTRY_CHARS
+    if len(text) > limit:
+        text = text[: limit - 1].rstrip() + "…"
+    lines.append(f"[{state}] user: {text}")
+
+    overflow = len(lines) - settings.SUMMARY_MAX_ENTRIES
+    if overflow > 0:
+        omitted += overflow
+        lines = lines[overflow:]
+    if omitted:
+        lines.insert(0, f"({omitted} earlier turns omitted)")
+    return "\n".join(lines)
+
+
+def earlier_user_messages(summary: Optional[str], skip_last: int) -> Optional[str]:
+    """The log without its newest `skip_last` entries (turns sent to the LLM verbatim), or None if empty."""
+    lines = [l for l in (summary or "").splitlines() if l.strip()]
+    header = lines[:1] if lines and _OMITTED_RE.match(lines[0]) else []
+    entries = lines[len(header):]
+    entries = entries[: max(0, len(entries) - max(0, skip_last))]
+    if not (header or entries):
+        return None
+    return "\n".join(header + entries)
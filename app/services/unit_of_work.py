@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import copy
+from typing import Optional
+
+from app.services.summary import append_turn
+
+# A rebased update never moves a session back down this order: a turn that
+# raced an escalation stays escalated, and a session an agent resolved stays resolved.
+_STATUS_RANK = {"ACTIVE": 0, "ESCALATED": 1, "RESOLVED": 2}
+
+
+class TurnUnitOfWork:
+    """
+    Collects every write made while handling one chat turn so they can be
+    flushed in a single transaction by `db.commit_unit_of_work()`.
+
+    The staging methods mirror the db.py write functions (`create_session`,
+    `save_message`, `update_session`, `create_ticket`) so handlers read the
+    same. Messages are flushed as one multi-row INSERT in the order they were
+    staged; for a session only the last `update_session` is kept, and a staged
+    summary rides along in the same UPDATE.
+
+    Sessions passed to `track_session()` are updated with a compare-and-swap
+    on their `version`. If another request committed first, the commit calls
+    `rebase()` with the current row and retries.
+    """
+
+    def __init__(self):
+        self.session_insert: Optional[dict] = None
+        self.messages: list[tuple[str, str, str]] = []
+        self.session_updates: dict[str, dict] = {}
+        self.summaries: dict[str, str] = {}
+        self.summary_turns: dict[str, tuple[str, str]] = {}
+        self.session_versions: dict[str, int] = {}
+        self.base_facts: dict[str, dict] = {}
+        self.ticket: Optional[dict] = None
+        self.ticket_id: Optional[int] = None
+        # Session whose staged ticket was dropped by rebase(); its open ticket is reported instead.
+        self.superseded_ticket_session: Optional[str] = None
+
+    def track_session(self, session: dict):
+        """Remember the version and facts this turn read, before it changes them."""
+        session_id = session["session_id"]
+        self.session_versions[session_id] = int(session.get("version") or 0)
+        self.base_facts[session_id] = copy.deepcopy(session.get("extracted_data") or {})
+
+    def create_session(
+        self,
+        session_id: str,
+        customer_id: str,
+        prompt_version_id: Optional[int] = None,
+        initial_data: dict = None,
+        initial_flow_step: str = "SAFETY",
+    ):
+        self.session_insert = {
+            "session_id": session_id,
+            "customer_id": customer_id,
+            "prompt_version_id": prompt_version_id,
+            "initial_data": dict(initial_data or {}),
+            "initial_flow_step": initial_flow_step,
+        }
+        self.session_versions[session_id] = 0
+        self.base_facts[session_id] = copy.deepcopy(initial_data or {})
+
+    def save_message(self, session_id: str, role: str, content: str):
+        self.messages.append((session_id, role, content))
+
+    def update_session(self, session_id: str, flow_step: str, extracted_data: dict, status: str = "ACTIVE"):
+        self.session_updates[session_id] = {
+            "flow_step": flow_step,
+            "extracted_data": dict(extracted_data or {}),
+            "status": status,
+        }
+
+    def add_summary_turn(self, session_id: str, previous_summary: Optional[str], state: str, user_message: str):
+        """Fold this turn's user message into the rolling summary; flushed with the session update."""
+        self.summary_turns[session_id] = (state, user_message)
+        self.summaries[session_id] = append_turn(previous_summary, state, user_message)
+
+    def create_ticket(
+        self,
+        session_id: str,
+        user_id: str,
+        reason: str,
+        priority: str = "normal",
+        source: str = "ESCALATION",
+        collected_data: dict | None = None,
+        customer_name: str | None = None,
+        phone: str | None = None,
+        vehicle_model: str | None = None,
+    ):
+        self.ticket = {
+            "session_id": session_id,
+            "user_id": user_id,
+            "reason": reason,
+            "priority": priority,
+            "source": source,
+            "collected_data": collected_data,
+            "customer_name": customer_name,
+            "phone": phone,
+            "vehicle_model": vehicle_model,
+        }
+
+    def rebase(self, session_id: str, current: dict):
+        """
+        Re-apply this turn's session changes on top of `current`, the row as
+        another request committed it. Facts this turn changed win; everything
+        else comes from `current`. A staged ticket is dropped if the session
+        is already escalated, since that request raised one.
+        """
+        current_facts = current.get("extracted_data") or {}
+        upd = self.session_updates.get(session_id)
+        if upd:
+            base = self.base_facts.get(session_id, {})
+            ours = upd["extracted_data"]
+            merged = dict(current_facts)
+            for key, value in ours.items():
+                if key not in base or base[key] != value:
+                    merged[key] = value
+            for key in base:
+                if key not in ours:
+                    merged.pop(key, None)
+            upd["extracted_data"] = merged
+
+            current_status = current.get("status") or "ACTIVE"
+            if _STATUS_RANK.get(current_status, 0) > _STATUS_RANK.get(upd["status"], 0):
+                upd["status"] = current_status
+                upd["flow_step"] = current.get("current_flow_step") or upd["flow_step"]
+
+        if session_id in self.summary_turns:
+            state, user_message = self.summary_turns[session_id]
+            self.summaries[session_id] = append_turn(current.get("conversation_summary"), state, user_message)
+
+        if self.ticket and self.ticket["session_id"] == session_id and current.get("status") == "ESCALATED":
+            self.ticket = None
+            self.superseded_ticket_session = session_id
+
+        self.session_versions[session_id] = int(current.get("version") or 0)
+        self.base_facts[session_id] = copy.deepcopy(current_facts)
+
+    def pending_messages(self, session_id: str) -> list[dict]:
+        """Staged-but-unflushed messages, shaped like `get_chat_history()` rows."""
+        return [{"role": role, "content": content} for sid, role, content in self.messages if sid == session_id]
+
+    def is_empty(self) -> bool:
+        return not (self.session_insert or self.messages or self.session_updates or self.summaries or self.ticket)
+
+    def clear(self):
+        self.session_insert = None
+        self.messages = []
+        self.session_updates = {}
+        self.summaries = {}
+        self.summary_turns = {}
+        self.session_versions = {}
+        self.base_facts = {}
+        self.ticket = None
+        self.superseded_ticket_session = None
@@ -0,0 +1,47 @@
+"""
+Pluggable storage for sessions, messages, tickets, prompt versions and
+customer profiles.
+
+    STORAGE_BACKEND=mysql    app/services/db.py on the pooled MySQL connection (default)
+    STORAGE_BACKEND=sqlite   embedded SQLite file at SQLITE_PATH, WAL mode
+    STORAGE_BACKEND=memory   process-local dicts; nothing survives a restart
+
+Backends are imported on first use so a deployment only loads the driver it
+runs on.
+"""
+
+from __future__ import annotations
+
+import importlib
+import threading
+from typing import Optional
+
+from app.core.config import settings
+from app.storage.base import StorageBackend
+
+BACKENDS = {
+    "mysql": ("app.storage.mysql", "MySQLBackend"),
+    "sqlite": ("app.storage.sqlite", "SQLiteBackend"),
+    "memory": ("app.storage.memory", "MemoryBackend"),
+}
+
+_lock = threading.Lock()
+_storage: Optional[StorageBackend] = None
+
+
+def create_backend(name: str) -> StorageBackend:
+    try:
+        module_name, class_name = BACKENDS[name.strip().lower()]
+    except KeyError:
+        raise ValueError(f"Unknown STORAGE_BACKEND {name!r}; expected one of {', '.join(BACKENDS)}") from None
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def get_storage() -> StorageBackend:
+    """The process-wide backend selected by STORAGE_BACKEND."""
+    global _storage
+    if _storage is None:
+        with _lock:
+            if _storage is None:
+                _storage = create_backend(settings.STORAGE_BACKEND)
+    return _storage
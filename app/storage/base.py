@@ -0,0 +1,275 @@
+"""
+Storage interface for sessions, messages, tickets, prompt versions and
+customer profiles, plus the pieces every backend shares: the session
+compare-and-swap retry loop, ticket constants and event publishing, and
+the compressed archive format.
+
+Backends are synchronous. `blocking` tells async_db whether calls must be
+shipped to its thread pool (network databases) or can run on the event
+loop directly.
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Callable, Optional
+
+from app.core import codec
+from app.core.config import settings
+from app.services.cache import TTLCache
+from app.services.events import ticket_event_type, ticket_events
+
+logger = logging.getLogger(__name__)
+
+OPEN_TICKET_STATUSES = ("OPEN", "IN_PROGRESS", "DISPATCHED", "ON_SITE")
+CLOSED_TICKET_STATUSES = ("RESOLVED", "CLOSED")
+
+# sort name -> (column, direction). Every sort breaks ties on id in the same direction.
+TICKET_SORTS = {
+    "-updated_at": ("updated_at", "DESC"),
+    "-created_at": ("created_at", "DESC"),
+    "created_at": ("created_at", "ASC"),
+}
+
+# Everything but collected_data, for list views that don't need the JSON blob.
+TICKET_SUMMARY_FIELDS = (
+    "id", "session_id", "user_id", "source", "reason", "priority", "status",
+    "customer_name", "phone", "vehicle_model", "created_at", "updated_at",
+)
+
+
+class SessionConflictError(Exception):
+    """A chat_sessions row changed after it was read (the version compare-and-swap failed)."""
+
+    def __init__(self, session_id: str):
+        super().__init__(f"Session {session_id} was modified concurrently")
+        self.session_id = session_id
+
+
+_cas_stats = {"conflicts": 0, "retries": 0, "exhausted": 0}
+
+
+def session_cas_stats() -> dict:
+    return dict(_cas_stats)
+
+
+def record_cas_conflict():
+    _cas_stats["conflicts"] += 1
+
+
+def commit_with_retries(commit_once: Callable, load_sessions: Callable, uow):
+    """
+    Run `commit_once(uow)`; on a SessionConflictError rebase the turn on the
+    current row from `load_sessions([session_id])` and retry, up to
+    SESSION_CAS_MAX_RETRIES times.
+    """
+    retries = settings.SESSION_CAS_MAX_RETRIES
+    for attempt in range(retries + 1):
+        try:
+            return commit_once(uow)
+        except SessionConflictError as conflict:
+            _cas_stats["conflicts"] += 1
+            if attempt == retries:
+                _cas_stats["exhausted"] += 1
+                raise
+            _cas_stats["retries"] += 1
+            current = load_sessions([conflict.session_id])
+            if conflict.session_id not in current:
+                raise
+            uow.rebase(conflict.session_id, current[conflict.session_id])
+            logger.info(f"Session {conflict.session_id} changed concurrently; retrying turn commit (attempt {attempt + 2}).")
+
+
+def publish_ticket(row: Optional[dict], created: bool = False):
+    """Publish a just-committed ticket row to live dashboard subscribers."""
+    if row:
+        ticket_events.publish(ticket_event_type(row.get("status"), created=created), row)
+
+
+def parse_json_column(data):
+    if isinstance(data, (bytes, bytearray, str)):
+        try:
+            data = codec.loads(data)
+        except ValueError:
+            return {}
+    return data if isinstance(data, dict) else {}
+
+
+def pack_messages(rows: list[dict]) -> bytes:
+    return zlib.compress(codec.dumpb([
+        {"message_id": r["message_id"], "role": r["role"], "content": r["content"], "created_at": r["created_at"]}
+        for r in rows
+    ]))
+
+
+def unpack_messages(payload: bytes) -> list[dict]:
+    rows = codec.loads(zlib.decompress(payload))
+    for r in rows:
+        if isinstance(r.get("created_at"), str):
+            r["created_at"] = datetime.fromisoformat(r["created_at"])
+    return rows
+
+
+# Unpacked archives by (session_id, last_message_id). Streaming a transcript reads
+# one batch per call; without this every batch would inflate the whole blob again.
+# Re-archiving a session raises its last_message_id, so entries never go stale.
+_archive_reads = TTLCache(maxsize=settings.ARCHIVE_READ_CACHE_SIZE, ttl=60)
+
+
+def archived_batch(session_id: str, last_message_id: Optional[int], load_payload: Callable[[], Optional[bytes]],
+                   after: Optional[int], limit: int) -> list[dict]:
+    """
+    Up to `limit` archived messages after message `after`, oldest first.
+    `last_message_id` is the archive row's (None without one); the payload is
+    only loaded and inflated when the batch reaches into the archive.
+    """
+    if last_message_id is None or (after is not None and after >= last_message_id):
+        return []
+    key = (session_id, last_message_id)
+    rows = _archive_reads.get(key)
+    if rows is None:
+        payload = load_payload()
+        if not payload:
+            return []
+        rows = unpack_messages(payload)
+        _archive_reads.set(key, rows)
+    start = 0 if after is None else bisect.bisect_right(rows, after, key=lambda m: m["message_id"])
+    return [dict(m) for m in rows[start:start + limit]]
+
+
+def merge_archived_page(live: list[dict], archived: list[dict], before: Optional[int], limit: Optional[int]) -> list[dict]:
+    """
+    Combine a transcript read with the session's archived messages, which all
+    predate the live ones: the whole history oldest first without `limit`,
+    otherwise the page newest first, topped up from the archive.
+    """
+    if limit is None:
+        return archived + live
+    older = [m for m in reversed(archived) if before is None or m["message_id"] < before]
+    return live + older[: max(0, limit - len(live))]
+
+
+class StorageBackend(ABC):
+    """
+    Operations the chat and agent APIs need from storage. Semantics follow
+    the MySQL implementation in app/services/db.py; rows are plain dicts
+    with JSON columns already decoded.
+    """
+
+    name: str = ""
+    blocking: bool = True
+
+    # --- Lifecycle ---
+
+    def setup(self):
+        """Create or upgrade the schema and open connections (startup)."""
+
+    def close(self):
+        """Release connections (shutdown)."""
+
+    def stats(self) -> dict:
+        return {}
+
+    def cache_stats(self) -> dict:
+        """Stats of the read-through caches in front of the store, by name ("sessions", "profiles")."""
+        return {}
+
+    # --- Customer profiles (host app) ---
+
+    @abstractmethod
+    def get_customer_profile(self, customer_id: str) -> Optional[dict]: ...
+
+    # --- Sessions and messages ---
+
+    @abstractmethod
+    def get_active_session(self, customer_id: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    def get_session_by_id(self, session_id: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    def create_session(self, session_id: str, customer_id: str, prompt_version_id: Optional[int] = None,
+                       initial_data: Optional[dict] = None, initial_flow_step: str = "SAFETY"): ...
+
+    @abstractmethod
+    def save_message(self, session_id: str, role: str, content: str): ...
+
+    @abstractmethod
+    def get_chat_history(self, session_id: str, limit: int = 10, include_system: bool = True) -> list[dict]: ...
+
+    @abstractmethod
+    def update_session(self, session_id: str, flow_step: str, extracted_data: dict, status: str = "ACTIVE",
+                       expected_version: Optional[int] = None): ...
+
+    @abstractmethod
+    def mark_session_resolved(self, session_id: str) -> bool: ...
+
+    @abstractmethod
+    def get_escalated_sessions(self) -> list[dict]: ...
+
+    def commit_unit_of_work(self, uow):
+        """Flush a TurnUnitOfWork atomically, with compare-and-swap retries; returns the ticket id."""
+        return commit_with_retries(self._commit_unit_of_work_once, self._load_sessions_for_rebase, uow)
+
+    @abstractmethod
+    def _commit_unit_of_work_once(self, uow): ...
+
+    @abstractmethod
+    def _load_sessions_for_rebase(self, session_ids) -> dict: ...
+
+    # --- Tickets ---
+
+    @abstractmethod
+    def get_open_ticket_for_session(self, session_id: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    def create_ticket(self, session_id: str, user_id: str, reason: str, priority: str = "normal",
+                      source: str = "ESCALATION", collected_data: Optional[dict] = None,
+                      customer_name: Optional[str] = None, phone: Optional[str] = None,
+                      vehicle_model: Optional[str] = None) -> Optional[int]: ...
+
+    @abstractmethod
+    def list_open_tickets(self, statuses: Optional[list[str]] = None, priorities: Optional[list[str]] = None,
+                          source: Optional[str] = None, reason: Optional[str] = None,
+                          min_age_minutes: Optional[int] = None, max_age_minutes: Optional[int] = None,
+                          sort: str = "-updated_at", after: Optional[tuple] = None, limit: Optional[int] = None,
+                          include_collected_data: bool = True) -> list[dict]: ...
+
+    @abstractmethod
+    def latest_ticket_update(self) -> Optional[datetime]: ...
+
+    @abstractmethod
+    def list_ticket_changes(self, since) -> list[dict]: ...
+
+    @abstractmethod
+    def update_ticket_status(self, ticket_id: int, status: str) -> bool: ...
+
+    # --- Transcripts and archival ---
+
+    @abstractmethod
+    def get_session_transcript(self, session_id: str, before: Optional[int] = None,
+                               limit: Optional[int] = None, include_messages: bool = True) -> Optional[dict]: ...
+
+    @abstractmethod
+    def get_session_messages(self, session_id: str, after: Optional[int] = None, limit: int = 200) -> list[dict]: ...
+
+    @abstractmethod
+    def find_archivable_sessions(self, retention_days: int, limit: int) -> list[str]: ...
+
+    @abstractmethod
+    def archive_session_messages(self, session_id: str, retention_days: int) -> int: ...
+
+    # --- Prompt registry ---
+
+    @abstractmethod
+    def ensure_prompt_version(self, name: str, content: str, content_sha256: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    def list_prompt_versions(self) -> list[dict]: ...
+
+    @abstractmethod
+    def get_prompt_version(self, prompt_version_id: int) -> Optional[dict]: ...
@@ -0,0 +1,425 @@
+"""
+In-memory backend: plain dicts behind one lock, for tests, benchmarks and
+single-process demos. Nothing survives a restart and every worker process
+has its own copy, so don't run it behind more than one worker.
+
+Calls are pure Python and never block on I/O, so async_db runs them on the
+event loop instead of its thread pool. Rows are deep-copied on the way in
+and out so callers can't mutate stored state.
+"""
+
+from __future__ import annotations
+
+import copy
+import itertools
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.storage.base import (
+    CLOSED_TICKET_STATUSES,
+    OPEN_TICKET_STATUSES,
+    TICKET_SORTS,
+    TICKET_SUMMARY_FIELDS,
+    SessionConflictError,
+    StorageBackend,
+    archived_batch,
+    merge_archived_page,
+    pack_messages,
+    publish_ticket,
+    record_cas_conflict,
+    unpack_messages,
+)
+
+_ESCALATED_FIELDS = ("session_id", "customer_id", "current_flow_step", "extracted_data", "updated_at")
+_TRANSCRIPT_FIELDS = (
+    "session_id", "customer_id", "current_flow_step", "extracted_data", "prompt_version_id",
+    "transcript_archived_at", "created_at",
+)
+
+
+def _pick(row: dict, fields) -> dict:
+    return {f: copy.deepcopy(row.get(f)) for f in fields}
+
+
+class MemoryBackend(StorageBackend):
+    name = "memory"
+    blocking = False
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._sessions: dict[str, dict] = {}
+        self._sessions_by_customer: dict[str, list[str]] = defaultdict(list)
+        self._messages: dict[str, list[dict]] = defaultdict(list)
+        self._archive: dict[str, bytes] = {}
+        self._archive_last_ids: dict[str, int] = {}
+        self._tickets: dict[int, dict] = {}
+        self._prompts: list[dict] = []
+        self._profiles: dict[str, dict] = {}
+        self._message_ids = itertools.count(1)
+        self._ticket_ids = itertools.count(1)
+        self._prompt_ids = itertools.count(1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "messages": sum(len(m) for m in self._messages.values()),
+                "archived_sessions": len(self._archive),
+                "tickets": len(self._tickets),
+            }
+
+    # --- Customer profiles ---
+
+    def add_customer_profile(self, customer_id: str, name: Optional[str] = None, phone: Optional[str] = None,
+                             vehicle_model: Optional[str] = None):
+        """Seed a host-app profile (there is no `customers` table to read from)."""
+        with self._lock:
+            self._profiles[str(customer_id)] = {
+                "id": customer_id, "name": name, "phone": phone, "vehicle_model": vehicle_model,
+            }
+
+    def get_customer_profile(self, customer_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._profiles.get(str(customer_id))
+            return dict(row) if row else None
+
+    # --- Sessions and messages ---
+
+    def _insert_session(self, session_id, customer_id, prompt_version_id, initial_data, initial_flow_step):
+        now = datetime.now()
+        self._sessions[session_id] = {
+            "session_id": session_id,
+            "customer_id": customer_id,
+            "status": "ACTIVE",
+            "current_flow_step": initial_flow_step,
+            "extracted_data": copy.deepcopy(initial_data or {}),
+            "conversation_summary": None,
+            "prompt_version_id": prompt_version_id,
+            "version": 0,
+            "transcript_archived_at": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self._sessions_by_customer[str(customer_id)].append(session_id)
+
+    def _insert_messages(self, rows):
+        now = datetime.now()
+        for session_id, role, content in rows:
+            self._messages[session_id].append({
+                "message_id": next(self._message_ids), "role": role, "content": content, "created_at": now,
+            })
+
+    def _touch_session(self, session: dict, **fields):
+        session.update(fields)
+        session["version"] += 1
+        session["updated_at"] = datetime.now()
+
+    def get_active_session(self, customer_id: str) -> Optional[dict]:
+        with self._lock:
+            candidates = [
+                self._sessions[sid] for sid in self._sessions_by_customer.get(str(customer_id), ())
+                if self._sessions[sid]["status"] in ("ACTIVE", "ESCALATED")
+            ]
+            if not candidates:
+                return None
+            return copy.deepcopy(max(reversed(candidates), key=lambda s: s["updated_at"]))
+
+    def get_session_by_id(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._sessions.get(session_id)
+            return copy.deepcopy(row) if row else None
+
+    def create_session(self, session_id: str, customer_id: str, prompt_version_id: Optional[int] = None,
+                       initial_data: Optional[dict] = None, initial_flow_step: str = "SAFETY"):
+        with self._lock:
+            self._insert_session(session_id, customer_id, prompt_version_id, initial_data, initial_flow_step)
+
+    def save_message(self, session_id: str, role: str, content: str):
+        with self._lock:
+            self._insert_messages([(session_id, role, content)])
+
+    def get_chat_history(self, session_id: str, limit: int = 10, include_system: bool = True) -> list[dict]:
+        with self._lock:
+            rows = [m for m in self._messages.get(session_id, ()) if include_system or m["role"] != "system"]
+            return [{"role": m["role"], "content": m["content"]} for m in rows[-limit:]] if limit > 0 else []
+
+    def update_session(self, session_id: str, flow_step: str, extracted_data: dict, status: str = "ACTIVE",
+                       expected_version: Optional[int] = None):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if expected_version is not None and (session is None or session["version"] != expected_version):
+                record_cas_conflict()
+                raise SessionConflictError(session_id)
+            if session is not None:
+                self._touch_session(
+                    session, current_flow_step=flow_step, extracted_data=copy.deepcopy(extracted_data), status=status
+                )
+
+    def mark_session_resolved(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return False
+            self._touch_session(session, status="RESOLVED")
+            return True
+
+    def get_escalated_sessions(self) -> list[dict]:
+        with self._lock:
+            rows = [s for s in self._sessions.values() if s["status"] == "ESCALATED"]
+            rows.sort(key=lambda s: s["updated_at"], reverse=True)
+            return [_pick(s, _ESCALATED_FIELDS) for s in rows]
+
+    def _load_sessions_for_rebase(self, session_ids) -> dict:
+        with self._lock:
+            return {sid: copy.deepcopy(self._sessions[sid]) for sid in session_ids if sid in self._sessions}
+
+    def _commit_unit_of_work_once(self, uow):
+        if uow.is_empty():
+            return uow.ticket_id
+        updated = list(uow.session_updates) + [sid for sid in uow.summaries if sid not in uow.session_updates]
+        ticket = None
+        with self._lock:
+            # Check every compare-and-swap before writing anything, so a conflict leaves no partial turn behind.
+            inserted = uow.session_insert["session_id"] if uow.session_insert else None
+            for session_id in updated:
+                expected = uow.session_versions.get(session_id)
+                if expected is None:
+                    continue
+                current = 0 if session_id == inserted else (self._sessions.get(session_id) or {}).get("version")
+                if current != expected:
+                    raise SessionConflictError(session_id)
+
+            if uow.session_insert:
+                ins = uow.session_insert
+                self._insert_session(
+                    ins["session_id"], ins["customer_id"], ins["prompt_version_id"], ins["initial_data"],
+                    ins["initial_flow_step"],
+                )
+            self._insert_messages(uow.messages)
+            for session_id in updated:
+                session = self._sessions.get(session_id)
+                if session is None:
+                    continue
+                fields = {}
+                upd = uow.session_updates.get(session_id)
+                if upd:
+                    fields.update(
+                        current_flow_step=upd["flow_step"],
+                        extracted_data=copy.deepcopy(upd["extracted_data"]),
+                        status=upd["status"],
+                    )
+                if session_id in uow.summaries:
+                    fields["conversation_summary"] = uow.summaries[session_id]
+                self._touch_session(session, **fields)
+            if uow.ticket:
+                ticket = self._insert_ticket(**uow.ticket)
+                uow.ticket_id = ticket["id"]
+            elif uow.superseded_ticket_session and uow.ticket_id is None:
+                row = self._open_ticket(uow.superseded_ticket_session)
+                uow.ticket_id = row["id"] if row else None
+        if ticket:
+            publish_ticket(ticket, created=True)
+        uow.clear()
+        return uow.ticket_id
+
+    # --- Tickets ---
+
+    def _insert_ticket(self, session_id, user_id, reason, priority="normal", source="ESCALATION",
+                       collected_data=None, customer_name=None, phone=None, vehicle_model=None) -> dict:
+        now = datetime.now()
+        row = {
+            "id": next(self._ticket_ids),
+            "session_id": session_id,
+            "user_id": str(user_id),
+            "source": source,
+            "reason": reason,
+            "priority": priority,
+            "status": "OPEN",
+            "customer_name": customer_name,
+            "phone": phone,
+            "vehicle_model": vehicle_model,
+            "collected_data": copy.deepcopy(collected_data or {}),
+            "created_at": now,
+            "updated_at": now,
+        }
+        self._tickets[row["id"]] = row
+        return copy.deepcopy(row)
+
+    def _open_ticket(self, session_id: str) -> Optional[dict]:
+        rows = [
+            t for t in self._tickets.values()
+            if t["session_id"] == session_id and t["status"] not in CLOSED_TICKET_STATUSES
+        ]
+        return max(rows, key=lambda t: t["updated_at"]) if rows else None
+
+    def get_open_ticket_for_session(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            return copy.deepcopy(self._open_ticket(session_id))
+
+    def create_ticket(self, session_id: str, user_id: str, reason: str, priority: str = "normal",
+                      source: str = "ESCALATION", collected_data: Optional[dict] = None,
+                      customer_name: Optional[str] = None, phone: Optional[str] = None,
+                      vehicle_model: Optional[str] = None) -> Optional[int]:
+        with self._lock:
+            row = self._insert_ticket(
+                session_id, user_id, reason, priority, source, collected_data, customer_name, phone, vehicle_model
+            )
+        publish_ticket(row, created=True)
+        return row["id"]
+
+    def list_open_tickets(self, statuses: Optional[list[str]] = None, priorities: Optional[list[str]] = None,
+                          source: Optional[str] = None, reason: Optional[str] = None,
+                          min_age_minutes: Optional[int] = None, max_age_minutes: Optional[int] = None,
+                          sort: str = "-updated_at", after: Optional[tuple] = None, limit: Optional[int] = None,
+                          include_collected_data: bool = True) -> list[dict]:
+        column, direction = TICKET_SORTS[sort]
+        statuses = [st for st in (statuses or OPEN_TICKET_STATUSES) if st in OPEN_TICKET_STATUSES]
+        if not statuses:
+            return []
+        now = datetime.now()
+        descending = direction == "DESC"
+
+        def wanted(t: dict) -> bool:
+            if t["status"] not in statuses:
+                return False
+            if priorities and t["priority"] not in priorities:
+                return False
+            if source and t["source"] != source:
+                return False
+            if reason and t["reason"] != reason:
+                return False
+            if min_age_minutes is not None and t["created_at"] > now - timedelta(minutes=int(min_age_minutes)):
+                return False
+            if max_age_minutes is not None and t["created_at"] < now - timedelta(minutes=int(max_age_minutes)):
+                return False
+            if after is not None:
+                key = (t[column], t["id"])
+                return key < tuple(after) if descending else key > tuple(after)
+            return True
+
+        with self._lock:
+            rows = sorted(
+                (t for t in self._tickets.values() if wanted(t)),
+                key=lambda t: (t[column], t["id"]),
+                reverse=descending,
+            )
+            if limit is not None:
+                rows = rows[: int(limit)]
+            if include_collected_data:
+                return copy.deepcopy(rows)
+            return [_pick(t, TICKET_SUMMARY_FIELDS) for t in rows]
+
+    def latest_ticket_update(self) -> Optional[datetime]:
+        with self._lock:
+            return max((t["updated_at"] for t in self._tickets.values()), default=None)
+
+    def list_ticket_changes(self, since) -> list[dict]:
+        with self._lock:
+            rows = [t for t in self._tickets.values() if t["updated_at"] >= since]
+            rows.sort(key=lambda t: (t["updated_at"], t["id"]))
+            return copy.deepcopy(rows)
+
+    def update_ticket_status(self, ticket_id: int, status: str) -> bool:
+        with self._lock:
+            ticket = self._tickets.get(int(ticket_id))
+            if ticket is None:
+                return False
+            ticket["status"] = status
+            ticket["updated_at"] = datetime.now()
+            # Closing a ticket also closes its chat session, as in db.update_ticket_status.
+            if status in CLOSED_TICKET_STATUSES:
+                session = self._sessions.get(ticket["session_id"])
+                if session is not None:
+                    self._touch_session(session, status="RESOLVED")
+            row = copy.deepcopy(ticket)
+        publish_ticket(row)
+        return True
+
+    # --- Transcripts and archival ---
+
+    def _archived(self, session_id: str) -> list[dict]:
+        payload = self._archive.get(session_id)
+        return unpack_messages(payload) if payload else []
+
+    def get_session_transcript(self, session_id: str, before: Optional[int] = None,
+                               limit: Optional[int] = None, include_messages: bool = True) -> Optional[dict]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            metadata = _pick(session, _TRANSCRIPT_FIELDS)
+            if not include_messages:
+                return metadata
+            live = [dict(m) for m in self._messages.get(session_id, ()) if before is None or m["message_id"] < before]
+            if limit is not None:
+                live = live[::-1][: int(limit)]
+            if metadata["transcript_archived_at"] and (limit is None or len(live) < limit):
+                live = merge_archived_page(live, self._archived(session_id), before, limit)
+            metadata["messages"] = live
+            return metadata
+
+    def get_session_messages(self, session_id: str, after: Optional[int] = None, limit: int = 200) -> list[dict]:
+        with self._lock:
+            batch = archived_batch(
+                session_id, self._archive_last_ids.get(session_id), lambda: self._archive.get(session_id), after, limit
+            )
+            if len(batch) < limit:
+                live_after = batch[-1]["message_id"] if batch else after
+                live = [dict(m) for m in self._messages.get(session_id, ()) if live_after is None or m["message_id"] > live_after]
+                batch += live[: limit - len(batch)]
+            return batch
+
+    def _archivable(self, session: dict, retention_days: int) -> bool:
+        return (
+            session["status"] == "RESOLVED"
+            and session["updated_at"] < datetime.now() - timedelta(days=retention_days)
+        )
+
+    def find_archivable_sessions(self, retention_days: int, limit: int) -> list[str]:
+        with self._lock:
+            rows = [
+                s for s in self._sessions.values()
+                if s["transcript_archived_at"] is None and self._archivable(s, retention_days)
+            ]
+            rows.sort(key=lambda s: s["updated_at"])
+            return [s["session_id"] for s in rows[:limit]]
+
+    def archive_session_messages(self, session_id: str, retention_days: int) -> int:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or not self._archivable(session, retention_days):
+                return 0
+            live = self._messages.pop(session_id, [])
+            if live:
+                self._archive[session_id] = pack_messages(self._archived(session_id) + live)
+                self._archive_last_ids[session_id] = live[-1]["message_id"]
+            # Archiving is not session activity: updated_at stays put.
+            session["transcript_archived_at"] = datetime.now()
+            return len(live)
+
+    # --- Prompt registry ---
+
+    def ensure_prompt_version(self, name: str, content: str, content_sha256: str) -> Optional[dict]:
+        with self._lock:
+            for row in self._prompts:
+                if row["name"] == name and row["content_sha256"] == content_sha256:
+                    return dict(row)
+            row = {
+                "id": next(self._prompt_ids),
+                "name": name,
+                "version": 1 + max((r["version"] for r in self._prompts if r["name"] == name), default=0),
+                "content_sha256": content_sha256,
+                "content": content,
+            }
+            self._prompts.append(row)
+            return dict(row)
+
+    def list_prompt_versions(self) -> list[dict]:
+        with self._lock:
+            return [dict(r) for r in self._prompts]
+
+    def get_prompt_version(self, prompt_version_id: int) -> Optional[dict]:
+        with self._lock:
+            return next((dict(r) for r in self._prompts if r["id"] == prompt_version_id), None)
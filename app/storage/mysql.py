@@ -0,0 +1,61 @@
+"""
+MySQL backend: the pooled mysql.connector implementation in
+app/services/db.py, with versioned migrations (app/db/migrations.py) and the
+session/profile caches in front of it.
+"""
+
+from __future__ import annotations
+
+from app.db.connection import close_pool, init_pool, pool_stats
+from app.db.migrations import migrate
+from app.services import db
+from app.storage.base import StorageBackend
+
+
+class MySQLBackend(StorageBackend):
+    name = "mysql"
+    blocking = True
+
+    def setup(self):
+        migrate()
+        init_pool()
+        db.detect_customers_table()
+
+    def close(self):
+        close_pool()
+
+    def stats(self) -> dict:
+        return {"db_pool": pool_stats()}
+
+    def cache_stats(self) -> dict:
+        return {"sessions": db.session_cache.stats(), "profiles": db.profile_cache.stats()}
+
+    get_customer_profile = staticmethod(db.get_customer_profile)
+
+    get_active_session = staticmethod(db.get_active_session)
+    get_session_by_id = staticmethod(db.get_session_by_id)
+    create_session = staticmethod(db.create_session)
+    save_message = staticmethod(db.save_message)
+    get_chat_history = staticmethod(db.get_chat_history)
+    update_session = staticmethod(db.update_session)
+    mark_session_resolved = staticmethod(db.mark_session_resolved)
+    get_escalated_sessions = staticmethod(db.get_escalated_sessions)
+    commit_unit_of_work = staticmethod(db.commit_unit_of_work)
+    _commit_unit_of_work_once = staticmethod(db._commit_unit_of_work_once)
+    _load_sessions_for_rebase = staticmethod(db._load_sessions_for_rebase)
+
+    get_open_ticket_for_session = staticmethod(db.get_open_ticket_for_session)
+    create_ticket = staticmethod(db.create_ticket)
+    list_open_tickets = staticmethod(db.list_open_tickets)
+    latest_ticket_update = staticmethod(db.latest_ticket_update)
+    list_ticket_changes = staticmethod(db.list_ticket_changes)
+    update_ticket_status = staticmethod(db.update_ticket_status)
+
+    get_session_transcript = staticmethod(db.get_session_transcript)
+    get_session_messages = staticmethod(db.get_session_messages)
+    find_archivable_sessions = staticmethod(db.find_archivable_sessions)
+    archive_session_messages = staticmethod(db.archive_session_messages)
+
+    ensure_prompt_version = staticmethod(db.ensure_prompt_version)
+    list_prompt_versions = staticmethod(db.list_prompt_versions)
+    get_prompt_version = staticmethod(db.get_prompt_version)
@@ -0,0 +1,549 @@
+"""
+Embedded SQLite backend for single-node deployments: one database file at
+SQLITE_PATH in WAL mode, so readers never wait on the writer and a commit is
+a local fsync-less append instead of a network round trip.
+
+Each async_db worker thread keeps its own connection. Connections run in
+autocommit mode; every write goes through `_write()`, which takes the write
+lock up front (BEGIN IMMEDIATE) so a compare-and-swap never has to upgrade a
+read lock mid-transaction. Timestamps are stored as fixed-width local-time
+text, so they sort as strings and compare with `_ts()`-formatted parameters.
+
+The schema is created on `setup()`; it mirrors the MySQL migrations after
+007. A host-app `customers` table in the same file is used for profiles if
+present.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.core import codec
+from app.core.config import settings
+from app.storage.base import (
+    CLOSED_TICKET_STATUSES,
+    OPEN_TICKET_STATUSES,
+    TICKET_SORTS,
+    TICKET_SUMMARY_FIELDS,
+    SessionConflictError,
+    StorageBackend,
+    archived_batch,
+    merge_archived_page,
+    pack_messages,
+    parse_json_column,
+    publish_ticket,
+    record_cas_conflict,
+    unpack_messages,
+)
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    session_id TEXT PRIMARY KEY,
+    customer_id TEXT,
+    status TEXT NOT NULL DEFAULT 'ACTIVE',
+    version INTEGER NOT NULL DEFAULT 0,
+    current_flow_step TEXT,
+    extracted_data TEXT,
+    conversation_summary TEXT,
+    prompt_version_id INTEGER,
+    transcript_archived_at TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_customer_status ON chat_sessions (customer_id, status, updated_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_archive ON chat_sessions (status, transcript_archived_at, updated_at);
+
+CREATE TABLE IF NOT EXISTS messages (
+    message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL REFERENCES chat_sessions (session_id),
+    role TEXT NOT NULL,
+    content TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session_message ON messages (session_id, message_id);
+
+CREATE TABLE IF NOT EXISTS messages_archive (
+    session_id TEXT PRIMARY KEY REFERENCES chat_sessions (session_id),
+    message_count INTEGER NOT NULL,
+    first_message_id INTEGER NOT NULL,
+    last_message_id INTEGER NOT NULL,
+    payload BLOB NOT NULL,
+    archived_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL REFERENCES chat_sessions (session_id),
+    user_id TEXT NOT NULL,
+    source TEXT NOT NULL DEFAULT 'ESCALATION',
+    reason TEXT NOT NULL,
+    priority TEXT NOT NULL DEFAULT 'normal',
+    status TEXT NOT NULL DEFAULT 'OPEN',
+    customer_name TEXT,
+    phone TEXT,
+    vehicle_model TEXT,
+    collected_data TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ticket_session ON tickets (session_id, status);
+CREATE INDEX IF NOT EXISTS idx_ticket_updated ON tickets (updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_ticket_status_updated ON tickets (status, updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_ticket_status_created ON tickets (status, created_at, id);
+
+CREATE TABLE IF NOT EXISTS prompt_versions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    content_sha256 TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    UNIQUE (name, version),
+    UNIQUE (name, content_sha256)
+);
+"""
+
+_TIMESTAMP_COLUMNS = frozenset(("created_at", "updated_at", "transcript_archived_at", "archived_at"))
+_JSON_COLUMNS = frozenset(("extracted_data", "collected_data"))
+
+_TICKET_SUMMARY_COLUMNS = ", ".join(TICKET_SUMMARY_FIELDS)
+_OPEN_TICKET_SQL = (
+    f"SELECT * FROM tickets WHERE session_id = ? AND status NOT IN ({', '.join('?' * len(CLOSED_TICKET_STATUSES))}) "
+    "ORDER BY updated_at DESC LIMIT 1"
+)
+
+
+def _ts(value: Optional[datetime] = None) -> str:
+    """Fixed-width text form of a timestamp (now by default)."""
+    return (value or datetime.now()).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def _param(value):
+    return _ts(value) if isinstance(value, datetime) else value
+
+
+def _dict_row(cursor, row) -> dict:
+    out = {}
+    for (column, *_), value in zip(cursor.description, row):
+        if column in _TIMESTAMP_COLUMNS and isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        elif column in _JSON_COLUMNS:
+            value = parse_json_column(value)
+        out[column] = value
+    return out
+
+
+class SQLiteBackend(StorageBackend):
+    name = "sqlite"
+    blocking = True
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.SQLITE_PATH
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._customers_table = False
+
+    # --- Lifecycle ---
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit; the busy timeout is how long a writer waits for the write lock.
+            conn = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False, timeout=settings.DB_POOL_TIMEOUT_SECONDS
+            )
+            conn.row_factory = _dict_row
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA foreign_keys = ON")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _write(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @contextmanager
+    def _read(self):
+        """One snapshot for reads that span several statements."""
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.execute("COMMIT")
+
+    def setup(self):
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        self._customers_table = conn.execute(
+            "SELECT COUNT(*) AS n FROM sqlite_master WHERE type = 'table' AND name = 'customers'"
+        ).fetchone()["n"] > 0
+        logger.info(f"SQLite storage ready at {self.path} (customers table: {self._customers_table}).")
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections = []
+        self._local = threading.local()
+
+    def stats(self) -> dict:
+        with self._connections_lock:
+            return {"path": self.path, "connections": len(self._connections)}
+
+    # --- Customer profiles ---
+
+    def get_customer_profile(self, customer_id: str) -> Optional[dict]:
+        if not self._customers_table:
+            return None
+        return self._conn().execute(
+            "SELECT id, name, phone, vehicle_model FROM customers WHERE id = ? LIMIT 1", (customer_id,)
+        ).fetchone()
+
+    # --- Sessions and messages ---
+
+    @staticmethod
+    def _insert_session(conn, session_id, customer_id, prompt_version_id, initial_data, initial_flow_step):
+        now = _ts()
+        conn.execute(
+            "INSERT INTO chat_sessions (session_id, customer_id, extracted_data, current_flow_step, prompt_version_id, "
+            "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (session_id, customer_id, codec.dumps(initial_data or {}), initial_flow_step, prompt_version_id, now, now),
+        )
+
+    @staticmethod
+    def _insert_messages(conn, rows):
+        now = _ts()
+        conn.executemany(
+            "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+            [(session_id, role, content, now) for session_id, role, content in rows],
+        )
+
+    @staticmethod
+    def _update_session(conn, session_id: str, expected_version: Optional[int] = None, **fields) -> int:
+        """Apply `fields` and bump version/updated_at; returns the number of rows changed."""
+        assignments = [f"{column} = ?" for column in fields] + ["version = version + 1", "updated_at = ?"]
+        params = [codec.dumps(v) if column == "extracted_data" else v for column, v in fields.items()]
+        params += [_ts(), session_id]
+        sql = f"UPDATE chat_sessions SET {', '.join(assignments)} WHERE session_id = ?"
+        if expected_version is not None:
+            sql += " AND version = ?"
+            params.append(expected_version)
+        return conn.execute(sql, params).rowcount
+
+    def get_active_session(self, customer_id: str) -> Optional[dict]:
+        return self._conn().execute(
+            "SELECT * FROM chat_sessions WHERE customer_id = ? AND status IN ('ACTIVE','ESCALATED') "
+            "ORDER BY updated_at DESC LIMIT 1",
+            (customer_id,),
+        ).fetchone()
+
+    def get_session_by_id(self, session_id: str) -> Optional[dict]:
+        return self._conn().execute("SELECT * FROM chat_sessions WHERE session_id = ? LIMIT 1", (session_id,)).fetchone()
+
+    def create_session(self, session_id: str, customer_id: str, prompt_version_id: Optional[int] = None,
+                       initial_data: Optional[dict] = None, initial_flow_step: str = "SAFETY"):
+        with self._write() as conn:
+            self._insert_session(conn, session_id, customer_id, prompt_version_id, initial_data, initial_flow_step)
+
+    def save_message(self, session_id: str, role: str, content: str):
+        with self._write() as conn:
+            self._insert_messages(conn, [(session_id, role, content)])
+
+    def get_chat_history(self, session_id: str, limit: int = 10, include_system: bool = True) -> list[dict]:
+        role_filter = "" if include_system else " AND role <> 'system'"
+        return self._conn().execute(
+            "SELECT role, content FROM (SELECT role, content, message_id FROM messages WHERE session_id = ?"
+            + role_filter + " ORDER BY message_id DESC LIMIT ?) ORDER BY message_id",
+            (session_id, limit),
+        ).fetchall()
+
+    def update_session(self, session_id: str, flow_step: str, extracted_data: dict, status: str = "ACTIVE",
+                       expected_version: Optional[int] = None):
+        with self._write() as conn:
+            changed = self._update_session(
+                conn, session_id, expected_version,
+                current_flow_step=flow_step, extracted_data=extracted_data, status=status,
+            )
+            if expected_version is not None and changed == 0:
+                record_cas_conflict()
+                raise SessionConflictError(session_id)
+
+    def mark_session_resolved(self, session_id: str) -> bool:
+        with self._write() as conn:
+            return self._update_session(conn, session_id, status="RESOLVED") > 0
+
+    def get_escalated_sessions(self) -> list[dict]:
+        return self._conn().execute(
+            "SELECT session_id, customer_id, current_flow_step, extracted_data, updated_at FROM chat_sessions "
+            "WHERE status = 'ESCALATED' ORDER BY updated_at DESC"
+        ).fetchall()
+
+    def _load_sessions_for_rebase(self, session_ids) -> dict:
+        rows = self._conn().execute(
+            f"SELECT * FROM chat_sessions WHERE session_id IN ({', '.join('?' * len(session_ids))})",
+            tuple(session_ids),
+        ).fetchall()
+        return {r["session_id"]: r for r in rows}
+
+    def _commit_unit_of_work_once(self, uow):
+        if uow.is_empty():
+            return uow.ticket_id
+        created_ticket = None
+        with self._write() as conn:
+            if uow.session_insert:
+                ins = uow.session_insert
+                self._insert_session(
+                    conn, ins["session_id"], ins["customer_id"], ins["prompt_version_id"], ins["initial_data"],
+                    ins["initial_flow_step"],
+                )
+            if uow.messages:
+                self._insert_messages(conn, uow.messages)
+            for session_id in list(uow.session_updates) + [sid for sid in uow.summaries if sid not in uow.session_updates]:
+                fields = {}
+                upd = uow.session_updates.get(session_id)
+                if upd:
+                    fields.update(current_flow_step=upd["flow_step"], extracted_data=upd["extracted_data"], status=upd["status"])
+                if session_id in uow.summaries:
+                    fields["conversation_summary"] = uow.summaries[session_id]
+                expected = uow.session_versions.get(session_id)
+                if self._update_session(conn, session_id, expected, **fields) == 0 and expected is not None:
+                    raise SessionConflictError(session_id)
+            if uow.ticket:
+                uow.ticket_id = self._insert_ticket(conn, **uow.ticket)
+                created_ticket = conn.execute("SELECT * FROM tickets WHERE id = ?", (uow.ticket_id,)).fetchone()
+            elif uow.superseded_ticket_session and uow.ticket_id is None:
+                row = conn.execute(_OPEN_TICKET_SQL, (uow.superseded_ticket_session, *CLOSED_TICKET_STATUSES)).fetchone()
+                uow.ticket_id = row["id"] if row else None
+        publish_ticket(created_ticket, created=True)
+        uow.clear()
+        return uow.ticket_id
+
+    # --- Tickets ---
+
+    @staticmethod
+    def _insert_ticket(conn, session_id, user_id, reason, priority="normal", source="ESCALATION",
+                       collected_data=None, customer_name=None, phone=None, vehicle_model=None) -> int:
+        now = _ts()
+        return conn.execute(
+            "INSERT INTO tickets (session_id, user_id, source, reason, priority, status, customer_name, phone, "
+            "vehicle_model, collected_data, created_at, updated_at) VALUES (?, ?, ?, ?, ?, 'OPEN', ?, ?, ?, ?, ?, ?)",
+            (session_id, str(user_id), source, reason, priority, customer_name, phone, vehicle_model,
+             codec.dumps(collected_data or {}), now, now),
+        ).lastrowid
+
+    def get_open_ticket_for_session(self, session_id: str) -> Optional[dict]:
+        return self._conn().execute(_OPEN_TICKET_SQL, (session_id, *CLOSED_TICKET_STATUSES)).fetchone()
+
+    def create_ticket(self, session_id: str, user_id: str, reason: str, priority: str = "normal",
+                      source: str = "ESCALATION", collected_data: Optional[dict] = None,
+                      customer_name: Optional[str] = None, phone: Optional[str] = None,
+                      vehicle_model: Optional[str] = None) -> Optional[int]:
+        with self._write() as conn:
+            ticket_id = self._insert_ticket(
+                conn, session_id, user_id, reason, priority, source, collected_data, customer_name, phone, vehicle_model
+            )
+            row = conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+        publish_ticket(row, created=True)
+        return ticket_id
+
+    def list_open_tickets(self, statuses: Optional[list[str]] = None, priorities: Optional[list[str]] = None,
+                          source: Optional[str] = None, reason: Optional[str] = None,
+                          min_age_minutes: Optional[int] = None, max_age_minutes: Optional[int] = None,
+                          sort: str = "-updated_at", after: Optional[tuple] = None, limit: Optional[int] = None,
+                          include_collected_data: bool = True) -> list[dict]:
+        column, direction = TICKET_SORTS[sort]
+        statuses = [st for st in (statuses or OPEN_TICKET_STATUSES) if st in OPEN_TICKET_STATUSES]
+        if not statuses:
+            return []
+
+        where = [f"status IN ({', '.join('?' * len(statuses))})"]
+        params: list = list(statuses)
+        if priorities:
+            where.append(f"priority IN ({', '.join('?' * len(priorities))})")
+            params.extend(priorities)
+        if source:
+            where.append("source = ?")
+            params.append(source)
+        if reason:
+            where.append("reason = ?")
+            params.append(reason)
+        now = datetime.now()
+        if min_age_minutes is not None:
+            where.append("created_at <= ?")
+            params.append(_ts(now - timedelta(minutes=int(min_age_minutes))))
+        if max_age_minutes is not None:
+            where.append("created_at >= ?")
+            params.append(_ts(now - timedelta(minutes=int(max_age_minutes))))
+        if after is not None:
+            op = "<" if direction == "DESC" else ">"
+            where.append(f"({column} {op} ? OR ({column} = ? AND id {op} ?))")
+            params.extend([_param(after[0]), _param(after[0]), after[1]])
+
+        sql = (
+            f"SELECT {'*' if include_collected_data else _TICKET_SUMMARY_COLUMNS} FROM tickets "
+            f"WHERE {' AND '.join(where)} ORDER BY {column} {direction}, id {direction}"
+        )
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return self._conn().execute(sql, params).fetchall()
+
+    def latest_ticket_update(self) -> Optional[datetime]:
+        row = self._conn().execute("SELECT MAX(updated_at) AS updated_at FROM tickets").fetchone()
+        return row["updated_at"] if row else None
+
+    def list_ticket_changes(self, since) -> list[dict]:
+        return self._conn().execute(
+            "SELECT * FROM tickets WHERE updated_at >= ? ORDER BY updated_at, id", (_param(since),)
+        ).fetchall()
+
+    def update_ticket_status(self, ticket_id: int, status: str) -> bool:
+        with self._write() as conn:
+            ticket = conn.execute("SELECT id, session_id FROM tickets WHERE id = ? LIMIT 1", (ticket_id,)).fetchone()
+            if not ticket:
+                return False
+            conn.execute("UPDATE tickets SET status = ?, updated_at = ? WHERE id = ?", (status, _ts(), ticket_id))
+            # Closing a ticket also closes its chat session, as in db.update_ticket_status.
+            if status in CLOSED_TICKET_STATUSES:
+                self._update_session(conn, ticket["session_id"], status="RESOLVED")
+            row = conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+        publish_ticket(row)
+        return True
+
+    # --- Transcripts and archival ---
+
+    @staticmethod
+    def _session_messages(conn, session_id: str, before: Optional[int] = None, after: Optional[int] = None,
+                          limit: Optional[int] = None, newest_first: bool = False) -> list[dict]:
+        where, params = ["session_id = ?"], [session_id]
+        if before is not None:
+            where.append("message_id < ?")
+            params.append(before)
+        if after is not None:
+            where.append("message_id > ?")
+            params.append(after)
+        sql = (
+            f"SELECT message_id, role, content, created_at FROM messages WHERE {' AND '.join(where)} "
+            f"ORDER BY message_id {'DESC' if newest_first else 'ASC'}"
+        )
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _archived_messages(conn, session_id: str) -> list[dict]:
+        row = conn.execute("SELECT payload FROM messages_archive WHERE session_id = ?", (session_id,)).fetchone()
+        return unpack_messages(row["payload"]) if row else []
+
+    def get_session_transcript(self, session_id: str, before: Optional[int] = None,
+                               limit: Optional[int] = None, include_messages: bool = True) -> Optional[dict]:
+        with self._read() as conn:
+            metadata = conn.execute(
+                "SELECT session_id, customer_id, current_flow_step, extracted_data, prompt_version_id, "
+                "transcript_archived_at, created_at FROM chat_sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            if not metadata or not include_messages:
+                return metadata
+            messages = self._session_messages(conn, session_id, before=before, limit=limit, newest_first=limit is not None)
+            if metadata["transcript_archived_at"] and (limit is None or len(messages) < limit):
+                messages = merge_archived_page(messages, self._archived_messages(conn, session_id), before, limit)
+            metadata["messages"] = messages
+            return metadata
+
+    def get_session_messages(self, session_id: str, after: Optional[int] = None, limit: int = 200) -> list[dict]:
+        with self._read() as conn:
+            row = conn.execute("SELECT last_message_id FROM messages_archive WHERE session_id = ?", (session_id,)).fetchone()
+
+            def load_payload():
+                payload_row = conn.execute("SELECT payload FROM messages_archive WHERE session_id = ?", (session_id,)).fetchone()
+                return payload_row["payload"] if payload_row else None
+
+            batch = archived_batch(session_id, row["last_message_id"] if row else None, load_payload, after, limit)
+            if len(batch) < limit:
+                live_after = batch[-1]["message_id"] if batch else after
+                batch += self._session_messages(conn, session_id, after=live_after, limit=limit - len(batch))
+            return batch
+
+    def find_archivable_sessions(self, retention_days: int, limit: int) -> list[str]:
+        rows = self._conn().execute(
+            "SELECT session_id FROM chat_sessions WHERE status = 'RESOLVED' AND transcript_archived_at IS NULL "
+            "AND updated_at < ? ORDER BY updated_at LIMIT ?",
+            (_ts(datetime.now() - timedelta(days=retention_days)), limit),
+        ).fetchall()
+        return [r["session_id"] for r in rows]
+
+    def archive_session_messages(self, session_id: str, retention_days: int) -> int:
+        with self._write() as conn:
+            if not conn.execute(
+                "SELECT session_id FROM chat_sessions WHERE session_id = ? AND status = 'RESOLVED' AND updated_at < ?",
+                (session_id, _ts(datetime.now() - timedelta(days=retention_days))),
+            ).fetchone():
+                return 0
+            live = self._session_messages(conn, session_id)
+            if live:
+                merged = self._archived_messages(conn, session_id) + live
+                conn.execute(
+                    """
+                    INSERT INTO messages_archive (session_id, message_count, first_message_id, last_message_id, payload, archived_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (session_id) DO UPDATE SET
+                        message_count = excluded.message_count,
+                        last_message_id = excluded.last_message_id,
+                        payload = excluded.payload,
+                        archived_at = excluded.archived_at
+                    """,
+                    (session_id, len(merged), merged[0]["message_id"], merged[-1]["message_id"], pack_messages(merged), _ts()),
+                )
+                conn.execute(
+                    "DELETE FROM messages WHERE session_id = ? AND message_id <= ?", (session_id, live[-1]["message_id"])
+                )
+            # Archiving is not session activity: updated_at stays put.
+            conn.execute("UPDATE chat_sessions SET transcript_archived_at = ? WHERE session_id = ?", (_ts(), session_id))
+            return len(live)
+
+    # --- Prompt registry ---
+
+    def ensure_prompt_version(self, name: str, content: str, content_sha256: str) -> Optional[dict]:
+        select = "SELECT id, name, version, content_sha256, content FROM prompt_versions WHERE name = ? AND content_sha256 = ?"
+        with self._write() as conn:
+            row = conn.execute(select, (name, content_sha256)).fetchone()
+            if row:
+                return row
+            conn.execute(
+                "INSERT INTO prompt_versions (name, version, content_sha256, content, created_at) "
+                "SELECT ?, COALESCE(MAX(version), 0) + 1, ?, ?, ? FROM prompt_versions WHERE name = ?",
+                (name, content_sha256, content, _ts(), name),
+            )
+            return conn.execute(select, (name, content_sha256)).fetchone()
+
+    def list_prompt_versions(self) -> list[dict]:
+        return self._conn().execute("SELECT id, name, version, content_sha256, content FROM prompt_versions ORDER BY id").fetchall()
+
+    def get_prompt_version(self, prompt_version_id: int) -> Optional[dict]:
+        return self._conn().execute(
+            "SELECT id, name, version, content_sha256, content FROM prompt_versions WHERE id = ?", (prompt_version_id,)
+        ).fetchone()
@@ -0,0 +1,96 @@
+"""
+Per-turn JSON serialization cost: stdlib `json` vs `app.core.codec`.
+
+Replays the JSON work one chat turn does: read extracted_data back from
+chat_sessions, build FACTS_JSON for the LLM context, write extracted_data
+(and collected_data when a ticket is raised), and render the response
+body. No database or network is involved.
+
+    python -m benchmarks.json_codec [--turns 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core import codec
+from app.models.schemas import ChatbotMessageResponse
+
+FACTS = {
+    "phone_verified": True,
+    "phone": "9876543210",
+    "location_confirmed": True,
+    "latitude": 12.971599,
+    "longitude": 77.594566,
+    "address": "MG Road, near Trinity metro station, Bengaluru 560001",
+    "location_type": "GPS",
+    "is_safe": True,
+    "is_with_vehicle": True,
+    "issue_category": "Flat Tyre",
+    "issue_description": "Rear left tyre burst on the highway, car is on the shoulder",
+    "service_type": "on_spot",
+    "vehicle_model": "Tata Nexon EV",
+    "notes": ["asked about ETA", "prefers Hindi", "पंचर हो गया"],
+    "updated_at": datetime(2026, 10, 17, 10, 30, 5),
+}
+
+RESPONSE = ChatbotMessageResponse(
+    message="Thanks! A technician is on the way to MG Road. Please stay in a safe spot away from traffic.",
+    state="ROUTING",
+    options=["On-Spot Repair", "Towing Assistance", "Talk to an agent"],
+    ticket_id=1042,
+    service_type="on_spot",
+    priority="normal",
+    extracted_data=FACTS,
+)
+
+
+def _stdlib_turn(stored: str):
+    facts = json.loads(stored)                      # _parse_json_column(extracted_data)
+    json.dumps(facts, default=str)                  # FACTS_JSON in the LLM context
+    json.dumps(facts, default=str)                  # UPDATE chat_sessions.extracted_data
+    json.dumps(facts, default=str)                  # INSERT tickets.collected_data
+    JSONResponse(jsonable_encoder(RESPONSE)).body   # FastAPI default response rendering
+
+
+def _codec_turn(stored: bytes):
+    facts = codec.loads(stored)
+    codec.dumps(facts)
+    codec.dumps(facts)
+    codec.dumps(facts)
+    codec.FastJSONResponse(RESPONSE.model_dump(mode="json")).body
+
+
+def _run(fn, arg, turns: int) -> float:
+    for _ in range(min(1000, turns)):
+        fn(arg)
+    start = time.perf_counter()
+    for _ in range(turns):
+        fn(arg)
+    return (time.perf_counter() - start) / turns * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    stored_std = json.dumps(FACTS, default=str)
+    stored_codec = codec.dumpb(FACTS)
+
+    before = _run(_stdlib_turn, stored_std, args.turns)
+    after = _run(_codec_turn, stored_codec, args.turns)
+    print(f"turns: {args.turns}, codec backend: {codec.BACKEND}")
+    print(f"stdlib json + jsonable_encoder : {before:8.1f} us/turn")
+    print(f"app.core.codec                 : {after:8.1f} us/turn")
+    print(f"speedup                        : {before / after:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Keyword classification: the old per-helper substring loops vs `app.core.classifier`.
+
+Runs both over the labelled corpus in benchmarks/keyword_corpus.jsonl
+(one `{"text": ..., "labels": [...]}` per line), reports how many messages
+each gets wrong and the time per message. With --check it exits non-zero
+if the classifier disagrees with any corpus label, so lexicon edits can be
+checked before they ship.
+
+    python -m benchmarks.keyword_classifier [--rounds 2000] [--check]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from app.core.classifier import AGENT_REQUEST, EMERGENCY, GREETING, SAFE, UNSAFE, classifier
+
+CORPUS = Path(__file__).with_name("keyword_corpus.jsonl")
+
+# The substring lists the chat handlers used before the classifier.
+_LEGACY = {
+    EMERGENCY: [
+        "emergency", "accident", "collision", "crash", "hit", "danger", "unsafe",
+        "fire", "ambulance", "police", "help", "save", "die", "dying", "hurt",
+        "bleeding", "pain", "injured", "hospital", "stuck", "trapped", "danger", "threat",
+    ],
+    AGENT_REQUEST: ["talk to agent", "agent", "human", "person", "someone", "call me", "real support", "escalate"],
+    GREETING: ["hi", "hello", "start", "restart", "menu", "status"],
+    SAFE: ["yes", "safe", "ok", "fine", "yeah", "with the vehicle"],
+    UNSAFE: ["no", "unsafe", "not safe", "help"],
+}
+
+
+def _legacy_classify(text: str) -> frozenset:
+    # One lower() and one substring scan per helper, as each helper did on its own.
+    labels = set()
+    for name, words in _LEGACY.items():
+        t = (text or "").lower()
+        if any(w in t for w in words):
+            labels.add(name)
+    return frozenset(labels)
+
+
+def load_corpus(path: Path = CORPUS) -> list[tuple[str, frozenset]]:
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(row["text"], frozenset(row["labels"])) for row in rows]
+
+
+def _errors(fn, corpus) -> list[tuple[str, list, list]]:
+    return [(text, sorted(expected), sorted(fn(text))) for text, expected in corpus if fn(text) != expected]
+
+
+def _run(fn, texts: list[str], rounds: int) -> float:
+    for text in texts:
+        fn(text)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            fn(text)
+    return (time.perf_counter() - start) / (rounds * len(texts)) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--check", action="store_true", help="exit 1 if the classifier misses any corpus label")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus()
+    texts = [text for text, _ in corpus]
+    legacy_errors = _errors(_legacy_classify, corpus)
+    errors = _errors(classifier.classify, corpus)
+
+    print(f"corpus: {len(corpus)} messages, {args.rounds} rounds")
+    print(f"substring loops : {_run(_legacy_classify, texts, args.rounds):8.2f} us/message, {len(legacy_errors):3d} wrong")
+    print(f"classifier      : {_run(classifier.classify, texts, args.rounds):8.2f} us/message, {len(errors):3d} wrong")
+    for text, expected, got in errors:
+        print(f"  MISMATCH {text!r}: expected {expected}, got {got}")
+
+    if args.check and errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
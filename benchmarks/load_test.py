@@ -0,0 +1,360 @@
+"""
+End-to-end load test for the chat hot path.
+
+Virtual users replay the scripted journeys in benchmarks/journeys.jsonl
+(one `{"journey_id", "title", "weight", "endpoint", "turns": [...]}` per
+line, `endpoint` being chatbot, chatbot_stream or chat) against
+/api/chatbot/message, /api/chatbot/message/stream and /api/chat, while
+agent pollers hit /api/agent/escalations the way the dashboard does
+(snapshot, then `since` + If-None-Match). Each journey runs as a fresh
+customer id.
+
+By default the app runs in-process (ASGI, no HTTP server) against the
+database configured in the environment, e.g. a local MySQL/MariaDB (or,
+with --store sqlite|memory, an embedded store needing no server), and a
+mock OpenAI server (benchmarks/mock_openai.py) is started on a free port,
+so no real API calls are made. In-process runs also break every chat turn
+down by stage: database calls, waiting for an LLM slot, the LLM call, and
+everything else. With --base-url the load goes to a running deployment
+instead and only end-to-end latencies are reported.
+
+    python -m benchmarks.load_test [--concurrency 50] [--duration 60] [--agents 5]
+                                   [--mock-latency-ms 600] [--store mysql|sqlite|memory]
+                                   [--base-url http://host:8000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+JOURNEYS = Path(__file__).with_name("journeys.jsonl")
+STORES = ("mysql", "sqlite", "memory")
+
+STAGES = ("db", "llm_queue", "llm", "other")
+
+stages_var: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("load_test_stages", default=None)
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.not_modified = 0
+        self.stages: dict[str, list[float]] = defaultdict(list)
+        self.journeys: Counter = Counter()
+        self.final_states: Counter = Counter()
+        self.elapsed = 0.0
+
+    def request(self, endpoint: str, seconds: float, ok: bool, stages: Optional[dict] = None):
+        if not ok:
+            self.errors[endpoint] += 1
+            return
+        self.latencies[endpoint].append(seconds)
+        if stages is not None:
+            accounted = stages.get("db", 0.0) + stages.get("llm", 0.0)
+            self.stages["db"].append(stages.get("db", 0.0))
+            self.stages["llm_queue"].append(stages.get("llm_queue", 0.0))
+            # The LLM stage excludes the time spent waiting for a scheduler slot.
+            self.stages["llm"].append(stages.get("llm", 0.0) - stages.get("llm_queue", 0.0))
+            self.stages["other"].append(max(0.0, seconds - accounted))
+
+
+def _percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+def load_journeys(path: Path = JOURNEYS) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# ---------------------------------------------------------------------------
+# In-process mode: mock OpenAI server and stage instrumentation
+# ---------------------------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock_openai(latency_ms: float, jitter_ms: float) -> str:
+    import uvicorn
+
+    from benchmarks import mock_openai
+
+    mock_openai.config.latency_ms = latency_ms
+    mock_openai.config.jitter_ms = jitter_ms
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(mock_openai.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True, name="mock-openai").start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("mock OpenAI server did not start")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}/v1"
+
+
+def _timed(stage: str, fn):
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            stages = stages_var.get()
+            if stages is not None:
+                stages[stage] = stages.get(stage, 0.0) + time.perf_counter() - start
+
+    return wrapper
+
+
+def use_store(store: Optional[str]):
+    """Select the storage backend before the app is imported; sqlite gets a scratch file unless SQLITE_PATH is set."""
+    if not store:
+        return
+    os.environ["STORAGE_BACKEND"] = store
+    if store == "sqlite" and "SQLITE_PATH" not in os.environ:
+        os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="onecharge-bench-"), "bench.db")
+
+
+def instrument():
+    """Time database calls and LLM calls made by the route handlers."""
+    from app.api import agent, chat
+    from app.core import ai
+    from app.services import async_db
+
+    offloaded = {name for name in dir(async_db) if asyncio.iscoroutinefunction(getattr(async_db, name))}
+    for module in (chat, agent):
+        for name in offloaded:
+            if callable(getattr(module, name, None)):
+                setattr(module, name, _timed("db", getattr(module, name)))
+    chat.get_ai_response = _timed("llm", chat.get_ai_response)
+    ai.scheduler.acquire = _timed("llm_queue", ai.scheduler.acquire)
+
+
+# ---------------------------------------------------------------------------
+# Load
+# ---------------------------------------------------------------------------
+
+async def send_turn(client: httpx.AsyncClient, endpoint: str, user_id: str, turn: dict) -> Optional[dict]:
+    """Send one scripted turn; returns the response body (the `final` event for SSE) or None on failure."""
+    if endpoint == "chat":
+        body = {
+            "customer_id": user_id,
+            "message": turn["message"],
+            "name": "Load Test",
+            "phone": "9876543210",
+            "registered_vehicle": "Tata Nexon EV",
+            "lat": turn.get("lat"),
+            "lng": turn.get("lng"),
+        }
+        r = await client.post("/api/chat", json=body)
+        return r.json() if r.status_code == 200 else None
+
+    headers = {
+        "X-User-Id": user_id,
+        "X-User-Name": "Load Test",
+        "X-User-Phone": "9876543210",
+        "X-Vehicle-Model": "Tata Nexon EV",
+    }
+    body = {k: turn[k] for k in ("message", "message_type", "location") if k in turn}
+    if endpoint == "chatbot":
+        r = await client.post("/api/chatbot/message", json=body, headers=headers)
+        return r.json() if r.status_code == 200 else None
+
+    final = None
+    async with client.stream("POST", "/api/chatbot/message/stream", json=body, headers=headers) as r:
+        event = None
+        async for line in r.aiter_lines():
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: ") and event == "final":
+                final = json.loads(line[6:])
+            elif line.startswith("data: ") and event == "error":
+                return None
+    return final if r.status_code == 200 else None
+
+
+def response_state(body: dict) -> Optional[str]:
+    return body.get("state") or body.get("next_step")
+
+
+async def _user(client, rec: Recorder, journeys: list[dict], deadline: float, worker: int, run_id: str, think: float, seed: int):
+    rng = random.Random(seed + worker)
+    weights = [j.get("weight", 1) for j in journeys]
+    i = 0
+    while time.monotonic() < deadline:
+        journey = rng.choices(journeys, weights)[0]
+        endpoint = journey.get("endpoint", "chatbot")
+        user_id = f"load-{run_id}-{worker}-{i}"
+        i += 1
+        state = None
+        for turn in journey["turns"]:
+            stages: dict = {}
+            token = stages_var.set(stages)
+            start = time.perf_counter()
+            try:
+                body = await send_turn(client, endpoint, user_id, turn)
+            except (httpx.HTTPError, ValueError):
+                body = None
+            finally:
+                stages_var.reset(token)
+            rec.request(endpoint, time.perf_counter() - start, body is not None, stages or None)
+            if body is None:
+                break
+            state = response_state(body)
+            if think:
+                await asyncio.sleep(rng.uniform(0.5, 1.5) * think)
+        else:
+            rec.journeys[journey["journey_id"]] += 1
+            rec.final_states[state] += 1
+
+
+async def _agent(client, rec: Recorder, deadline: float, interval: float):
+    cursor, etag = None, None
+    while time.monotonic() < deadline:
+        params = {"since": cursor} if cursor else {"fields": "summary"}
+        headers = {"If-None-Match": etag} if etag and cursor else {}
+        start = time.perf_counter()
+        try:
+            r = await client.get("/api/agent/escalations", params=params, headers=headers)
+            ok = r.status_code in (200, 304)
+        except httpx.HTTPError:
+            r, ok = None, False
+        rec.request("escalations", time.perf_counter() - start, ok)
+        if r is not None and r.status_code == 304:
+            rec.not_modified += 1
+        elif ok:
+            cursor = r.headers.get("X-Cursor") or cursor
+            etag = r.headers.get("ETag")
+        await asyncio.sleep(interval)
+
+
+async def run(args) -> Recorder:
+    journeys = load_journeys(Path(args.journeys))
+    if args.base_url:
+        transport, base_url, app = None, args.base_url, None
+    else:
+        os.environ["OPENAI_BASE_URL"] = args.openai_base_url or start_mock_openai(args.mock_latency_ms, args.mock_jitter_ms)
+        os.environ.setdefault("OPENAI_API_KEY", "load-test")
+        use_store(args.store)
+        import main
+
+        app = main.app
+        instrument()
+        transport, base_url = httpx.ASGITransport(app=app), "http://load-test"
+
+    rec = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency + args.agents)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60, limits=limits) as client:
+        lifespan = app.router.lifespan_context(app) if app is not None else None
+        if lifespan is not None:
+            await lifespan.__aenter__()
+        try:
+            deadline = time.monotonic() + args.duration
+            run_id = uuid.uuid4().hex[:8]
+            tasks = [
+                _user(client, rec, journeys, deadline, w, run_id, args.think_ms / 1000, args.seed)
+                for w in range(args.concurrency)
+            ]
+            tasks += [_agent(client, rec, deadline, args.poll_interval) for _ in range(args.agents)]
+            started = time.perf_counter()
+            await asyncio.gather(*tasks)
+            rec.elapsed = time.perf_counter() - started
+        finally:
+            if lifespan is not None:
+                await lifespan.__aexit__(None, None, None)
+    return rec
+
+
+def report(rec: Recorder, in_process: bool) -> dict:
+    ms = 1000
+    result = {"elapsed_seconds": round(rec.elapsed, 3), "endpoints": {}, "stages_ms": {}}
+    print(f"elapsed: {rec.elapsed:.1f}s")
+    print(f"{'endpoint':<16}{'ok':>8}{'errors':>8}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for endpoint in sorted(set(rec.latencies) | set(rec.errors)):
+        values = rec.latencies[endpoint]
+        row = {
+            "ok": len(values),
+            "errors": rec.errors[endpoint],
+            "rps": round(len(values) / rec.elapsed, 2) if rec.elapsed else 0.0,
+            "p50": round(_percentile(values, 50) * ms, 1),
+            "p95": round(_percentile(values, 95) * ms, 1),
+            "p99": round(_percentile(values, 99) * ms, 1),
+            "max": round(max(values, default=0.0) * ms, 1),
+        }
+        result["endpoints"][endpoint] = row
+        print(
+            f"{endpoint:<16}{row['ok']:>8}{row['errors']:>8}{row['rps']:>9.1f}"
+            f"{row['p50']:>9.1f}{row['p95']:>9.1f}{row['p99']:>9.1f}{row['max']:>9.1f}"
+        )
+    if rec.not_modified:
+        print(f"escalations polls answered 304: {rec.not_modified}")
+
+    if in_process and rec.stages:
+        print(f"\nper chat turn, by stage{'':<2}{'mean':>9}{'p95':>9}{'share':>8}  (ms)")
+        total = sum(sum(v) for v in rec.stages.values()) or 1.0
+        for stage in STAGES:
+            values = rec.stages.get(stage, [])
+            mean = sum(values) / len(values) if values else 0.0
+            row = {"mean": round(mean * ms, 2), "p95": round(_percentile(values, 95) * ms, 2),
+                   "share": round(sum(values) / total, 3)}
+            result["stages_ms"][stage] = row
+            print(f"  {stage:<23}{row['mean']:>9.2f}{row['p95']:>9.2f}{row['share']:>8.1%}")
+
+    result["journeys_completed"] = dict(rec.journeys)
+    result["final_states"] = {str(k): v for k, v in rec.final_states.items()}
+    print(f"\njourneys completed: {sum(rec.journeys.values())} {dict(rec.journeys)}")
+    print(f"final states: {result['final_states']}")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--journeys", default=str(JOURNEYS), help="JSONL journey scripts")
+    parser.add_argument("--concurrency", type=int, default=50, help="virtual users")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause between a user's turns")
+    parser.add_argument("--agents", type=int, default=5, help="escalations pollers")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="seconds between agent polls")
+    parser.add_argument("--base-url", help="load a running deployment instead of the in-process app")
+    parser.add_argument("--openai-base-url", help="in-process: use this OpenAI-compatible server instead of the mock")
+    parser.add_argument("--store", choices=STORES, help="in-process: storage backend (default: STORAGE_BACKEND)")
+    parser.add_argument("--mock-latency-ms", type=float, default=600.0)
+    parser.add_argument("--mock-jitter-ms", type=float, default=200.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    rec = asyncio.run(run(args))
+    result = report(rec, in_process=not args.base_url)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    if sum(rec.errors.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Local stand-in for the OpenAI chat-completions API, for load tests.
+
+Answers `POST /v1/chat/completions` (plain and `stream=true`) after a
+configurable latency, with a reply in the concierge's JSON format that
+moves the journey along: it reads CURRENT_STATE from the context message
+and extracts the obvious facts from the last user message, so scripted
+journeys progress the way they would against the real model.
+
+    python -m benchmarks.mock_openai [--port 8100] [--latency-ms 600] [--jitter-ms 200]
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8100/v1.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.core import codec
+
+_STATE_RE = re.compile(r"CURRENT_STATE:\s*([A-Z_]+)")
+_DIGITS_RE = re.compile(r"\d{10,}")
+
+_ISSUES = {
+    "flat": "Flat tyre",
+    "tyre": "Flat tyre",
+    "puncture": "Flat tyre",
+    "battery": "Battery issue",
+    "start": "Engine not starting",
+    "engine": "Engine not starting",
+    "overheat": "Overheating",
+    "accident": "Accident / collision",
+}
+
+_REPLIES = {
+    "IDENTITY": "Could you please confirm your registered mobile number?",
+    "LOCATION": "Thanks! Where are you right now? You can share GPS or type the address.",
+    "SAFETY": "Got it. Are you safe and are you with the vehicle?",
+    "ISSUE": "Good to hear. What issue are you facing with the car?",
+    "ROUTING": "Would you prefer On-Spot Repair or Towing Assistance?",
+    "CONFIRMATION": "Your service has been booked. Our team will reach you soon.",
+}
+
+
+class MockConfig:
+    latency_ms: float = 600.0
+    jitter_ms: float = 200.0
+    chunk_delay_ms: float = 5.0
+
+
+config = MockConfig()
+app = FastAPI(title="Mock OpenAI")
+stats = {"completions": 0, "streamed": 0}
+
+
+def _last(messages: list, role: str) -> str:
+    for m in reversed(messages):
+        if m.get("role") == role:
+            return str(m.get("content") or "")
+    return ""
+
+
+def _state(messages: list) -> str:
+    for m in messages:
+        if m.get("role") == "system":
+            match = _STATE_RE.search(str(m.get("content") or ""))
+            if match:
+                return match.group(1)
+    return "IDENTITY"
+
+
+def concierge_reply(messages: list) -> dict:
+    """The JSON object the concierge prompt asks the model for."""
+    state = _state(messages)
+    text = _last(messages, "user").lower()
+    extracted: dict = {}
+    next_step = state
+
+    if state == "IDENTITY" and _DIGITS_RE.search(text.replace(" ", "")):
+        extracted["phone_verified"] = True
+        next_step = "LOCATION"
+    elif state == "LOCATION" and len(text) > 3:
+        extracted.update(address=text, location_confirmed=True)
+        next_step = "SAFETY"
+    elif state == "SAFETY":
+        if "not" in text or "no" in text.split():
+            extracted["is_safe"] = False
+        elif any(w in text for w in ("yes", "safe", "fine", "ok")):
+            extracted.update(is_safe=True, is_with_vehicle=True)
+            next_step = "ISSUE"
+    elif state == "ISSUE":
+        for word, category in _ISSUES.items():
+            if word in text:
+                extracted["issue_category"] = category
+                next_step = "ROUTING"
+                break
+    elif state == "ROUTING":
+        if "tow" in text:
+            extracted["service_type"] = "towing"
+            next_step = "CONFIRMATION"
+        elif "spot" in text or "repair" in text:
+            extracted["service_type"] = "on_spot"
+            next_step = "CONFIRMATION"
+
+    return {
+        "intent": "SUPPORT",
+        "emergency_level": "LOW",
+        "confidence": 0.9 if extracted else 0.6,
+        "extracted_data": extracted,
+        "next_step": next_step,
+        "user_reply": _REPLIES.get(next_step, "Thanks. One moment while I help you."),
+    }
+
+
+async def _think():
+    delay = max(0.0, config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms))
+    await asyncio.sleep(delay / 1000)
+
+
+def _usage(messages: list, content: str) -> dict:
+    # Rough OpenAI-like counts (~4 characters per token) so token metrics move under load.
+    prompt = sum(len(str(m.get("content") or "")) for m in messages) // 4
+    completion = len(content) // 4
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+def _completion(model: str, content: str, usage: dict) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": usage,
+    }
+
+
+def _chunk(completion_id: str, model: str, delta: dict, finish_reason=None, usage=None) -> str:
+    body = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    if usage:
+        body["usage"] = usage
+    return f"data: {codec.dumps(body)}\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "gpt-4o-mini")
+    messages = body.get("messages") or []
+    content = codec.dumps(concierge_reply(messages))
+    usage = _usage(messages, content)
+    stats["completions"] += 1
+
+    if not body.get("stream"):
+        await _think()
+        return JSONResponse(_completion(model, content, usage))
+
+    stats["streamed"] += 1
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+
+    async def events():
+        await _think()
+        yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+        for i in range(0, len(content), 16):
+            yield _chunk(completion_id, model, {"content": content[i:i + 16]})
+            await asyncio.sleep(config.chunk_delay_ms / 1000)
+        yield _chunk(completion_id, model, {}, finish_reason="stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield _chunk(completion_id, model, {}, usage=usage)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=config.latency_ms, help="time to first token")
+    parser.add_argument("--jitter-ms", type=float, default=config.jitter_ms)
+    args = parser.parse_args(argv)
+    config.latency_ms = args.latency_ms
+    config.jitter_ms = args.jitter_ms
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
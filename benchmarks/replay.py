@@ -0,0 +1,189 @@
+"""
+Deterministic conversation benchmark and regression suite on LLM cassettes.
+
+`record` runs every journey in benchmarks/journeys.jsonl once through the
+in-process app with a recording cassette (app/core/cassette.py), saving
+each completion to the cassette and each turn's response to
+`<cassette>.expected.jsonl`. By default it records the real OpenAI API;
+--mock records benchmarks/mock_openai.py instead.
+
+`run` replays the same journeys with the completions served from the
+cassette, so every run sends the handlers identical model output. It
+compares each response with the recording, reports handler latency per
+turn and by stage, and exits non-zero on any difference, cassette miss or
+completion that only matched on the conversation (the prompt changed).
+With `--latency zero` the recorded model time is left out and only our own
+code is measured.
+
+Both need the database configured in the environment, or `--store sqlite`
+/ `--store memory` to run on an embedded store.
+
+    python -m benchmarks.replay record [--mock] [--cassette benchmarks/cassettes/journeys.jsonl]
+    python -m benchmarks.replay run [--latency zero|original] [--repeat 5] [--store memory]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+from benchmarks.load_test import (
+    JOURNEYS,
+    STORES,
+    Recorder,
+    instrument,
+    load_journeys,
+    report,
+    response_state,
+    send_turn,
+    stages_var,
+    start_mock_openai,
+    use_store,
+)
+
+CASSETTE = Path(__file__).parent / "cassettes" / "journeys.jsonl"
+
+# Response fields compared against the recording. Ticket ids differ between
+# databases, so only whether a ticket was returned is compared.
+_COMPARED = (
+    "message", "state", "options", "should_escalate", "escalation_reason", "service_type", "priority",
+    "extracted_data", "intent", "emergency_level", "next_step", "user_reply",
+)
+
+
+def expected_path(cassette: Path) -> Path:
+    return cassette.with_name(cassette.stem + ".expected.jsonl")
+
+
+def normalize(body: dict) -> dict:
+    out = {k: body[k] for k in _COMPARED if k in body}
+    if "ticket_id" in body:
+        out["has_ticket"] = body["ticket_id"] is not None
+    return out
+
+
+async def _replay_journeys(client, journeys: list[dict], rec: Recorder, run_id: str) -> list[dict]:
+    results = []
+    for journey in journeys:
+        endpoint = journey.get("endpoint", "chatbot")
+        user_id = f"replay-{run_id}-{journey['journey_id']}"
+        body = None
+        for n, turn in enumerate(journey["turns"]):
+            stages: dict = {}
+            token = stages_var.set(stages)
+            start = time.perf_counter()
+            try:
+                body = await send_turn(client, endpoint, user_id, turn)
+            finally:
+                stages_var.reset(token)
+            rec.request(endpoint, time.perf_counter() - start, body is not None, stages)
+            results.append({
+                "journey_id": journey["journey_id"],
+                "turn": n,
+                "response": normalize(body) if body is not None else None,
+            })
+            if body is None:
+                break
+        else:
+            rec.journeys[journey["journey_id"]] += 1
+            rec.final_states[response_state(body)] += 1
+    return results
+
+
+def _diff(expected: list[dict], actual: list[dict]) -> list[str]:
+    problems = []
+    recorded = {(e["journey_id"], e["turn"]): e["response"] for e in expected}
+    for row in actual:
+        key = (row["journey_id"], row["turn"])
+        want = recorded.get(key)
+        if want is None:
+            problems.append(f"{key[0]} turn {key[1]}: not in the recording")
+        elif row["response"] != want:
+            fields = sorted(k for k in set(want) | set(row["response"] or {}) if want.get(k) != (row["response"] or {}).get(k))
+            problems.append(f"{key[0]} turn {key[1]}: differs in {', '.join(fields)}")
+    return problems
+
+
+async def _run(args) -> int:
+    from app.core import ai, cassette as cassettes
+    from app.services import llm_cache
+    import main
+
+    cassette_path = Path(args.cassette)
+    journeys = load_journeys(Path(args.journeys))
+    instrument()
+
+    if args.command == "record":
+        cassette_path.parent.mkdir(parents=True, exist_ok=True)
+        cassette_path.unlink(missing_ok=True)
+        ai.cassette = cassettes.Cassette(str(cassette_path), cassettes.RECORD)
+        repeat = 1
+    else:
+        ai.cassette = cassettes.Cassette(str(cassette_path), cassettes.REPLAY, args.latency)
+        repeat = args.repeat
+
+    rec = Recorder()
+    problems: list[str] = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=120) as client:
+            started = time.perf_counter()
+            for _ in range(repeat):
+                # Every pass starts cold so cache hits are the same as when recording.
+                llm_cache.clear()
+                results = await _replay_journeys(client, journeys, rec, uuid.uuid4().hex[:8])
+                if args.command == "record":
+                    with open(expected_path(cassette_path), "w", encoding="utf-8") as f:
+                        for row in results:
+                            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                else:
+                    with open(expected_path(cassette_path), encoding="utf-8") as f:
+                        expected = [json.loads(line) for line in f if line.strip()]
+                    problems += _diff(expected, results)
+            rec.elapsed = time.perf_counter() - started
+
+    report(rec, in_process=True)
+    print(f"\ncassette {cassette_path}: {ai.cassette.stats}")
+    if args.command == "record":
+        print(f"recorded {ai.cassette.stats['recorded']} completions, expected responses in {expected_path(cassette_path)}")
+        return 0
+    fallbacks = ai.cassette.stats["conversation_hits"]
+    if fallbacks:
+        # Only the conversation matched: the system prompt or the context line
+        # changed since the recording, so the model would have seen a different request.
+        problems.append(f"{fallbacks} completions matched on the conversation only (prompt or context changed)")
+    for problem in problems[:50]:
+        print(f"  REGRESSION {problem}")
+    failed = bool(problems) or ai.cassette.stats["misses"] > 0 or sum(rec.errors.values()) > 0
+    print("replay: FAILED" if failed else "replay: identical to the recording")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("command", choices=("record", "run"))
+    parser.add_argument("--journeys", default=str(JOURNEYS))
+    parser.add_argument("--cassette", default=str(CASSETTE))
+    parser.add_argument("--mock", action="store_true", help="record: use the local mock instead of OpenAI")
+    parser.add_argument("--latency", choices=("original", "zero"), default="zero", help="run: recorded model latency or none")
+    parser.add_argument("--repeat", type=int, default=1, help="run: passes over the journeys")
+    parser.add_argument("--store", choices=STORES, help="storage backend (default: STORAGE_BACKEND)")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("OPENAI_API_KEY", "replay")
+    use_store(args.store)
+    if args.command == "record" and args.mock:
+        os.environ["OPENAI_BASE_URL"] = start_mock_openai(latency_ms=300, jitter_ms=100)
+    sys.exit(asyncio.run(_run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -59,49 +59,10 @@ CREATE TABLE IF NOT EXISTS escalations (
     INDEX idx_session (session_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
--- Chat sessions table (runtime schema used by FastAPI app)
--- Note: This schema is intentionally aligned with app/services/db.py (setup_db()).
-CREATE TABLE IF NOT EXISTS chat_sessions (
-    session_id VARCHAR(255) PRIMARY KEY,
-    customer_id VARCHAR(255),
-    status ENUM('ACTIVE', 'ESCALATED', 'RESOLVED') DEFAULT 'ACTIVE',
-    current_flow_step VARCHAR(255),
-    extracted_data JSON,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    INDEX idx_customer (customer_id)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-
--- Message transcript (append-only)
-CREATE TABLE IF NOT EXISTS messages (
-    message_id INT AUTO_INCREMENT PRIMARY KEY,
-    session_id VARCHAR(255),
-    role ENUM('user', 'assistant', 'system'),
-    content TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-
--- Agent tickets (escalations + lifecycle)
-CREATE TABLE IF NOT EXISTS tickets (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    session_id VARCHAR(255) NOT NULL,
-    user_id VARCHAR(255) NOT NULL,
-    source ENUM('ESCALATION', 'SERVICE') DEFAULT 'ESCALATION',
-    reason VARCHAR(100) NOT NULL,
-    priority ENUM('normal', 'high', 'emergency') DEFAULT 'normal',
-    status ENUM('OPEN', 'IN_PROGRESS', 'DISPATCHED', 'ON_SITE', 'RESOLVED', 'CLOSED') DEFAULT 'OPEN',
-    customer_name VARCHAR(255) NULL,
-    phone VARCHAR(50) NULL,
-    vehicle_model VARCHAR(255) NULL,
-    collected_data JSON,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    INDEX idx_ticket_session (session_id),
-    INDEX idx_ticket_status (status),
-    INDEX idx_ticket_user (user_id),
-    FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+-- Runtime tables (chat_sessions, messages, tickets, prompt_versions) and their
+-- indexes are managed by versioned migrations in app/db/migrations.py. They are
+-- applied on startup, or manually with:
+--     python -m app.db.migrations
 
 -- Insert sample customers for testing
 INSERT INTO customers (id, name, phone, email, vehicle_model, vehicle_variant, registration_number) VALUES
@@ -1,13 +1,39 @@
 
 import uvicorn
 from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+from fastapi.responses import PlainTextResponse, RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.chat import router as chat_router
 from app.api.agent import router as agent_router
-from app.services.db import setup_db
+from app.api.admin import router as admin_router
+from app.core.ai import scheduler as llm_scheduler
+from app.core.codec import FastJSONResponse
+from app.core.metrics import MetricsMiddleware, registry as metrics_registry
+from app.core.tracing import TracingMiddleware, tracing_stats
+from app.services.archiver import archiver_stats, start_archiver, stop_archiver
+from app.services.async_db import shutdown_executor
+from app.services.events import ticket_events
+from app.services.fast_path import fast_path_stats
+from app.services.llm_cache import llm_cache_stats
+from app.services.prompts import register_active_prompt
+from app.storage import get_storage
+from app.storage.base import session_cas_stats
 
-app = FastAPI(title="1Charge Chatbot API")
+storage = get_storage()
+
+app = FastAPI(title="1Charge Chatbot API", default_response_class=FastJSONResponse)
+
+# Point-in-time stats already kept for /health, exported as gauges on each scrape.
+metrics_registry.register_stats("storage", storage.stats)
+metrics_registry.register_stats("session_cas", session_cas_stats)
+metrics_registry.register_stats("session_cache", lambda: storage.cache_stats().get("sessions", {}))
+metrics_registry.register_stats("profile_cache", lambda: storage.cache_stats().get("profiles", {}))
+metrics_registry.register_stats("llm_cache", llm_cache_stats)
+metrics_registry.register_stats("fast_path", fast_path_stats)
+metrics_registry.register_stats("llm_scheduler", llm_scheduler.stats)
+metrics_registry.register_stats("ticket_events", ticket_events.stats)
+metrics_registry.register_stats("archiver", archiver_stats)
+metrics_registry.register_stats("tracing", tracing_stats)
 
 @app.get("/", include_in_schema=False)
 async def root():
@@ -16,25 +42,55 @@ async def root():
 @app.on_event("startup")
 async def startup_event():
     try:
-        setup_db()
+        storage.setup()
+        register_active_prompt()
     except Exception as e:
         print(f"DB Setup error: {e}")
+    start_archiver()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stop_archiver()
+    shutdown_executor()
+    storage.close()
 
 @app.get("/health")
 async def health():
-    return {"status": "online", "project": "1Charge"}
+    storage_stats = storage.stats()
+    return {
+        "status": "online",
+        "project": "1Charge",
+        # Kept at the top level (MySQL backend) for monitors that read pool saturation here.
+        **({"db_pool": storage_stats["db_pool"]} if "db_pool" in storage_stats else {}),
+        "storage": {"backend": storage.name, **storage_stats},
+        "session_cas": session_cas_stats(),
+        "caches": {**storage.cache_stats(), "llm_responses": llm_cache_stats()},
+        "fast_path": fast_path_stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "ticket_events": ticket_events.stats(),
+        "archiver": archiver_stats(),
+        "tracing": tracing_stats(),
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
+app.add_middleware(TracingMiddleware)
+app.add_middleware(MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Cursor", "X-Next-Cursor", "X-Trace-Id"],
 )
 
 # Include Routers
 app.include_router(chat_router, prefix="/api")
 app.include_router(agent_router, prefix="/api/agent")
+app.include_router(admin_router, prefix="/api/admin")
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
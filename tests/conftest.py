@@ -0,0 +1,44 @@
+"""
+Tests run against the in-process storage backends (memory and SQLite), so no
+MySQL server or OpenAI key is needed. The app singletons are built from
+settings at import time, hence the environment is set before anything from
+`app` is imported.
+"""
+
+import os
+
+os.environ["STORAGE_BACKEND"] = "memory"
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("TRACING_ENABLED", "false")
+
+import pytest
+
+from app.storage.memory import MemoryBackend
+from app.storage.sqlite import SQLiteBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    store = MemoryBackend() if request.param == "memory" else SQLiteBackend(str(tmp_path / "onecharge.db"))
+    store.setup()
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def store():
+    """The app's storage singleton (the memory backend here), emptied for the test."""
+    from app.storage import get_storage
+
+    storage = get_storage()
+    storage.__init__()
+    return storage
+
+
+@pytest.fixture
+def client(store):
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    return TestClient(app)
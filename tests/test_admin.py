@@ -0,0 +1,19 @@
+"""Access to the /api/admin routes."""
+
+import pytest
+
+from app.core.config import settings
+
+
+def test_admin_routes_are_hidden_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", None)
+
+    assert client.get("/api/admin/traces/slow").status_code == 404
+    assert client.get("/api/admin/traces/slow", headers={"X-Admin-Token": ""}).status_code == 404
+
+
+@pytest.mark.parametrize("headers, status", [({}, 401), ({"X-Admin-Token": "wrong"}, 401), ({"X-Admin-Token": "s3cret"}, 200)])
+def test_admin_token_is_required(client, monkeypatch, headers, status):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+
+    assert client.get("/api/admin/traces/slow", headers=headers).status_code == status
@@ -0,0 +1,157 @@
+"""GET /api/agent/escalations: incremental polling with `since`, ETags, and keyset pages."""
+
+import base64
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+URL = "/api/agent/escalations"
+T0 = datetime(2026, 1, 5, 9, 30, 0)
+
+
+def _ticket(store, created_at: datetime = T0, updated_at: datetime = None, session_id: str = None) -> int:
+    ticket_id = store.create_ticket(session_id or f"sess-{len(store._tickets) + 1}", "cust-1", "EMERGENCY")
+    # Pin the timestamps; create_ticket stamps them with now().
+    store._tickets[ticket_id].update(created_at=created_at, updated_at=updated_at or created_at)
+    return ticket_id
+
+
+def _cursor(client) -> str:
+    response = client.get(URL)
+    assert response.status_code == 200
+    return response.headers["X-Cursor"]
+
+
+def _changes(client, cursor: str, **headers):
+    return client.get(URL, params={"since": cursor}, headers=headers)
+
+
+# --- Incremental polling (since) ---
+
+def test_cursor_is_latest_update(client, store):
+    _ticket(store, updated_at=T0 - timedelta(minutes=5))
+    _ticket(store, updated_at=T0)
+
+    assert _cursor(client) == T0.isoformat()
+
+
+def test_ticket_updated_at_cursor_timestamp_is_returned(client, store):
+    _ticket(store, updated_at=T0)
+    stale = _ticket(store, updated_at=T0 - timedelta(hours=1))
+    cursor = _cursor(client)
+    # Written after the poll read its cursor, but within the same timestamp.
+    late = _ticket(store, updated_at=T0)
+
+    body = _changes(client, cursor).json()
+
+    changed = [t["id"] for t in body["changed"]]
+    assert late in changed
+    assert stale not in changed
+    assert body["removed"] == []
+    assert body["cursor"] == T0.isoformat()
+
+
+def test_ticket_closed_between_polls_is_removed(client, store):
+    closed = _ticket(store, updated_at=T0)
+    kept = _ticket(store, updated_at=T0)
+    cursor = _cursor(client)
+
+    assert store.update_ticket_status(closed, "RESOLVED")
+    body = _changes(client, cursor).json()
+
+    assert body["removed"] == [closed]
+    assert closed not in [t["id"] for t in body["changed"]]
+    assert kept in [t["id"] for t in store.list_open_tickets()]
+    assert datetime.fromisoformat(body["cursor"]) > T0
+
+
+def test_unchanged_poll_is_not_modified(client, store):
+    _ticket(store, updated_at=T0)
+    cursor = _cursor(client)
+
+    first = _changes(client, cursor)
+    etag = first.headers["ETag"]
+    again = _changes(client, cursor, **{"If-None-Match": etag})
+
+    assert first.status_code == 200
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert again.content == b""
+
+    _ticket(store, updated_at=T0 + timedelta(seconds=1))
+    changed = _changes(client, cursor, **{"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_since_rejects_garbage_and_filters(client, store):
+    assert client.get(URL, params={"since": "yesterday"}).status_code == 400
+    assert client.get(URL, params={"since": T0.isoformat(), "priority": "high"}).status_code == 400
+
+
+# --- Keyset pages (after / X-Next-Cursor) ---
+
+def _all_pages(client, sort: str, limit: int) -> list[int]:
+    ids, params = [], {"sort": sort, "limit": limit}
+    for _ in range(50):
+        response = client.get(URL, params=params)
+        assert response.status_code == 200
+        ids += [t["id"] for t in response.json()]
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            return ids
+        params["after"] = next_cursor
+    raise AssertionError("pagination did not terminate")
+
+
+@pytest.mark.parametrize("sort", ["created_at", "-created_at", "-updated_at"])
+def test_ties_across_page_boundaries(client, store, sort):
+    # Five tickets share one timestamp, so every page boundary falls inside the tie.
+    tied = [_ticket(store) for _ in range(5)]
+    older = _ticket(store, created_at=T0 - timedelta(minutes=1))
+    newer = _ticket(store, created_at=T0 + timedelta(minutes=1))
+
+    ids = _all_pages(client, sort, limit=2)
+
+    if sort == "created_at":
+        assert ids == [older, *tied, newer]
+    else:
+        assert ids == [newer, *reversed(tied), older]
+
+
+def test_cursor_from_another_sort_is_rejected(client, store):
+    for _ in range(3):
+        _ticket(store)
+    cursor = client.get(URL, params={"sort": "-created_at", "limit": 1}).headers["X-Next-Cursor"]
+
+    response = client.get(URL, params={"sort": "created_at", "limit": 1, "after": cursor})
+
+    assert response.status_code == 400
+    assert "different sort" in response.json()["detail"]
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+@pytest.mark.parametrize("after", [
+    "not a cursor!",
+    "%%%",
+    _b64(b"\xff\xfe\x00"),
+    _b64(b"{}"),
+    _b64(json.dumps({"sort": "-updated_at"}).encode()),
+    _b64(json.dumps(["-updated_at", T0.isoformat()]).encode()),
+    _b64(json.dumps(["-updated_at", "not-a-date", 1]).encode()),
+    _b64(json.dumps(["-updated_at", None, 1]).encode()),
+    _b64(json.dumps(["-updated_at", 12345, 1]).encode()),
+    _b64(json.dumps(["-updated_at", T0.isoformat(), "one"]).encode()),
+    _b64(json.dumps(["-updated_at", T0.isoformat(), None]).encode()),
+    _b64(json.dumps([["-updated_at"], T0.isoformat(), 1]).encode()),
+])
+def test_garbage_cursor_is_a_bad_request(client, store, after):
+    _ticket(store)
+
+    response = client.get(URL, params={"after": after})
+
+    assert response.status_code == 400
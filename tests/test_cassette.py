@@ -0,0 +1,32 @@
+"""Matching replayed LLM requests against the cassette."""
+
+from app.core.cassette import conversation_key, request_key
+
+
+def _params(context: str, system: str = "You are the OneCharge assistant.") -> dict:
+    return {
+        "model": "gpt-4o-mini",
+        "temperature": 0.2,
+        "stream": False,
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "system", "content": context},
+            {"role": "user", "content": "my tyre is flat"},
+        ],
+    }
+
+
+def test_per_run_ids_do_not_change_the_request_key():
+    first = _params("AUTH_CONTEXT: user_id=replay-1a2b3c4d-flat, name=Load Test. session 0b8f6c1e-4d2a-4f3b-9c7d-2e5a1b6c8d9f")
+    second = _params("AUTH_CONTEXT: user_id=replay-9f8e7d6c-flat, name=Load Test. session 5d4c3b2a-1e0f-4a9b-8c7d-6e5f4a3b2c1d")
+
+    assert request_key(first) == request_key(second)
+    assert request_key({**first, "stream": True}) == request_key(first)
+
+
+def test_prompt_changes_still_change_the_request_key():
+    recorded = _params("AUTH_CONTEXT: user_id=u1, name=Load Test. CURRENT_STATE: ISSUE.")
+
+    assert request_key(_params("AUTH_CONTEXT: user_id=u1, name=Load Test. CURRENT_STATE: SAFETY.")) != request_key(recorded)
+    assert request_key(_params(recorded["messages"][1]["content"], system="Be brief.")) != request_key(recorded)
+    assert conversation_key(_params("anything", system="Be brief.")) == conversation_key(recorded)
@@ -0,0 +1,22 @@
+"""The shared JSON codec."""
+
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from app.core import codec
+
+
+def test_known_types_encode_the_same_on_both_backends():
+    value = {"at": datetime(2026, 1, 2, 3, 4, 5), "lat": Decimal("12.5"), "id": uuid.UUID(int=1), "tags": {"a"}}
+
+    assert codec.loads(codec.dumps(value)) == {
+        "at": "2026-01-02T03:04:05", "lat": 12.5, "id": "00000000-0000-0000-0000-000000000001", "tags": ["a"],
+    }
+
+
+def test_unknown_types_are_rejected_instead_of_stored_as_their_repr():
+    with pytest.raises(TypeError):
+        codec.dumps({"conn": object()})
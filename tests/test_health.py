@@ -0,0 +1,21 @@
+"""The /health report on the embedded backends."""
+
+import os
+import subprocess
+import sys
+
+
+def test_health_on_the_memory_backend(client):
+    body = client.get("/health").json()
+
+    assert body["storage"]["backend"] == "memory"
+    assert "db_pool" not in body
+    assert set(body["caches"]) == {"llm_responses"}
+
+
+def test_app_on_the_memory_backend_does_not_load_the_mysql_driver():
+    # A fresh interpreter: other tests import the MySQL backend on purpose.
+    check = "import sys, main; sys.exit(any(name.startswith('mysql') for name in sys.modules))"
+    env = {**os.environ, "STORAGE_BACKEND": "memory"}
+
+    assert subprocess.run([sys.executable, "-c", check], env=env).returncode == 0
@@ -0,0 +1,20 @@
+"""Keys of the LLM response cache."""
+
+from app.services import llm_cache
+
+
+def test_sessions_on_different_prompt_versions_do_not_share_replies():
+    facts = {"phone_verified": True, "user_name": "Asha"}
+
+    assert llm_cache.cache_key("ISSUE", "Flat tyre!", facts, 1) == llm_cache.cache_key("ISSUE", "flat tyre", {**facts, "user_name": "Ravi"}, 1)
+    assert llm_cache.cache_key("ISSUE", "flat tyre", facts, 1) != llm_cache.cache_key("ISSUE", "flat tyre", facts, 2)
+
+
+def test_cached_reply_round_trip():
+    llm_cache.clear()
+    key = llm_cache.cache_key("ISSUE", "flat tyre", {"phone_verified": True}, 1)
+    reply = {"intent": "issue", "extracted_data": {"issue_category": "Flat tyre"}, "next_step": "ROUTING", "user_reply": "Towing or on-spot?"}
+
+    assert llm_cache.store(key, reply)
+    assert llm_cache.get(key)["user_reply"] == "Towing or on-spot?"
+    assert llm_cache.get(llm_cache.cache_key("ISSUE", "flat tyre", {"phone_verified": True}, 2)) is None
@@ -0,0 +1,46 @@
+"""Negative caching of host-app customer profiles (MySQL backend)."""
+
+import pytest
+
+from app.services import db
+
+
+class _Connection:
+    def __init__(self, result):
+        self.result = result
+
+    def cursor(self, dictionary=False):
+        return self
+
+    def execute(self, query, params):
+        if isinstance(self.result, Exception):
+            raise self.result
+
+    def fetchone(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def profiles(monkeypatch):
+    monkeypatch.setattr(db, "_customers_table_available", True)
+    db.profile_cache.clear()
+    yield
+    db.profile_cache.clear()
+
+
+def _lookup(monkeypatch, result):
+    monkeypatch.setattr(db, "get_db_connection", lambda: _Connection(result))
+    return db.get_customer_profile("cust-1")
+
+
+def test_query_errors_are_not_cached(profiles, monkeypatch):
+    assert _lookup(monkeypatch, RuntimeError("Lost connection to MySQL server")) is None
+    assert _lookup(monkeypatch, {"id": "cust-1", "name": "Asha"}) == {"id": "cust-1", "name": "Asha"}
+
+
+def test_missing_customers_are_cached(profiles, monkeypatch):
+    assert _lookup(monkeypatch, None) is None
+    assert _lookup(monkeypatch, {"id": "cust-1", "name": "Asha"}) is None
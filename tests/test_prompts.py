@@ -0,0 +1,24 @@
+"""Resolving session prompt versions this worker did not register itself."""
+
+import asyncio
+
+from app.core.ai import SYSTEM_PROMPT
+from app.services import prompts
+
+
+def test_backend_fetches_prompt_versions_by_id(backend):
+    row = backend.ensure_prompt_version("concierge", "Be brief.", prompts.content_sha256("Be brief."))
+
+    assert backend.get_prompt_version(row["id"])["content"] == "Be brief."
+    assert backend.get_prompt_version(row["id"] + 1) is None
+
+
+def test_version_registered_after_startup_is_fetched_and_cached(store, monkeypatch):
+    monkeypatch.setattr(prompts, "_by_id", {})
+    monkeypatch.setattr(prompts, "_by_sha", {})
+    # A newer deploy registers its prompt after this worker loaded the registry.
+    row = store.ensure_prompt_version(prompts.CONCIERGE_PROMPT_NAME, "Newer prompt.", prompts.content_sha256("Newer prompt."))
+
+    assert asyncio.run(prompts.resolve_prompt(row["id"])) == "Newer prompt."
+    assert prompts.prompt_marker(row["id"]) == f"[system prompt: {prompts.CONCIERGE_PROMPT_NAME} v1]"
+    assert asyncio.run(prompts.resolve_prompt(row["id"] + 1)) == SYSTEM_PROMPT
@@ -0,0 +1,137 @@
+"""Turn commits racing on the same session: the version compare-and-swap, rebase() and retries."""
+
+import pytest
+
+from app.core.config import settings
+from app.services.unit_of_work import TurnUnitOfWork
+from app.storage.base import SessionConflictError, session_cas_stats
+
+SESSION_ID = "sess-1"
+CUSTOMER_ID = "cust-1"
+
+
+@pytest.fixture
+def session(backend):
+    backend.create_session(SESSION_ID, CUSTOMER_ID, None, {"phone_verified": True, "location_confirmed": True}, "SAFETY")
+    return backend.get_session_by_id(SESSION_ID)
+
+
+def _turn(session: dict, message: str, facts: dict, flow_step: str = "ISSUE", status: str = "ACTIVE",
+          ticket: bool = False) -> TurnUnitOfWork:
+    """Stage one chat turn the way _run_chatbot_turn does, from the session row it read."""
+    uow = TurnUnitOfWork()
+    uow.track_session(session)
+    uow.save_message(SESSION_ID, "user", message)
+    uow.update_session(SESSION_ID, flow_step, {**session["extracted_data"], **facts}, status=status)
+    if ticket:
+        uow.create_ticket(SESSION_ID, CUSTOMER_ID, "EMERGENCY", priority="high")
+    return uow
+
+
+def _open_tickets(backend) -> list[dict]:
+    return [t for t in backend.list_open_tickets() if t["session_id"] == SESSION_ID]
+
+
+def test_double_send_keeps_both_turns_facts_and_one_ticket(backend, session):
+    first = _turn(session, "I crashed", {"issue_category": "Accident / collision"}, "ESCALATED", "ESCALATED", ticket=True)
+    second = _turn(session, "I crashed!", {"is_safe": False}, "ESCALATED", "ESCALATED", ticket=True)
+
+    first_ticket = backend.commit_unit_of_work(first)
+    second_ticket = backend.commit_unit_of_work(second)
+
+    row = backend.get_session_by_id(SESSION_ID)
+    assert row["extracted_data"] == {
+        "phone_verified": True,
+        "location_confirmed": True,
+        "issue_category": "Accident / collision",
+        "is_safe": False,
+    }
+    assert row["status"] == "ESCALATED"
+    assert row["version"] == session["version"] + 2
+    # The second turn's ticket is dropped and it reports the one the first turn raised.
+    assert second_ticket == first_ticket
+    assert [t["id"] for t in _open_tickets(backend)] == [first_ticket]
+    history = backend.get_chat_history(SESSION_ID, limit=10)
+    assert [m["content"] for m in history] == ["I crashed", "I crashed!"]
+
+
+def test_rebase_reports_superseded_ticket(session):
+    uow = _turn(session, "help", {"is_safe": False}, "ESCALATED", "ESCALATED", ticket=True)
+    current = {**session, "status": "ESCALATED", "version": session["version"] + 1}
+
+    uow.rebase(SESSION_ID, current)
+
+    assert uow.ticket is None
+    assert uow.superseded_ticket_session == SESSION_ID
+    assert uow.session_versions[SESSION_ID] == session["version"] + 1
+
+
+def test_rebase_merges_facts_three_ways(session):
+    uow = _turn(session, "flat tyre", {"issue_category": "Flat tyre", "is_safe": True})
+    # This turn also drops a fact it read.
+    del uow.session_updates[SESSION_ID]["extracted_data"]["location_confirmed"]
+    current = {
+        **session,
+        "version": session["version"] + 1,
+        # The other request changed a fact this turn left alone and one this turn also changed.
+        "extracted_data": {**session["extracted_data"], "phone_verified": False, "is_safe": False, "address": "MG Road"},
+    }
+
+    uow.rebase(SESSION_ID, current)
+
+    assert uow.session_updates[SESSION_ID]["extracted_data"] == {
+        "phone_verified": False,  # theirs: untouched here
+        "is_safe": True,  # ours wins where both changed it
+        "issue_category": "Flat tyre",  # ours
+        "address": "MG Road",  # theirs: new
+    }
+
+
+def test_turn_does_not_reopen_resolved_session(backend, session):
+    uow = _turn(session, "flat tyre", {"issue_category": "Flat tyre"}, "ROUTING", "ACTIVE")
+    assert backend.mark_session_resolved(SESSION_ID)
+
+    backend.commit_unit_of_work(uow)
+
+    row = backend.get_session_by_id(SESSION_ID)
+    assert row["status"] == "RESOLVED"
+    assert row["extracted_data"]["issue_category"] == "Flat tyre"
+
+
+def test_escalated_session_stays_escalated(backend, session):
+    escalation = _turn(session, "get me a human", {}, "ESCALATED", "ESCALATED", ticket=True)
+    normal = _turn(session, "flat tyre", {"issue_category": "Flat tyre"}, "ROUTING", "ACTIVE")
+
+    backend.commit_unit_of_work(escalation)
+    backend.commit_unit_of_work(normal)
+
+    row = backend.get_session_by_id(SESSION_ID)
+    assert row["status"] == "ESCALATED"
+    assert row["current_flow_step"] == "ESCALATED"
+    assert len(_open_tickets(backend)) == 1
+
+
+def test_conflict_raised_after_max_retries(backend, session, monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_CAS_MAX_RETRIES", 2)
+    commit_once = backend._commit_unit_of_work_once
+    attempts = []
+
+    def always_raced(uow):
+        # Another request commits to the session just before every attempt.
+        attempts.append(1)
+        current = backend.get_session_by_id(SESSION_ID)
+        backend.update_session(SESSION_ID, current["current_flow_step"], current["extracted_data"], current["status"])
+        return commit_once(uow)
+
+    monkeypatch.setattr(backend, "_commit_unit_of_work_once", always_raced)
+    exhausted_before = session_cas_stats()["exhausted"]
+    uow = _turn(session, "flat tyre", {"issue_category": "Flat tyre"})
+
+    with pytest.raises(SessionConflictError):
+        backend.commit_unit_of_work(uow)
+
+    assert len(attempts) == 3
+    assert session_cas_stats()["exhausted"] == exhausted_before + 1
+    # A conflicting attempt leaves nothing of the turn behind.
+    assert backend.get_chat_history(SESSION_ID, limit=10) == []
+    assert "issue_category" not in backend.get_session_by_id(SESSION_ID)["extracted_data"]
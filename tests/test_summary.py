@@ -0,0 +1,28 @@
+"""The per-session log of earlier user messages sent to the LLM."""
+
+from app.core.config import settings
+from app.services.summary import append_turn, earlier_user_messages
+
+
+def _log(count: int) -> str:
+    summary = None
+    for i in range(count):
+        summary = append_turn(summary, "ISSUE", f"message {i}")
+    return summary
+
+
+def test_log_keeps_newest_entries_and_counts_dropped_ones():
+    lines = _log(settings.SUMMARY_MAX_ENTRIES + 3).splitlines()
+
+    assert lines[0] == "(3 earlier turns omitted)"
+    assert lines[1] == "[ISSUE] user: message 3"
+    assert len(lines) == settings.SUMMARY_MAX_ENTRIES + 1
+
+
+def test_turns_already_sent_verbatim_are_left_out():
+    earlier = earlier_user_messages(_log(4), skip_last=2)
+
+    assert earlier.splitlines() == ["[ISSUE] user: message 0", "[ISSUE] user: message 1"]
+    assert earlier_user_messages(_log(2), skip_last=2) is None
+    assert earlier_user_messages(None, skip_last=-1) is None
+    assert earlier_user_messages(_log(settings.SUMMARY_MAX_ENTRIES + 1), skip_last=99) == "(1 earlier turns omitted)"
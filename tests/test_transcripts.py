@@ -0,0 +1,60 @@
+"""Agent transcript endpoints over archived sessions."""
+
+import json
+import time
+
+from app.core.config import settings
+from app.storage import base
+
+SESSION_ID = "sess-archived"
+
+
+def _archived_session(store, archived: int, live: int):
+    store.create_session(SESSION_ID, "cust-1", None, {"phone_verified": True}, "SAFETY")
+    for i in range(archived):
+        store.save_message(SESSION_ID, "user", f"old {i}")
+    store.mark_session_resolved(SESSION_ID)
+    time.sleep(0.01)
+    assert store.archive_session_messages(SESSION_ID, 0) == archived
+    for i in range(live):
+        store.save_message(SESSION_ID, "user", f"new {i}")
+
+
+def test_stream_inflates_the_archive_once(client, store, monkeypatch):
+    monkeypatch.setattr(settings, "TRANSCRIPT_STREAM_BATCH_SIZE", 10)
+    _archived_session(store, archived=45, live=7)
+    base._archive_reads.clear()
+    unpacked = []
+    unpack = base.unpack_messages
+    monkeypatch.setattr(base, "unpack_messages", lambda payload: unpacked.append(1) or unpack(payload))
+
+    response = client.get(f"/api/agent/session/{SESSION_ID}/transcript.ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["type"] == "session"
+    contents = [line["content"] for line in lines[1:]]
+    assert contents == [f"old {i}" for i in range(45)] + [f"new {i}" for i in range(7)]
+    assert unpacked == [1]
+
+
+def test_paged_transcript_tops_up_from_the_archive(client, store):
+    _archived_session(store, archived=5, live=2)
+
+    page = client.get(f"/api/agent/session/{SESSION_ID}", params={"limit": 4}).json()
+    older = client.get(f"/api/agent/session/{SESSION_ID}", params={"limit": 4, "before": page["next_cursor"]}).json()
+
+    assert [m["content"] for m in page["transcript"]] == ["new 1", "new 0", "old 4", "old 3"]
+    assert [m["content"] for m in older["transcript"]] == ["old 2", "old 1", "old 0"]
+    assert older["next_cursor"] is None
+
+
+def test_metadata_only_read(backend):
+    backend.create_session(SESSION_ID, "cust-1", None, {"phone_verified": True}, "SAFETY")
+    backend.save_message(SESSION_ID, "user", "hello")
+
+    metadata = backend.get_session_transcript(SESSION_ID, include_messages=False)
+
+    assert metadata["session_id"] == SESSION_ID
+    assert metadata["extracted_data"] == {"phone_verified": True}
+    assert "messages" not in metadata
+    assert backend.get_session_transcript("missing", include_messages=False) is None